@@ -0,0 +1,296 @@
+"""
+ASGI entry point.
+
+The AI endpoints that only wait on Bedrock run as coroutines: a request
+queued for admission, joined to an identical call or waiting for a hedge
+holds no thread. The Bedrock request itself is still blocking (boto3 has
+no async client) and runs on the AI call pool, so calls in flight per
+process are capped by AI_CALL_THREADS and AI_CONCURRENCY_MAX. Every other
+route is served by the Flask app in app/main.py through a WSGI adapter
+running on its own thread pool (WSGI_THREADS).
+
+Usage:
+    uvicorn app.asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from tempfile import SpooledTemporaryFile
+from typing import IO, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.main import app as flask_app
+from app.services import bedrock_service
+from app.utils.admission import Overloaded
+from app.utils.deadline import DeadlineExceeded
+
+# Threads serving the Flask routes. Each open /api/todos/changes stream
+# holds one until its client disconnects.
+WSGI_THREADS = int(os.getenv('WSGI_THREADS', '64'))
+
+# Request bodies up to this size stay in memory; larger ones (bulk
+# imports) spill to a temporary file
+BODY_MEMORY_LIMIT = 64 * 1024
+
+
+class ClientDisconnected(OSError):
+    """Raised in a WSGI thread writing to a client that has gone away"""
+
+
+class ThreadedWsgiToAsgi:
+    """WSGI-to-ASGI adapter running each request on a thread pool.
+
+    The body is read on the event loop, then the WSGI application runs on
+    a pool thread and its output is sent chunk by chunk, so a streaming
+    response (the change feed) reaches the client as it is produced and
+    holds only its own thread. A write after the client disconnected
+    raises ClientDisconnected (uvicorn drops such writes silently), so
+    streaming responses end and give their thread back.
+    """
+
+    def __init__(self, wsgi_application, threads: int):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError(f"WSGI adapter received a {scope['type']} connection")
+        body = await _read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        exchange = _WsgiExchange(scope, body, send, loop)
+        # The body has been read, so receive() now only reports the disconnect
+        watcher = asyncio.ensure_future(exchange.watch_disconnect(receive))
+        try:
+            await loop.run_in_executor(self.executor, exchange.run, self.wsgi_application)
+        finally:
+            watcher.cancel()
+            body.close()
+
+
+async def _read_body(receive) -> Optional[IO[bytes]]:
+    """The whole request body as a file, or None if the client went away"""
+    body = SpooledTemporaryFile(max_size=BODY_MEMORY_LIMIT)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            body.seek(0)
+            return body
+
+
+def _environ(scope: Dict, body: IO[bytes]) -> Dict:
+    """PEP 3333 environ for an ASGI HTTP scope"""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class _WsgiExchange:
+    """One request: the WSGI side runs on a pool thread, sends go to the loop"""
+
+    def __init__(self, scope: Dict, body: IO[bytes], send, loop: asyncio.AbstractEventLoop):
+        self.environ = _environ(scope, body)
+        self.send = send
+        self.loop = loop
+        self.disconnected = False
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.started = False
+
+    async def watch_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        self.disconnected = True
+
+    def _send(self, message: Dict):
+        """Send an ASGI message from the WSGI thread and wait until it is written"""
+        if self.disconnected:
+            raise ClientDisconnected()
+        asyncio.run_coroutine_threadsafe(self.send(message), self.loop).result()
+
+    def start_response(self, status: str, headers: List[Tuple[str, str]], exc_info=None):
+        if exc_info is not None and self.started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+        return self.write
+
+    def _start(self):
+        # Headers go out with the first non-empty chunk, or at the end
+        if not self.started:
+            self.started = True
+            self._send({'type': 'http.response.start', 'status': self.status, 'headers': self.headers})
+
+    def write(self, chunk: bytes):
+        self._start()
+        self._send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    def run(self, application):
+        """Run the WSGI application, streaming its output"""
+        output = application(self.environ, self.start_response)
+        try:
+            for chunk in output:
+                if chunk:
+                    self.write(chunk)
+            self._start()
+            self._send({'type': 'http.response.body'})
+        except ClientDisconnected:
+            pass
+        finally:
+            # WSGI requires close(); it ends the generator and Flask's context
+            close = getattr(output, 'close', None)
+            if close is not None:
+                close()
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({'error': HTTPStatus(status).phrase, 'message': message}, status_code=status)
+
+
+def _endpoint(handler: Callable[[Dict], Awaitable[Dict]]):
+    """Wrap a handler taking the JSON body; ValueError becomes a 400"""
+    async def endpoint(request: Request) -> JSONResponse:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return _error(400, 'JSON形式のリクエストボディを送信してください')
+        try:
+            return JSONResponse(await handler(data))
+        except ValueError as e:
+            return _error(400, str(e))
+        except Overloaded as e:
+            response = _error(503, str(e))
+            response.headers['Retry-After'] = '5'
+            return response
+        except DeadlineExceeded as e:
+            return _error(504, str(e))
+        except Exception as e:
+            return _error(500, str(e))
+    return endpoint
+
+
+def _required(data: Dict, field: str, message: str) -> str:
+    value = data.get(field)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f'{field} は文字列で指定してください')
+    value = (value or '').strip()
+    if not value:
+        raise ValueError(message)
+    return value
+
+
+async def generate_tasks(data: Dict) -> Dict:
+    description = _required(data, 'description', '説明を入力してください')
+    return {'tasks': await bedrock_service.agenerate_tasks(description)}
+
+
+async def classify_task(data: Dict) -> Dict:
+    title = _required(data, 'title', 'タイトルを入力してください')
+    return await bedrock_service.aclassify_task(title, data.get('description', ''))
+
+
+async def set_priority(data: Dict) -> Dict:
+    title = _required(data, 'title', 'タイトルを入力してください')
+    return await bedrock_service.aset_priority(title, data.get('description', ''), data.get('deadline'))
+
+
+async def enrich_task(data: Dict) -> Dict:
+    title = _required(data, 'title', 'タイトルを入力してください')
+    return await bedrock_service.aenrich_task(
+        title,
+        data.get('description') or '',
+        data.get('deadline'),
+        include_guide=bool(data.get('includeGuide')),
+        parallel=bool(data.get('parallel'))
+    )
+
+
+async def generate_execution_guide(data: Dict) -> Dict:
+    title = _required(data, 'title', 'タイトルを入力してください')
+    return await bedrock_service.agenerate_execution_guide(
+        title,
+        data.get('description', ''),
+        data.get('category', 'other'),
+        data.get('priority', 'medium')
+    )
+
+
+async def generate_completion_message(data: Dict) -> Dict:
+    title = _required(data, 'title', 'タイトルを入力してください')
+    return await bedrock_service.agenerate_completion_message(
+        title,
+        data.get('description', ''),
+        data.get('category', 'other')
+    )
+
+
+routes = [
+    Route('/api/ai/generate-tasks', _endpoint(generate_tasks), methods=['POST']),
+    Route('/api/ai/classify-task', _endpoint(classify_task), methods=['POST']),
+    Route('/api/ai/set-priority', _endpoint(set_priority), methods=['POST']),
+    Route('/api/ai/enrich-task', _endpoint(enrich_task), methods=['POST']),
+    Route('/api/ai/generate-execution-guide', _endpoint(generate_execution_guide), methods=['POST']),
+    Route('/api/ai/generate-completion-message', _endpoint(generate_completion_message), methods=['POST']),
+]
+ASYNC_PATHS = {route.path for route in routes}
+
+async_app = CORSMiddleware(
+    Starlette(routes=routes),
+    allow_origins=['*'],
+    allow_methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'],
+    allow_headers=['*']
+)
+wsgi_app = ThreadedWsgiToAsgi(flask_app, WSGI_THREADS)
+
+
+async def app(scope, receive, send):
+    """Send the async AI routes (and lifespan events) to Starlette, the rest to Flask"""
+    if scope['type'] != 'http' or scope['path'].rstrip('/') in ASYNC_PATHS:
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -1,22 +1,132 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
 import boto3
 from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from app.utils.deadline import DeadlineExceeded, expired
 
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
-MODEL_ID = 'us.anthropic.claude-sonnet-4-5-20250929-v1:0'
 
-# Configure retry strategy
-retry_config = Config(
+MODEL_KWARGS = {
+    "max_tokens": 2000,
+    "anthropic_version": "bedrock-2023-05-31"
+}
+
+# HTTP connections kept per client. Size it to the AI concurrency ceiling
+# (AI_CONCURRENCY_MAX) so admitted calls never wait for a connection.
+POOL_SIZE = int(os.getenv('BEDROCK_POOL_SIZE', '32'))
+# Connections opened by the startup warm-up
+WARMUP_CONNECTIONS = int(os.getenv('BEDROCK_WARMUP_CONNECTIONS', '2'))
+
+# Socket timeouts of every Bedrock call. The read timeout is the longest
+# one attempt may wait for the model, whatever the caller's deadline; the
+# deadline layer (app/utils/deadline) stops waiting earlier.
+CONNECT_TIMEOUT = float(os.getenv('BEDROCK_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('BEDROCK_READ_TIMEOUT', '60'))
+# The first request plus up to three retries
+MAX_ATTEMPTS = 4
+
+# One configuration for every Bedrock call: pooled keep-alive connections,
+# socket timeouts and the adaptive retry strategy
+client_config = Config(
     region_name=AWS_REGION,
+    max_pool_connections=POOL_SIZE,
+    tcp_keepalive=True,
+    connect_timeout=CONNECT_TIMEOUT,
+    read_timeout=READ_TIMEOUT,
     retries={
-        'max_attempts': 3,
+        'total_max_attempts': MAX_ATTEMPTS,
         'mode': 'adaptive'
     }
 )
 
-# Create Bedrock Runtime client
-bedrock_client = boto3.client(
-    service_name='bedrock-runtime',
-    region_name=AWS_REGION,
-    config=retry_config
-)
+_lock = threading.RLock()
+_client = None
+_chat_models: Dict[str, object] = {}
+
+
+def _check_deadline(**kwargs):
+    """before-send hook: start no attempt, first or retry, past the caller's deadline.
+
+    Attempts run in a copy of the caller's context, so an abandoned call
+    stops at its next retry instead of retrying for its full allowance.
+    """
+    if expired():
+        raise DeadlineExceeded()
+
+
+def get_client():
+    """The shared Bedrock Runtime client, created on first use"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                client = boto3.client(
+                    service_name='bedrock-runtime',
+                    region_name=AWS_REGION,
+                    config=client_config
+                )
+                client.meta.events.register('before-send.bedrock-runtime', _check_deadline)
+                _client = client
+    return _client
+
+
+def get_chat_model(model_id: str):
+    """LangChain ChatBedrock for a model, over the shared client's pool"""
+    model = _chat_models.get(model_id)
+    if model is None:
+        # Imported here so scripts using only the raw client skip LangChain
+        from langchain_aws import ChatBedrock
+        with _lock:
+            model = _chat_models.get(model_id)
+            if model is None:
+                model = _chat_models[model_id] = ChatBedrock(
+                    client=get_client(),
+                    model_id=model_id,
+                    region_name=AWS_REGION,
+                    model_kwargs=MODEL_KWARGS
+                )
+    return model
+
+
+def _probe(model_id: str) -> Optional[str]:
+    """One round trip that resolves credentials and opens a connection.
+
+    The request body is empty, so Bedrock rejects it before running the
+    model and nothing is billed; a ValidationException means it arrived.
+    """
+    try:
+        get_client().invoke_model(modelId=model_id, body=b'{}')
+    except ClientError as error:
+        code = error.response.get('Error', {}).get('Code')
+        if code != 'ValidationException':
+            return code
+    return None
+
+
+def warm_up(model_ids):
+    """Create the clients and fill the pool before the first AI request"""
+    model_ids = list(model_ids)
+    try:
+        for model_id in model_ids:
+            get_chat_model(model_id)
+        connections = max(1, min(WARMUP_CONNECTIONS, POOL_SIZE))
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            problems = set(pool.map(_probe, [model_ids[0]] * connections))
+    except Exception as error:
+        print(f'Bedrock warm-up failed: {error}')
+        return
+    problems.discard(None)
+    if problems:
+        print(f"Bedrock warm-up got {', '.join(sorted(problems))}")
+    else:
+        print(f'✅ Bedrock client warmed up ({connections} connections)')
+
+
+def start_warm_up(model_ids):
+    """Run warm_up on a background thread so startup is not delayed"""
+    threading.Thread(target=warm_up, args=(list(model_ids),), name='bedrock-warm-up', daemon=True).start()
@@ -1,6 +1,7 @@
 import os
 from flask import Flask, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 from dotenv import load_dotenv
 
 import logging
@@ -89,13 +90,38 @@ def health_check():
     return jsonify({"status": "healthy"})
 
 # Error handling
+from app.utils.admission import Overloaded
+from app.utils.deadline import DeadlineExceeded
+
 @app.errorhandler(Exception)
 def handle_exception(error):
+    # Keep the status of abort(400) etc. instead of turning it into a 500
+    if isinstance(error, HTTPException):
+        return jsonify({
+            "error": error.name,
+            "message": error.description
+        }), error.code
     return jsonify({
         "error": "Internal Server Error",
         "message": str(error)
     }), 500
 
+@app.errorhandler(Overloaded)
+def handle_overloaded(error):
+    response = jsonify({
+        "error": "Service Unavailable",
+        "message": str(error)
+    })
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+@app.errorhandler(DeadlineExceeded)
+def handle_deadline_exceeded(error):
+    return jsonify({
+        "error": "Gateway Timeout",
+        "message": str(error)
+    }), 504
+
 # Import and register blueprints
 from app.routes import todos, ai, search
 
@@ -103,6 +129,12 @@ app.register_blueprint(todos.bp, url_prefix="/api/todos")
 app.register_blueprint(ai.bp, url_prefix="/api/ai")
 app.register_blueprint(search.bp, url_prefix="/api/search")
 
+# Open Bedrock connections before the first AI request
+if os.getenv("BEDROCK_WARMUP", "true").lower() == "true":
+    from app.config.bedrock import start_warm_up
+    from app.services.model_routing import MODEL_TIERS
+    start_warm_up(MODEL_TIERS.values())
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
     app.run(
@@ -1,7 +1,14 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Optional, List
 from datetime import datetime
 
+CATEGORIES = ('work', 'personal', 'shopping', 'health', 'other')
+PRIORITIES = ('low', 'medium', 'high', 'urgent')
+
+# Japanese labels the model sometimes answers with instead of the value
+CATEGORY_LABELS = {'仕事': 'work', '個人': 'personal', '買い物': 'shopping', '健康': 'health', 'その他': 'other'}
+PRIORITY_LABELS = {'緊急': 'urgent', '高': 'high', '中': 'medium', '低': 'low'}
+
 
 class TodoBase(BaseModel):
     title: str
@@ -77,3 +84,205 @@ class SearchTaskContextRequest(BaseModel):
     title: str
     description: Optional[str] = None
     numResults: Optional[int] = 5
+
+
+# ---- AI responses --------------------------------------------------------
+# Schemas the model's JSON answers are validated against. Validators fix
+# harmless variations (case, Japanese labels, a comma-separated string for
+# a list) so that only answers that are really wrong need a re-ask.
+
+
+def _choice(value, choices, labels):
+    """Map a free-form answer onto one of the allowed values"""
+    if isinstance(value, str):
+        text = value.strip().lower()
+        for choice in choices:
+            if text == choice or text.startswith(f'{choice}（') or text.startswith(f'{choice}('):
+                return choice
+        for label, choice in labels.items():
+            if label in value:
+                return choice
+    return value
+
+
+def _string_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.replace('、', ',').split(',') if part.strip()]
+    return value
+
+
+def _text(value):
+    return '' if value is None else value
+
+
+class GeneratedTask(BaseModel):
+    title: str = Field(min_length=1)
+    description: str = ''
+    estimatedCategory: str = 'other'
+    estimatedPriority: str = 'medium'
+
+    @field_validator('description', mode='before')
+    @classmethod
+    def _description(cls, value):
+        return _text(value)
+
+    @field_validator('estimatedCategory', mode='before')
+    @classmethod
+    def _category(cls, value):
+        value = _choice(value, CATEGORIES, CATEGORY_LABELS)
+        return value if value in CATEGORIES else 'other'
+
+    @field_validator('estimatedPriority', mode='before')
+    @classmethod
+    def _priority(cls, value):
+        value = _choice(value, PRIORITIES, PRIORITY_LABELS)
+        return value if value in PRIORITIES else 'medium'
+
+
+class TaskClassification(BaseModel):
+    category: str
+    tags: List[str] = []
+    reasoning: str = ''
+
+    @field_validator('category', mode='before')
+    @classmethod
+    def _category(cls, value):
+        value = _choice(value, CATEGORIES, CATEGORY_LABELS)
+        if value not in CATEGORIES:
+            raise ValueError(f'category must be one of {CATEGORIES}')
+        return value
+
+    @field_validator('tags', mode='before')
+    @classmethod
+    def _tags(cls, value):
+        return _string_list(value)
+
+    @field_validator('reasoning', mode='before')
+    @classmethod
+    def _reasoning(cls, value):
+        return _text(value)
+
+
+class PrioritySuggestion(BaseModel):
+    priority: str
+    reasoning: str = ''
+    urgencyFactors: List[str] = []
+
+    @field_validator('priority', mode='before')
+    @classmethod
+    def _priority(cls, value):
+        value = _choice(value, PRIORITIES, PRIORITY_LABELS)
+        if value not in PRIORITIES:
+            raise ValueError(f'priority must be one of {PRIORITIES}')
+        return value
+
+    @field_validator('urgencyFactors', mode='before')
+    @classmethod
+    def _factors(cls, value):
+        return _string_list(value)
+
+    @field_validator('reasoning', mode='before')
+    @classmethod
+    def _reasoning(cls, value):
+        return _text(value)
+
+
+class ExecutionStep(BaseModel):
+    stepNumber: int
+    instruction: str = Field(min_length=1)
+    estimatedTime: str = ''
+    tips: str = ''
+
+    @field_validator('estimatedTime', 'tips', mode='before')
+    @classmethod
+    def _optional_text(cls, value):
+        return _text(value)
+
+
+class ExecutionGuide(BaseModel):
+    steps: List[ExecutionStep] = Field(min_length=1)
+    totalEstimatedTime: str = ''
+    prerequisites: List[str] = []
+    successCriteria: str = ''
+
+    @field_validator('totalEstimatedTime', 'successCriteria', mode='before')
+    @classmethod
+    def _optional_text(cls, value):
+        return _text(value)
+
+    @field_validator('prerequisites', mode='before')
+    @classmethod
+    def _prerequisites(cls, value):
+        return _string_list(value)
+
+
+class CompletionMessage(BaseModel):
+    message: str = Field(min_length=1)
+    encouragement: str = ''
+    emoji: str = '🎉'
+
+    @field_validator('encouragement', mode='before')
+    @classmethod
+    def _encouragement(cls, value):
+        return _text(value)
+
+
+class TaskEnrichment(TaskClassification, PrioritySuggestion):
+    """Classification, priority and optionally a guide from one answer"""
+    executionGuide: Optional[ExecutionGuide] = None
+
+
+class StaleEncouragement(BaseModel):
+    overallMessage: str = ''
+    taskMessages: Dict[str, str] = {}
+    actionSuggestion: str = ''
+
+    @field_validator('overallMessage', 'actionSuggestion', mode='before')
+    @classmethod
+    def _optional_text(cls, value):
+        return _text(value)
+
+
+class InferredDependency(BaseModel):
+    id: str
+    dependsOn: List[str] = []
+    blocks: List[str] = []
+    reasoning: str = ''
+
+    @field_validator('id', mode='before')
+    @classmethod
+    def _id(cls, value):
+        return str(value) if isinstance(value, int) else value
+
+    @field_validator('dependsOn', 'blocks', mode='before')
+    @classmethod
+    def _ids(cls, value):
+        return [str(v) for v in _string_list(value)]
+
+    @field_validator('reasoning', mode='before')
+    @classmethod
+    def _reasoning(cls, value):
+        return _text(value)
+
+
+class RecommendationAnalysis(BaseModel):
+    dependencies: List[InferredDependency] = []
+    reasons: Dict[str, str] = {}
+    insights: str = ''
+
+    @field_validator('dependencies', mode='before')
+    @classmethod
+    def _dependencies(cls, value):
+        return [] if value is None else value
+
+    @field_validator('reasons', mode='before')
+    @classmethod
+    def _reasons(cls, value):
+        return {} if value is None else value
+
+    @field_validator('insights', mode='before')
+    @classmethod
+    def _insights(cls, value):
+        return _text(value)
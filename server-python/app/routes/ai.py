@@ -1,5 +1,10 @@
-from flask import Blueprint, jsonify, request, abort
-from app.services import bedrock_service
+import json
+from flask import Blueprint, Response, jsonify, request, abort, stream_with_context
+from app.services import bedrock_service, stale_tasks
+from app.services.ai_cache import response_cache
+from app.services.model_routing import model_metrics
+from app.utils.admission import Overloaded, bedrock_admission
+from app.utils.deadline import DeadlineExceeded, hedge_budget
 
 bp = Blueprint('ai', __name__)
 
@@ -16,10 +21,39 @@ def generate_tasks():
 
         tasks = bedrock_service.generate_tasks(description)
         return jsonify({'tasks': tasks})
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         abort(500, description=str(e))
 
 
+def _sse_response(events):
+    """Send (event, data) pairs as Server-Sent Events; errors end the stream"""
+    def generate():
+        try:
+            for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@bp.route("/generate-tasks/stream", methods=["POST"])
+def stream_tasks():
+    """Stream generated tasks: a 'task' event per task, then 'done'"""
+    data = request.get_json() or {}
+    description = data.get('description', '').strip()
+    if not description:
+        abort(400, description='説明を入力してください')
+
+    return _sse_response(bedrock_service.stream_tasks(description))
+
+
 @bp.route("/classify-task", methods=["POST"])
 def classify_task():
     """Classify task and suggest tags"""
@@ -33,6 +67,31 @@ def classify_task():
 
         result = bedrock_service.classify_task(title, description)
         return jsonify(result)
+    except (Overloaded, DeadlineExceeded):
+        raise
+    except Exception as e:
+        abort(500, description=str(e))
+
+
+@bp.route("/enrich-task", methods=["POST"])
+def enrich_task():
+    """Category, tags, priority and optionally an execution guide in one call"""
+    data = request.get_json(silent=True) or {}
+    title = (data.get('title') or '').strip()
+    if not title:
+        abort(400, description='タイトルを入力してください')
+
+    try:
+        result = bedrock_service.enrich_task(
+            title,
+            data.get('description') or '',
+            data.get('deadline'),
+            include_guide=bool(data.get('includeGuide')),
+            parallel=bool(data.get('parallel'))
+        )
+        return jsonify(result)
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         abort(500, description=str(e))
 
@@ -51,6 +110,38 @@ def set_priority():
 
         result = bedrock_service.set_priority(title, description, deadline)
         return jsonify(result)
+    except (Overloaded, DeadlineExceeded):
+        raise
+    except Exception as e:
+        abort(500, description=str(e))
+
+
+@bp.route("/classify-tasks", methods=["POST"])
+def classify_tasks():
+    """Classify many tasks at once"""
+    try:
+        data = request.get_json() or {}
+        result = bedrock_service.classify_tasks(data.get('tasks'))
+        return jsonify(result)
+    except ValueError as e:
+        abort(400, description=str(e))
+    except (Overloaded, DeadlineExceeded):
+        raise
+    except Exception as e:
+        abort(500, description=str(e))
+
+
+@bp.route("/set-priorities", methods=["POST"])
+def set_priorities():
+    """Set priorities of many tasks at once"""
+    try:
+        data = request.get_json() or {}
+        result = bedrock_service.set_priorities(data.get('tasks'))
+        return jsonify(result)
+    except ValueError as e:
+        abort(400, description=str(e))
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         abort(500, description=str(e))
 
@@ -72,10 +163,28 @@ def generate_execution_guide():
             title, description, category, priority
         )
         return jsonify(result)
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         abort(500, description=str(e))
 
 
+@bp.route("/generate-execution-guide/stream", methods=["POST"])
+def stream_execution_guide():
+    """Stream an execution guide: a 'step' event per step, then 'done'"""
+    data = request.get_json() or {}
+    title = data.get('title', '').strip()
+    if not title:
+        abort(400, description='タイトルを入力してください')
+
+    return _sse_response(bedrock_service.stream_execution_guide(
+        title,
+        data.get('description', ''),
+        data.get('category', 'other'),
+        data.get('priority', 'medium')
+    ))
+
+
 @bp.route("/generate-completion-message", methods=["POST"])
 def generate_completion_message():
     """Generate completion celebration message"""
@@ -92,6 +201,8 @@ def generate_completion_message():
             title, description, category
         )
         return jsonify(result)
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         abort(500, description=str(e))
 
@@ -108,6 +219,17 @@ def detect_stale_tasks():
 
         result = bedrock_service.detect_stale_tasks(todos)
         return jsonify(result)
+    except (Overloaded, DeadlineExceeded):
+        raise
+    except Exception as e:
+        abort(500, description=str(e))
+
+
+@bp.route("/stale-tasks", methods=["GET"])
+def get_stale_tasks():
+    """Stale tasks from the store; encouragement is attached once generated"""
+    try:
+        return jsonify(stale_tasks.get_stale_tasks())
     except Exception as e:
         abort(500, description=str(e))
 
@@ -124,5 +246,29 @@ def recommend_tasks():
 
         result = bedrock_service.recommend_tasks(todos)
         return jsonify(result)
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         abort(500, description=str(e))
+
+
+@bp.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counts of the AI response cache and coalesced calls"""
+    return jsonify({
+        **response_cache.stats(),
+        'inFlight': bedrock_service.in_flight.stats(),
+        'asyncInFlight': bedrock_service.async_in_flight.stats()
+    })
+
+
+@bp.route("/model-stats", methods=["GET"])
+def model_stats():
+    """Calls, latency, tokens and estimated cost per operation and model tier"""
+    return jsonify({**model_metrics.stats(), 'hedging': hedge_budget.stats()})
+
+
+@bp.route("/admission-stats", methods=["GET"])
+def admission_stats():
+    """Concurrency window and queue of outbound Bedrock calls"""
+    return jsonify(bedrock_admission.stats())
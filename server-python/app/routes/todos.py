@@ -1,21 +1,226 @@
-from flask import Blueprint, jsonify, request, abort
+import json
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from flask import Blueprint, Response, jsonify, request, abort, stream_with_context
 from app.services import todos_service
+from app.services.change_feed import change_feed
 
 bp = Blueprint('todos', __name__)
 
+# Todos serialized per chunk of a streamed export
+EXPORT_CHUNK_SIZE = 500
+# Bytes read per chunk of a streamed import body
+IMPORT_READ_SIZE = 64 * 1024
+# Seconds between keep-alive comments on an idle change stream
+CHANGES_KEEPALIVE = 15.0
+
+
+def _last_modified(modified: float) -> Optional[datetime]:
+    """Last-Modified value, or None while the current second can still change.
+
+    HTTP dates have one-second resolution; withholding it during the second
+    of the last change keeps a later change in that second from being
+    masked by If-Modified-Since.
+    """
+    if int(modified) >= int(time.time()):
+        return None
+    return datetime.fromtimestamp(int(modified), tz=timezone.utc)
+
+
+def _not_modified(etag: str, modified: float) -> bool:
+    """Whether the client's cached copy of the dataset is still current"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    last_modified = _last_modified(modified)
+    if request.if_modified_since and last_modified:
+        return request.if_modified_since >= last_modified
+    return False
+
+
+def _with_validators(response, etag: str, modified: float):
+    response.set_etag(etag)
+    last_modified = _last_modified(modified)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def _iter_lines(stream):
+    """Split a request body stream into lines without buffering it whole"""
+    remainder = b''
+    while True:
+        chunk = stream.read(IMPORT_READ_SIZE)
+        if not chunk:
+            break
+        lines = (remainder + chunk).split(b'\n')
+        remainder = lines.pop()
+        yield from lines
+    if remainder:
+        yield remainder
+
 
 @bp.route("/", methods=["GET"])
 def get_todos():
-    """Get all todos with optional filters"""
+    """Get todos with optional filters, pagination and field projection.
+
+    Without limit/cursor the full list is returned as before. With either,
+    the response is {"items": [...], "nextCursor": ...} sorted by `sort`
+    (createdAt, updatedAt, priority, deadline) and `order` (asc, desc).
+    """
     try:
+        etag, modified = todos_service.get_version()
+        if _not_modified(etag, modified):
+            return _with_validators(Response(status=304), etag, modified)
+
         completed = request.args.get('completed')
         if completed is not None:
             completed = completed.lower() == 'true'
         category = request.args.get('category')
         priority = request.args.get('priority')
+        fields = [f for f in request.args.get('fields', '').split(',') if f]
+
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            todos = todos_service.get_all_todos(completed, category, priority)
+            response = jsonify(todos_service.project_fields(todos, fields))
+            return _with_validators(response, etag, modified)
+
+        limit = request.args.get('limit')
+        page = todos_service.list_todos_page(
+            completed, category, priority,
+            sort=request.args.get('sort', 'createdAt'),
+            order=request.args.get('order', 'asc').lower(),
+            limit=int(limit) if limit is not None else None,
+            cursor=request.args.get('cursor'),
+            fields=fields
+        )
+        return _with_validators(jsonify(page), etag, modified)
+    except ValueError as e:
+        abort(400, description=str(e))
+    except Exception as e:
+        abort(500, description=str(e))
+
+
+@bp.route("/export", methods=["GET"])
+def export_todos():
+    """Stream all todos as NDJSON"""
+    def generate():
+        chunk = []
+        for todo in todos_service.iter_todos():
+            chunk.append(json.dumps(todo, ensure_ascii=False))
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                yield '\n'.join(chunk) + '\n'
+                chunk = []
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=todos.ndjson'}
+    )
+
+
+def _sse(event: dict) -> str:
+    """Format one change event as a Server-Sent Events message"""
+    data = json.dumps(event, ensure_ascii=False)
+    return f"id: {change_feed.epoch}:{event['seq']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+def _parse_since(value: Optional[str]) -> Optional[int]:
+    """Parse 'epoch:seq' (or a bare seq); None if it is from another feed"""
+    epoch, _, seq = value.rpartition(':')
+    if epoch and epoch != change_feed.epoch:
+        return None
+    return int(seq)
 
-        todos = todos_service.get_all_todos(completed, category, priority)
-        return jsonify(todos)
+
+@bp.route("/changes", methods=["GET"])
+def stream_changes():
+    """Stream todo changes as Server-Sent Events.
+
+    Resume with ?since=<id> or the Last-Event-ID header. When the missed
+    events are no longer buffered a 'reset' event tells the client to
+    refetch the list before following the stream.
+    """
+    since = request.args.get('since') or request.headers.get('Last-Event-ID')
+    try:
+        seq = _parse_since(since) if since else change_feed.last_seq
+    except ValueError:
+        abort(400, description='since が不正です')
+
+    def generate():
+        position = seq
+        backlog = change_feed.since(position) if position is not None else None
+        if backlog is None:
+            position = change_feed.last_seq
+            yield _sse({'seq': position, 'type': 'reset'})
+        else:
+            for event in backlog:
+                position = event['seq']
+                yield _sse(event)
+
+        while True:
+            events = change_feed.wait(position, CHANGES_KEEPALIVE)
+            if events is None:
+                # Fell behind the ring buffer while sending
+                position = change_feed.last_seq
+                yield _sse({'seq': position, 'type': 'reset'})
+            elif not events:
+                yield ': keepalive\n\n'
+            else:
+                for event in events:
+                    position = event['seq']
+                    yield _sse(event)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@bp.route("/import", methods=["POST"])
+def import_todos():
+    """Import todos from a streamed NDJSON body"""
+    try:
+        result = todos_service.import_todos(_iter_lines(request.stream))
+        return jsonify(result), 201
+    except Exception as e:
+        abort(500, description=str(e))
+
+
+@bp.route("/batch", methods=["POST"])
+def batch_todos():
+    """Apply many create/update/delete/toggle operations at once"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description='リクエストボディは JSON オブジェクトで指定してください')
+    try:
+        results = todos_service.apply_batch(data.get('operations'))
+        return jsonify({'results': results})
+    except ValueError as e:
+        abort(400, description=str(e))
+    except Exception as e:
+        abort(500, description=str(e))
+
+
+@bp.route("/search", methods=["GET"])
+def search_todos():
+    """Full-text search with ranked results and tag facets"""
+    try:
+        completed = request.args.get('completed')
+        if completed is not None:
+            completed = completed.lower() == 'true'
+        result = todos_service.search_todos(
+            request.args.get('q', ''),
+            limit=request.args.get('limit', type=int),
+            tag=request.args.get('tag'),
+            completed=completed
+        )
+        return jsonify(result)
+    except ValueError as e:
+        abort(400, description=str(e))
     except Exception as e:
         abort(500, description=str(e))
 
@@ -23,10 +228,14 @@ def get_todos():
 @bp.route("/<todo_id>", methods=["GET"])
 def get_todo(todo_id):
     """Get a single todo by ID"""
+    etag, modified = todos_service.get_version()
+    if _not_modified(etag, modified):
+        return _with_validators(Response(status=304), etag, modified)
+
     todo = todos_service.get_todo_by_id(todo_id)
     if not todo:
         abort(404, description='TODOが見つかりません')
-    return jsonify(todo)
+    return _with_validators(jsonify(todo), etag, modified)
 
 
 @bp.route("/", methods=["POST"])
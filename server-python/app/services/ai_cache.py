@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+DATA_DIR = Path(__file__).parent.parent.parent / 'data'
+
+CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true'
+
+# Seconds a response stays fresh, per operation. Operations that are not
+# listed (or have 0) are never cached: generated tasks, completion messages
+# and stale-task encouragement are expected to vary between calls.
+CACHE_TTLS = {
+    'classify_task': 24 * 3600,
+    'generate_execution_guide': 24 * 3600,
+    'generate_search_query': 7 * 24 * 3600,
+    # A priority depends on how close the deadline is, so it ages faster
+    'set_priority': 3600,
+    'enrich_task': 3600,
+}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold width variants and whitespace runs that do not change meaning"""
+    text = unicodedata.normalize('NFKC', prompt)
+    return re.sub(r'[ \t　]+', ' ', re.sub(r'\s*\n\s*', '\n', text)).strip()
+
+
+def cache_key(
+    model_id: str,
+    system_message: Optional[str],
+    prompt: str,
+    model_kwargs: Optional[Dict[str, Any]] = None
+) -> str:
+    """Hash of everything that determines a model response"""
+    material = json.dumps(
+        [model_id, normalize_prompt(system_message or ''), normalize_prompt(prompt), model_kwargs or {}],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """LRU cache of model responses with per-entry expiry.
+
+    Entries live in an in-process OrderedDict; with a disk path they are
+    also written to a small SQLite table, which survives restarts and is
+    shared by all workers on the host. Hits and misses are counted per
+    operation.
+    """
+
+    def __init__(self, max_entries: int = 1000, disk_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.disk_path = Path(disk_path) if disk_path else None
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Counter] = {}
+        self._disk = None
+        self._disk_pid = None
+
+    # ---- Disk tier ---------------------------------------------------------
+
+    def _disk_connection(self) -> Optional[sqlite3.Connection]:
+        """Connection to the disk tier, reopened after a fork; lock held"""
+        if self.disk_path is None:
+            return None
+        if self._disk is None or self._disk_pid != os.getpid():
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.disk_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)'
+            )
+            self._disk = conn
+            self._disk_pid = os.getpid()
+        return self._disk
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        try:
+            row = self._disk_connection().execute(
+                'SELECT expires_at, value FROM responses WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+        except sqlite3.Error as error:
+            print(f'Error reading AI response cache: {error}')
+            return None
+        return (row[0], row[1]) if row else None
+
+    def _disk_put(self, key: str, expires_at: float, value: str, now: float):
+        try:
+            conn = self._disk_connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, expires_at, value) VALUES (?, ?, ?)',
+                (key, expires_at, value)
+            )
+            conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+        except sqlite3.Error as error:
+            # The disk tier is an optimization; never fail the request over it
+            print(f'Error writing AI response cache: {error}')
+
+    # ---- Public API -------------------------------------------------------
+
+    def get(self, key: str, operation: str = 'default') -> Optional[str]:
+        """Cached response for key, or None if absent or expired"""
+        now = time.time()
+        with self._lock:
+            stats = self._stats.setdefault(operation, Counter())
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    stats['hits'] += 1
+                    return entry[1]
+                del self._entries[key]
+
+            if self.disk_path is not None:
+                entry = self._disk_get(key, now)
+                if entry is not None:
+                    self._remember(key, entry)
+                    stats['hits'] += 1
+                    stats['diskHits'] += 1
+                    return entry[1]
+
+            stats['misses'] += 1
+            return None
+
+    def put(self, key: str, value: str, ttl: float):
+        """Store a response for ttl seconds"""
+        if ttl <= 0:
+            return
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, (expires_at, value))
+            if self.disk_path is not None:
+                self._disk_put(key, expires_at, value, now)
+
+    def _remember(self, key: str, entry: Tuple[float, str]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self.disk_path is not None:
+                try:
+                    self._disk_connection().execute('DELETE FROM responses')
+                except sqlite3.Error as error:
+                    print(f'Error clearing AI response cache: {error}')
+
+    def stats(self) -> Dict:
+        """Hit/miss counts per operation"""
+        with self._lock:
+            operations = {}
+            for operation, counts in self._stats.items():
+                lookups = counts['hits'] + counts['misses']
+                operations[operation] = {
+                    'hits': counts['hits'],
+                    'diskHits': counts['diskHits'],
+                    'misses': counts['misses'],
+                    'hitRate': round(counts['hits'] / lookups, 4) if lookups else 0.0
+                }
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'disk': str(self.disk_path) if self.disk_path else None,
+                'operations': operations
+            }
+
+
+def ttl_for(operation: Optional[str]) -> float:
+    """Cache lifetime for an operation; AI_CACHE_TTL_<OPERATION> overrides"""
+    if not operation or not CACHE_ENABLED:
+        return 0
+    override = os.getenv(f'AI_CACHE_TTL_{operation.upper()}')
+    if override is not None:
+        return float(override)
+    return CACHE_TTLS.get(operation, 0)
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('AI_CACHE_SIZE', '1000')),
+    disk_path=(
+        Path(os.getenv('AI_CACHE_PATH', DATA_DIR / 'ai_cache.db'))
+        if os.getenv('AI_CACHE_DISK', 'false').lower() == 'true' else None
+    )
+)
@@ -1,140 +1,610 @@
+import asyncio
+import contextvars
+import heapq
 import json
-import re
-import os
-from typing import Dict, List, Any
-from langchain_aws import ChatBedrock
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Type, Union
+from botocore.exceptions import ConnectTimeoutError, ReadTimeoutError
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.output_parsers import StrOutputParser
-
-# Initialize ChatBedrock model
-MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "us.anthropic.claude-sonnet-4-5-20250929-v1:0")
-llm = ChatBedrock(
-    model_id=MODEL_ID,
-    region_name=os.getenv("AWS_REGION", "us-east-1"),
-    model_kwargs={
-        "max_tokens": 2000,
-        "anthropic_version": "bedrock-2023-05-31"
-    }
+from pydantic import BaseModel, ValidationError
+from app.config.bedrock import MODEL_KWARGS, get_chat_model
+from app.models.todo import (
+    CompletionMessage,
+    ExecutionGuide,
+    ExecutionStep,
+    GeneratedTask,
+    InferredDependency,
+    PrioritySuggestion,
+    RecommendationAnalysis,
+    StaleEncouragement,
+    TaskClassification,
+    TaskEnrichment,
+)
+from app.services.ai_cache import cache_key, response_cache, ttl_for
+from app.services import todos_service
+from app.services.dependency_graph import InferenceQueue, dependency_graph, topological_order
+from app.services.model_routing import deadline_for, hedge_delay, model_for, model_metrics, tier_for
+from app.services.prompts import Prompt, render, system_blocks
+from app.utils.admission import Overloaded, bedrock_admission, latency_target_for, priority_for
+from app.utils.deadline import (
+    DeadlineExceeded,
+    acall_with_deadline,
+    call_with_deadline,
+    deadline_scope,
+    expired,
+    hedge_budget,
+    run_in_pool,
+    remaining,
+)
+from app.utils.json_stream import JsonStreamParser
+from app.utils.single_flight import AsyncSingleFlight, SingleFlight
+from app.utils.structured_output import (
+    StructuredOutputError,
+    extract_json,
+    parse_output,
+    schema_hint,
+    validate_value,
 )
 
 output_parser = StrOutputParser()
 
+# Bulk classification/prioritization: tasks accepted per request, estimated
+# input tokens of task data per model call, tasks per call (bounded by the
+# answer fitting in max_tokens), calls run at once, and re-queries of items
+# missing from or malformed in an answer
+MAX_BATCH_TASKS = 200
+BATCH_TOKEN_BUDGET = 3000
+MAX_TASKS_PER_CALL = 25
+BATCH_CONCURRENCY = 4
+MAX_BATCH_RETRIES = 2
+
+# Re-asks allowed when an answer cannot be parsed or repaired locally, and
+# how much of the broken answer is sent back with one
+MAX_REPAIR_ASKS = 1
+REPAIR_RESPONSE_CHARS = 6000
+
+# Identical invocations in flight at the same time share one upstream call
+in_flight = SingleFlight()
+async_in_flight = AsyncSingleFlight()
+
+
+def _llm(tier: str):
+    """ChatBedrock for a routing tier, over the shared client"""
+    return get_chat_model(model_for(tier))
+
+
+def _split(prompt: Union[str, Prompt], system_message: Optional[str]) -> Tuple[str, Optional[str]]:
+    """User text and system message of a raw prompt or a rendered template"""
+    if isinstance(prompt, Prompt):
+        return prompt.text, prompt.system
+    return prompt, system_message
+
+
+def _messages(prompt: str, system_message: str = None) -> List:
+    """System message (the static template part) followed by the user message"""
+    messages = []
+    if system_message:
+        messages.append(SystemMessage(content=system_blocks(system_message)))
+    messages.append(HumanMessage(content=prompt))
+    return messages
+
+
+def _usage(message: Any) -> Dict[str, int]:
+    """Token usage of a LangChain message in the Anthropic response shape"""
+    usage = getattr(message, 'usage_metadata', None) or {}
+    details = usage.get('input_token_details') or {}
+    return {
+        'input_tokens': usage.get('input_tokens', 0),
+        'cache_read_input_tokens': details.get('cache_read') or 0,
+        'cache_creation_input_tokens': details.get('cache_creation') or 0,
+        'output_tokens': usage.get('output_tokens', 0)
+    }
 
-def invoke_model(prompt: str, system_message: str = None) -> str:
-    """Invoke Claude model via AWS Bedrock using LangChain"""
-    try:
-        messages = []
-        if system_message:
-            messages.append(SystemMessage(content=system_message))
-        messages.append(HumanMessage(content=prompt))
 
-        # LangChain automatically handles tracing when instrumented
-        response = llm.invoke(messages)
-        return output_parser.invoke(response)
+def _cached(key: str, operation: Optional[str], ttl: float) -> Optional[str]:
+    return response_cache.get(key, operation) if ttl else None
+
 
+def _remember(key: str, text: str, ttl: float, validate: Optional[Callable[[str], Any]]):
+    """Cache a fresh answer once the caller's validator accepts it"""
+    if not ttl:
+        return
+    try:
+        if validate:
+            validate(text)
+        response_cache.put(key, text, ttl)
+    except Exception:
+        pass
+
+
+def invoke_model(
+    prompt: Union[str, Prompt],
+    system_message: str = None,
+    operation: Optional[str] = None,
+    validate: Optional[Callable[[str], Any]] = None,
+    tier: Optional[str] = None
+) -> str:
+    """Invoke Claude model via AWS Bedrock using LangChain.
+
+    The model is the one routed for the operation unless `tier` is given.
+    Responses of operations with a cache TTL are reused for identical
+    prompts. `validate` must accept the response text before it is cached,
+    so a malformed answer is not served again. Identical calls already in
+    flight are joined instead of sent again.
+
+    The call is bounded by the operation's deadline (or a tighter one
+    already in effect) and, for hedged operations, a second request is
+    sent once the first is slower than the route's p95.
+    """
+    prompt, system_message = _split(prompt, system_message)
+    tier = tier or tier_for(operation)
+    key = cache_key(model_for(tier), system_message, prompt, MODEL_KWARGS)
+    ttl = ttl_for(operation)
+    cached = _cached(key, operation, ttl)
+    if cached is not None:
+        return cached
+
+    def attempt() -> str:
+        with bedrock_admission.slot(priority_for(operation), latency_target_for(operation)):
+            if expired():
+                # The caller gave up while this attempt was queued
+                raise DeadlineExceeded()
+            started = time.monotonic()
+            try:
+                # LangChain automatically handles tracing when instrumented
+                message = _llm(tier).invoke(_messages(prompt, system_message))
+            except Exception:
+                model_metrics.failed(operation, tier)
+                raise
+            model_metrics.record(operation, tier, time.monotonic() - started, _usage(message))
+        return output_parser.invoke(message)
+
+    def call() -> str:
+        try:
+            text = call_with_deadline(attempt, remaining(), hedge_delay(operation, tier), hedge_budget)
+        except (DeadlineExceeded, Overloaded):
+            raise
+        except (ConnectTimeoutError, ReadTimeoutError):
+            # Bedrock did not answer within the client's socket timeouts
+            raise DeadlineExceeded() from None
+        except Exception as error:
+            print(f'Bedrock API Error: {error}')
+            raise Exception('AWS Bedrockサービスでエラーが発生しました')
+        _remember(key, text, ttl, validate)
+        return text
+
+    # A caller joining an identical call waits only until its own deadline
+    try:
+        with deadline_scope(deadline_for(operation)):
+            return in_flight.do(key, call, remaining())
+    except (DeadlineExceeded, TimeoutError):
+        model_metrics.count('timeouts', operation)
+        raise DeadlineExceeded() from None
+
+
+async def ainvoke_model(
+    prompt: Union[str, Prompt],
+    system_message: str = None,
+    operation: Optional[str] = None,
+    validate: Optional[Callable[[str], Any]] = None,
+    tier: Optional[str] = None
+) -> str:
+    """Async invoke_model; same routing, caching and deadlines.
+
+    Waiting for admission, for an identical call in flight or for a hedge
+    holds no thread. The Bedrock request itself is blocking and runs on the
+    call pool (AI_CALL_THREADS), which caps calls in flight per process.
+    """
+    prompt, system_message = _split(prompt, system_message)
+    tier = tier or tier_for(operation)
+    key = cache_key(model_for(tier), system_message, prompt, MODEL_KWARGS)
+    ttl = ttl_for(operation)
+    cached = _cached(key, operation, ttl)
+    if cached is not None:
+        return cached
+
+    async def attempt() -> str:
+        async with bedrock_admission.aslot(priority_for(operation), latency_target_for(operation)):
+            if expired():
+                raise DeadlineExceeded()
+            started = time.monotonic()
+            try:
+                # ChatBedrock has no native async call (its ainvoke borrows the
+                # loop's default executor), so run it on the sized call pool
+                message = await run_in_pool(_llm(tier).invoke, _messages(prompt, system_message))
+            except Exception:
+                model_metrics.failed(operation, tier)
+                raise
+            model_metrics.record(operation, tier, time.monotonic() - started, _usage(message))
+        return output_parser.invoke(message)
+
+    async def call() -> str:
+        try:
+            text = await acall_with_deadline(attempt, remaining(), hedge_delay(operation, tier), hedge_budget)
+        except (DeadlineExceeded, Overloaded):
+            raise
+        except (ConnectTimeoutError, ReadTimeoutError):
+            raise DeadlineExceeded() from None
+        except Exception as error:
+            print(f'Bedrock API Error: {error}')
+            raise Exception('AWS Bedrockサービスでエラーが発生しました')
+        _remember(key, text, ttl, validate)
+        return text
+
+    try:
+        with deadline_scope(deadline_for(operation)):
+            return await async_in_flight.do(key, call, remaining())
+    except (DeadlineExceeded, TimeoutError):
+        model_metrics.count('timeouts', operation)
+        raise DeadlineExceeded() from None
+
+
+def _stream_llm(
+    prompt: Union[str, Prompt],
+    system_message: str = None,
+    operation: Optional[str] = None
+) -> Iterator[str]:
+    """Yield the model's answer text as it is generated"""
+    prompt, system_message = _split(prompt, system_message)
+    tier = tier_for(operation)
+    try:
+        with bedrock_admission.slot(priority_for(operation)) as slot:
+            started = time.monotonic()
+            usage: Dict[str, int] = {}
+            for chunk in _llm(tier).stream(_messages(prompt, system_message)):
+                # Judge upstream latency by the first token, not the whole stream
+                slot.first_byte()
+                for name, count in _usage(chunk).items():
+                    usage[name] = usage.get(name, 0) + count
+                text = output_parser.invoke(chunk)
+                if text:
+                    yield text
+            model_metrics.record(operation, tier, time.monotonic() - started, usage)
+    except Overloaded:
+        raise
     except Exception as error:
+        model_metrics.failed(operation, tier)
         print(f'Bedrock API Error: {error}')
         raise Exception('AWS Bedrockサービスでエラーが発生しました')
 
 
+def _stream_items(
+    prompt: Prompt,
+    items_path: Tuple[str, ...],
+    schema: Any,
+    item_schema: Any,
+    operation: Optional[str] = None
+) -> Iterator[Tuple[str, Any]]:
+    """Yield ('item', object) per array item as it closes, then ('done', document).
+
+    A cached answer is replayed at once; a streamed one is cached after it
+    validated. Items are validated as they arrive. If the stream turns
+    malformed, the items it did not deliver are taken from the repaired
+    final document instead.
+    """
+    key = cache_key(model_for(tier_for(operation)), prompt.system, prompt.text, MODEL_KWARGS)
+    ttl = ttl_for(operation)
+    cached = _cached(key, operation, ttl)
+    chunks = [cached] if cached is not None else _stream_llm(prompt, operation=operation)
+
+    parser = JsonStreamParser(items_path)
+    received = []
+    sent = 0
+    streaming = True
+    for chunk in chunks:
+        received.append(chunk)
+        if not streaming:
+            continue
+        try:
+            for item in parser.feed(chunk):
+                item = validate_value(item, item_schema)
+                sent += 1
+                yield 'item', item
+        except ValueError:
+            # StructuredOutputError included; the rest comes from the repair
+            streaming = False
+
+    response = ''.join(received)
+    document = _structured(response, schema)
+    items = document
+    for name in items_path:
+        items = items[name]
+    for item in items[sent:]:
+        yield 'item', item
+
+    if cached is None:
+        _remember(key, response, ttl, _validator(schema))
+    yield 'done', document
+
+
+def _validator(schema: Any) -> Callable[[str], Any]:
+    """Cache validator accepting answers that parse into the schema"""
+    return lambda response: parse_output(response, schema)
+
+
+def _repair_prompt(response: str, schema: Any, error: Exception) -> Prompt:
+    return render(
+        'repair_output',
+        schema=schema_hint(schema),
+        error=str(error)[:500],
+        response=response[:REPAIR_RESPONSE_CHARS]
+    )
+
+
+def _parse_failed(response: str):
+    print(f'Failed to parse AI response: {response}')
+    raise Exception('AI応答の解析に失敗しました')
+
+
+def _structured(response: str, schema: Any) -> Any:
+    """Parse an answer into the schema, repairing it locally if possible.
+
+    Only an answer that cannot be repaired goes back to the model, as a
+    short fix-this-JSON prompt without the original instructions, at most
+    MAX_REPAIR_ASKS times.
+    """
+    try:
+        return parse_output(response, schema)
+    except StructuredOutputError as error:
+        problem = error
+    for _ in range(MAX_REPAIR_ASKS):
+        print(f'Re-asking for a malformed AI response: {problem}')
+        response = invoke_model(_repair_prompt(response, schema, problem), operation='repair_output')
+        try:
+            return parse_output(response, schema)
+        except StructuredOutputError as error:
+            problem = error
+    _parse_failed(response)
+
+
+async def _astructured(response: str, schema: Any) -> Any:
+    """Async _structured"""
+    try:
+        return parse_output(response, schema)
+    except StructuredOutputError as error:
+        problem = error
+    for _ in range(MAX_REPAIR_ASKS):
+        print(f'Re-asking for a malformed AI response: {problem}')
+        response = await ainvoke_model(_repair_prompt(response, schema, problem), operation='repair_output')
+        try:
+            return parse_output(response, schema)
+        except StructuredOutputError as error:
+            problem = error
+    _parse_failed(response)
+
+
+def _generate(prompt: Prompt, schema: Any, operation: str) -> Any:
+    """Ask the operation's model for an answer matching schema.
+
+    A fast-tier answer that does not validate even after local repair is
+    asked again on the strong tier before falling back to a re-ask. All
+    of it shares the operation's deadline.
+    """
+    tier = tier_for(operation)
+    with deadline_scope(deadline_for(operation)):
+        response = invoke_model(prompt, operation=operation, validate=_validator(schema), tier=tier)
+        if tier != 'strong':
+            try:
+                return parse_output(response, schema)
+            except StructuredOutputError as error:
+                print(f'Escalating {operation} to the strong model: {error}')
+                model_metrics.count('escalations', operation)
+                response = invoke_model(prompt, operation=operation, validate=_validator(schema), tier='strong')
+        return _structured(response, schema)
+
+
+async def _agenerate(prompt: Prompt, schema: Any, operation: str) -> Any:
+    """Async _generate"""
+    tier = tier_for(operation)
+    with deadline_scope(deadline_for(operation)):
+        response = await ainvoke_model(prompt, operation=operation, validate=_validator(schema), tier=tier)
+        if tier != 'strong':
+            try:
+                return parse_output(response, schema)
+            except StructuredOutputError as error:
+                print(f'Escalating {operation} to the strong model: {error}')
+                model_metrics.count('escalations', operation)
+                response = await ainvoke_model(prompt, operation=operation, validate=_validator(schema), tier='strong')
+        return await _astructured(response, schema)
+
+
+def _tasks_prompt(user_input: str) -> Prompt:
+    return render('generate_tasks', user_input=user_input)
+
+
 def generate_tasks(user_input: str) -> List[Dict]:
     """Generate tasks from user description"""
-    prompt = f"""あなたは便利なタスク管理アシスタントです。ユーザーの目標に基づいて、3〜7個の具体的で実行可能なタスクのリストを生成してください。
+    return _generate(_tasks_prompt(user_input), List[GeneratedTask], 'generate_tasks')
 
-ユーザーの目標: "{user_input}"
 
-以下のJSON形式でタスクを生成してください：
-[
-  {{
-    "title": "タスクのタイトル",
-    "description": "簡潔な説明",
-    "estimatedCategory": "カテゴリ",
-    "estimatedPriority": "優先度"
-  }}
-]
+async def agenerate_tasks(user_input: str) -> List[Dict]:
+    """Async generate_tasks"""
+    return await _agenerate(_tasks_prompt(user_input), List[GeneratedTask], 'generate_tasks')
 
-カテゴリ: work（仕事）, personal（個人）, shopping（買い物）, health（健康）, other（その他）
-優先度: low（低）, medium（中）, high（高）, urgent（緊急）
 
-JSON配列のみを返してください。追加のテキストは不要です。"""
+def stream_tasks(user_input: str) -> Iterator[Tuple[str, Any]]:
+    """Stream generated tasks: ('task', task) for each, then ('done', tasks)"""
+    for event, value in _stream_items(
+        _tasks_prompt(user_input), (), List[GeneratedTask], GeneratedTask, operation='generate_tasks'
+    ):
+        yield ('task' if event == 'item' else event), value
 
-    response = invoke_model(prompt)
 
-    try:
-        cleaned_response = re.sub(r'```json\n?', '', response)
-        cleaned_response = re.sub(r'```\n?', '', cleaned_response).strip()
-        tasks = json.loads(cleaned_response)
-        return tasks
-    except Exception as error:
-        print(f'Failed to parse AI response: {response}')
-        raise Exception('AI応答の解析に失敗しました')
+def _classify_prompt(title: str, description: str) -> Prompt:
+    return render('classify_task', title=title, description=description)
 
 
 def classify_task(title: str, description: str = '') -> Dict:
     """Classify task and suggest tags"""
-    prompt = f"""このタスクを分析して、最も適切なカテゴリと関連するタグを提案してください。
+    prompt = _classify_prompt(title, description)
+    return _generate(prompt, TaskClassification, 'classify_task')
 
-タスクのタイトル: "{title}"
-タスクの説明: "{description}"
 
-カテゴリ: work（仕事）, personal（個人）, shopping（買い物）, health（健康）, other（その他）
+async def aclassify_task(title: str, description: str = '') -> Dict:
+    """Async classify_task"""
+    prompt = _classify_prompt(title, description)
+    return await _agenerate(prompt, TaskClassification, 'classify_task')
 
-以下のJSON形式で応答してください：
-{{
-  "category": "提案されたカテゴリ",
-  "tags": ["タグ1", "タグ2", "タグ3"],
-  "reasoning": "簡単な説明"
-}}
 
-JSON のみを返してください。"""
+def _deadline_text(deadline: Optional[str]) -> str:
+    return f"期限: {deadline}" if deadline else ""
 
-    response = invoke_model(prompt)
 
-    try:
-        cleaned_response = re.sub(r'```json\n?', '', response)
-        cleaned_response = re.sub(r'```\n?', '', cleaned_response).strip()
-        result = json.loads(cleaned_response)
-        return result
-    except Exception as error:
-        print(f'Failed to parse AI response: {response}')
-        raise Exception('AI応答の解析に失敗しました')
+def _priority_prompt(title: str, description: str, deadline: str = None) -> Prompt:
+    return render('set_priority', title=title, description=description, deadline_text=_deadline_text(deadline))
 
 
 def set_priority(title: str, description: str = '', deadline: str = None) -> Dict:
     """Set task priority based on content and deadline"""
-    deadline_text = f"期限: {deadline}" if deadline else ""
+    prompt = _priority_prompt(title, description, deadline)
+    return _generate(prompt, PrioritySuggestion, 'set_priority')
+
+
+async def aset_priority(title: str, description: str = '', deadline: str = None) -> Dict:
+    """Async set_priority"""
+    prompt = _priority_prompt(title, description, deadline)
+    return await _agenerate(prompt, PrioritySuggestion, 'set_priority')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about one per Japanese character, four ASCII chars"""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+
+
+def _chunk_tasks(tasks: List[Dict]) -> List[List[Dict]]:
+    """Split tasks into calls that fit the token budget and answer size"""
+    chunks = []
+    chunk = []
+    used = 0
+    for task in tasks:
+        cost = estimate_tokens(json.dumps(task, ensure_ascii=False))
+        if chunk and (used + cost > BATCH_TOKEN_BUDGET or len(chunk) >= MAX_TASKS_PER_CALL):
+            chunks.append(chunk)
+            chunk = []
+            used = 0
+        chunk.append(task)
+        used += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _batch_tasks(tasks: List[Dict], fields: Tuple[str, ...]) -> List[Dict]:
+    """Validate bulk input and keep only the fields the prompt needs"""
+    if not isinstance(tasks, list) or not tasks:
+        raise ValueError('タスクリストを提供してください')
+    if len(tasks) > MAX_BATCH_TASKS:
+        raise ValueError(f'タスクは最大 {MAX_BATCH_TASKS} 件までです')
+
+    seen = set()
+    prepared = []
+    for task in tasks:
+        if not isinstance(task, dict) or not task.get('id') or not str(task.get('title', '')).strip():
+            raise ValueError('各タスクに id と title を指定してください')
+        task_id = str(task['id'])
+        if task_id in seen:
+            raise ValueError(f'id が重複しています: {task_id}')
+        seen.add(task_id)
+        prepared.append({'id': task_id, **{f: task[f] for f in fields if task.get(f)}})
+    return prepared
+
+
+def _analyze_in_batches(
+    tasks: List[Dict],
+    build_prompt: Callable[[List[Dict]], Prompt],
+    schema: Type[BaseModel],
+    operation: str
+) -> Dict:
+    """Run a per-task analysis over many tasks with few model calls.
+
+    Tasks are packed into prompts by id. Each answer item is validated
+    against the schema; only ids that an answer left out or got wrong are
+    asked again, up to MAX_BATCH_RETRIES times, on the strong tier. Tasks
+    of a call that failed outright are not retried, and Overloaded or
+    DeadlineExceeded from any call ends the whole request (503/504), since
+    retrying would only add load. Returns {'results': [...], 'failed': [ids]}.
+    """
+    results: Dict[str, Dict] = {}
+    gave_up: Set[str] = set()
+    pending = list(tasks)
+    tier = tier_for(operation)
+
+    def run(chunk: List[Dict]) -> Optional[List[Dict]]:
+        """Answer items of a chunk, or None if the call itself failed"""
+        try:
+            response = invoke_model(build_prompt(chunk), operation=operation, tier=tier)
+        except (Overloaded, DeadlineExceeded):
+            raise
+        except Exception as error:
+            print(f'Batch analysis failed for {len(chunk)} tasks: {error}')
+            return None
+        try:
+            answer = extract_json(response)
+        except StructuredOutputError:
+            return []
+        return answer if isinstance(answer, list) else []
+
+    with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+        for _ in range(1 + MAX_BATCH_RETRIES):
+            if not pending:
+                break
+            wanted = {task['id'] for task in pending}
+            chunks = _chunk_tasks(pending)
+            futures = [pool.submit(run, chunk) for chunk in chunks]
+            try:
+                answers = [future.result() for future in futures]
+            except (Overloaded, DeadlineExceeded):
+                for future in futures:
+                    future.cancel()
+                raise
+            for chunk, answer in zip(chunks, answers):
+                if answer is None:
+                    gave_up.update(task['id'] for task in chunk)
+                    continue
+                for item in answer:
+                    if not isinstance(item, dict) or str(item.get('id')) not in wanted:
+                        continue
+                    try:
+                        results[str(item['id'])] = {'id': str(item['id']), **schema.model_validate(item).model_dump()}
+                    except ValidationError:
+                        pass
+            pending = [task for task in pending if task['id'] not in results and task['id'] not in gave_up]
+            if pending and tier != 'strong':
+                model_metrics.count('escalations', operation)
+                tier = 'strong'
+
+    return {
+        'results': [results[task['id']] for task in tasks if task['id'] in results],
+        'failed': [task['id'] for task in tasks if task['id'] not in results]
+    }
 
-    prompt = f"""このタスクを分析して、適切な優先度を提案してください。
 
-タスクのタイトル: "{title}"
-タスクの説明: "{description}"
-{deadline_text}
+def classify_tasks(tasks: List[Dict]) -> Dict:
+    """Classify many tasks and suggest tags, several per model call"""
+    tasks = _batch_tasks(tasks, ('title', 'description'))
 
-優先度レベル:
-- urgent（緊急）: 重要で即座に対応が必要
-- high（高）: 重要で早めに対応が必要
-- medium（中）: 比較的早めに対応すべき
-- low（低）: いつでも対応可能
+    def build_prompt(chunk: List[Dict]) -> Prompt:
+        return render('classify_tasks', tasks=json.dumps(chunk, ensure_ascii=False))
 
-以下のJSON形式で応答してください：
-{{
-  "priority": "優先度レベル",
-  "reasoning": "この優先度を選択した理由の簡単な説明",
-  "urgencyFactors": ["要因1", "要因2"]
-}}
+    return _analyze_in_batches(tasks, build_prompt, TaskClassification, 'classify_tasks')
 
-JSONのみを返してください。"""
 
-    response = invoke_model(prompt)
+def set_priorities(tasks: List[Dict]) -> Dict:
+    """Suggest priorities for many tasks, several per model call"""
+    tasks = _batch_tasks(tasks, ('title', 'description', 'deadline'))
 
-    try:
-        cleaned_response = re.sub(r'```json\n?', '', response)
-        cleaned_response = re.sub(r'```\n?', '', cleaned_response).strip()
-        result = json.loads(cleaned_response)
-        return result
-    except Exception as error:
-        print(f'Failed to parse AI response: {response}')
-        raise Exception('AI応答の解析に失敗しました')
+    def build_prompt(chunk: List[Dict]) -> Prompt:
+        return render('set_priorities', tasks=json.dumps(chunk, ensure_ascii=False))
+
+    return _analyze_in_batches(tasks, build_prompt, PrioritySuggestion, 'set_priorities')
+
+
+def _execution_guide_prompt(title: str, description: str, category: str, priority: str) -> Prompt:
+    return render('generate_execution_guide', title=title, description=description, category=category, priority=priority)
 
 
 def generate_execution_guide(
@@ -144,81 +614,165 @@ def generate_execution_guide(
     priority: str = 'medium'
 ) -> Dict:
     """Generate step-by-step execution guide"""
-    prompt = f"""あなたは実用的なタスク管理アシスタントです。以下のタスクを完了するための具体的な実行手順を生成してください。
-
-タスクのタイトル: "{title}"
-タスクの説明: "{description}"
-カテゴリ: {category}
-優先度: {priority}
-
-以下のJSON形式で、ステップバイステップの実行手順を生成してください：
-{{
-  "steps": [
-    {{
-      "stepNumber": 1,
-      "instruction": "具体的な手順の説明",
-      "estimatedTime": "推定所要時間（例: 5分、30分、1時間）",
-      "tips": "役立つヒントやアドバイス"
-    }}
-  ],
-  "totalEstimatedTime": "全体の推定所要時間",
-  "prerequisites": ["事前に必要なこと1", "事前に必要なこと2"],
-  "successCriteria": "このタスクが完了したと判断できる基準"
-}}
-
-要件:
-- 3〜7個のステップに分解してください
-- 各ステップは具体的で実行可能であること
-- 時間の見積もりは現実的であること
-- ヒントは実用的で役立つこと
-
-JSONのみを返してください。"""
-
-    response = invoke_model(prompt)
+    prompt = _execution_guide_prompt(title, description, category, priority)
+    return _generate(prompt, ExecutionGuide, 'generate_execution_guide')
 
-    try:
-        cleaned_response = re.sub(r'```json\n?', '', response)
-        cleaned_response = re.sub(r'```\n?', '', cleaned_response).strip()
-        result = json.loads(cleaned_response)
-        return result
-    except Exception as error:
-        print(f'Failed to parse AI response: {response}')
-        raise Exception('AI応答の解析に失敗しました')
+
+async def agenerate_execution_guide(
+    title: str,
+    description: str = '',
+    category: str = 'other',
+    priority: str = 'medium'
+) -> Dict:
+    """Async generate_execution_guide"""
+    prompt = _execution_guide_prompt(title, description, category, priority)
+    return await _agenerate(prompt, ExecutionGuide, 'generate_execution_guide')
+
+
+def _enrich_prompt(title: str, description: str, deadline: str = None, include_guide: bool = False) -> Prompt:
+    return render(
+        'enrich_task_with_guide' if include_guide else 'enrich_task',
+        title=title,
+        description=description,
+        deadline_text=_deadline_text(deadline)
+    )
+
+
+def _merge_enrichment(classification: Dict, priority: Dict, guide: Optional[Dict]) -> Dict:
+    return {
+        'category': classification['category'],
+        'tags': classification['tags'],
+        'priority': priority['priority'],
+        'urgencyFactors': priority['urgencyFactors'],
+        'reasoning': ' '.join(r for r in (classification['reasoning'], priority['reasoning']) if r),
+        'executionGuide': guide
+    }
+
+
+def enrich_task(
+    title: str,
+    description: str = '',
+    deadline: str = None,
+    include_guide: bool = False,
+    parallel: bool = False
+) -> Dict:
+    """Category, tags, priority and optionally a guide for a new task.
+
+    One structured call answers everything. If that answer cannot be used
+    (or parallel=True), classification, priority and guide run as separate
+    calls at the same time, so the latency is still about one call. Every
+    call shares the enrich_task deadline.
+    """
+    with deadline_scope(deadline_for('enrich_task')):
+        if not parallel:
+            try:
+                prompt = _enrich_prompt(title, description, deadline, include_guide)
+                result = _generate(prompt, TaskEnrichment, 'enrich_task')
+                if include_guide and result['executionGuide'] is None:
+                    result['executionGuide'] = generate_execution_guide(
+                        title, description, result['category'], result['priority']
+                    )
+                return result
+            except (Overloaded, DeadlineExceeded):
+                raise
+            except Exception as error:
+                print(f'Combined enrichment failed, running the steps separately: {error}')
+
+        # Each step runs in a copy of this context, so the deadline applies
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            classification = pool.submit(contextvars.copy_context().run, classify_task, title, description)
+            priority = pool.submit(contextvars.copy_context().run, set_priority, title, description, deadline)
+            guide = pool.submit(
+                contextvars.copy_context().run, generate_execution_guide, title, description
+            ) if include_guide else None
+            return _merge_enrichment(
+                classification.result(),
+                priority.result(),
+                guide.result() if guide else None
+            )
+
+
+async def aenrich_task(
+    title: str,
+    description: str = '',
+    deadline: str = None,
+    include_guide: bool = False,
+    parallel: bool = False
+) -> Dict:
+    """Async enrich_task"""
+    with deadline_scope(deadline_for('enrich_task')):
+        if not parallel:
+            try:
+                prompt = _enrich_prompt(title, description, deadline, include_guide)
+                result = await _agenerate(prompt, TaskEnrichment, 'enrich_task')
+                if include_guide and result['executionGuide'] is None:
+                    result['executionGuide'] = await agenerate_execution_guide(
+                        title, description, result['category'], result['priority']
+                    )
+                return result
+            except (Overloaded, DeadlineExceeded):
+                raise
+            except Exception as error:
+                print(f'Combined enrichment failed, running the steps separately: {error}')
+
+        steps = [aclassify_task(title, description), aset_priority(title, description, deadline)]
+        if include_guide:
+            steps.append(agenerate_execution_guide(title, description))
+        results = await asyncio.gather(*steps)
+        return _merge_enrichment(results[0], results[1], results[2] if include_guide else None)
+
+
+def stream_execution_guide(
+    title: str,
+    description: str = '',
+    category: str = 'other',
+    priority: str = 'medium'
+) -> Iterator[Tuple[str, Any]]:
+    """Stream an execution guide: ('step', step) for each, then ('done', guide)"""
+    prompt = _execution_guide_prompt(title, description, category, priority)
+    for event, value in _stream_items(
+        prompt, ('steps',), ExecutionGuide, ExecutionStep, operation='generate_execution_guide'
+    ):
+        yield ('step' if event == 'item' else event), value
+
+
+def _completion_message_prompt(title: str, description: str, category: str) -> Prompt:
+    return render('generate_completion_message', title=title, description=description, category=category)
 
 
 def generate_completion_message(title: str, description: str = '', category: str = 'other') -> Dict:
     """Generate completion celebration message"""
-    prompt = f"""あなたは励ましとモチベーションを高めるアシスタントです。ユーザーがタスクを完了しました。心から祝福するメッセージを生成してください。
+    prompt = _completion_message_prompt(title, description, category)
+    return _generate(prompt, CompletionMessage, 'generate_completion_message')
 
-タスクのタイトル: "{title}"
-タスクの説明: "{description}"
-カテゴリ: {category}
 
-以下のJSON形式で応答してください：
-{{
-  "message": "タスク完了を祝福する短いメッセージ（1-2文）",
-  "encouragement": "さらなる励ましの言葉や次への動機づけ（1-2文）",
-  "emoji": "適切な絵文字1つ（🎉、🎊、⭐、🏆、💪など）"
-}}
+async def agenerate_completion_message(title: str, description: str = '', category: str = 'other') -> Dict:
+    """Async generate_completion_message"""
+    prompt = _completion_message_prompt(title, description, category)
+    return await _agenerate(prompt, CompletionMessage, 'generate_completion_message')
 
-要件:
-- メッセージは明るく前向きで、達成感を感じさせること
-- カテゴリに応じた適切な表現を使うこと
-- 簡潔で読みやすいこと
-- 絵文字は1つだけ
 
-JSONのみを返してください。"""
+def _stale_tasks_prompt(stale_tasks: List[Dict]) -> Prompt:
+    return render('detect_stale_tasks', stale_tasks=json.dumps(stale_tasks, ensure_ascii=False, indent=2))
 
-    response = invoke_model(prompt)
 
-    try:
-        cleaned_response = re.sub(r'```json\n?', '', response)
-        cleaned_response = re.sub(r'```\n?', '', cleaned_response).strip()
-        result = json.loads(cleaned_response)
-        return result
-    except Exception as error:
-        print(f'Failed to parse AI response: {response}')
-        raise Exception('AI応答の解析に失敗しました')
+def _stale_encouragement_prompt(stale_tasks: List[Dict], wanted_ids: List[str]) -> Prompt:
+    return render(
+        'stale_encouragement',
+        stale_tasks=json.dumps(stale_tasks, ensure_ascii=False),
+        wanted_ids=json.dumps(wanted_ids, ensure_ascii=False)
+    )
+
+
+def generate_stale_encouragement(stale_tasks: List[Dict], wanted_ids: List[str]) -> Dict:
+    """Encouragement for stale tasks; per-task messages only for wanted_ids"""
+    result = _generate(_stale_encouragement_prompt(stale_tasks, wanted_ids), StaleEncouragement, 'detect_stale_tasks')
+    messages = result['taskMessages']
+    return {
+        'overallMessage': result['overallMessage'],
+        'taskMessages': {task_id: messages[task_id] for task_id in wanted_ids if messages.get(task_id)},
+        'actionSuggestion': result['actionSuggestion']
+    }
 
 
 def detect_stale_tasks(todos: List[Dict]) -> Dict:
@@ -252,100 +806,240 @@ def detect_stale_tasks(todos: List[Dict]) -> Dict:
             'actionSuggestion': ''
         }
 
-    prompt = f"""あなたは優しく励ますタスク管理アシスタントです。以下の停滞しているタスクについて、前向きな励ましメッセージを生成してください。
+    result = _generate(_stale_tasks_prompt(stale_tasks), StaleEncouragement, 'detect_stale_tasks')
+    return {
+        'staleTasks': [t['id'] for t in stale_tasks],
+        'overallMessage': result['overallMessage'],
+        'taskMessages': result['taskMessages'],
+        'actionSuggestion': result['actionSuggestion']
+    }
 
-停滞タスク:
-{json.dumps(stale_tasks, ensure_ascii=False, indent=2)}
 
-以下のJSON形式で応答してください：
-{{
-  "overallMessage": "全体的な励ましメッセージ（2-3文）",
-  "taskMessages": {{
-    "タスクID1": "そのタスク固有の励ましメッセージ（1-2文）",
-    "タスクID2": "そのタスク固有の励ましメッセージ（1-2文）"
-  }},
-  "actionSuggestion": "次に取るべき具体的なアクションの提案（1-2文）"
-}}
+# Local recommendation rubric: points per priority, for not being blocked,
+# for blocking other tasks, and for having been open a while
+PRIORITY_POINTS = {'urgent': 30, 'high': 20, 'medium': 10, 'low': 5}
+UNBLOCKED_POINTS = 40
+BLOCKING_POINTS = 15
+OLD_TASK_POINTS = 10
+OLD_TASK_DAYS = 7
+
+# Candidates sent to the model with each request, other open tasks listed
+# as context when inferring dependencies, characters of description kept
+# per task, and recommendations returned
+RECOMMEND_CANDIDATES = 15
+DEPENDENCY_CONTEXT = 40
+RECOMMEND_DESCRIPTION_CHARS = 200
+RECOMMEND_LIMIT = 5
+
+
+def _timestamp(value: Optional[str], now: datetime) -> datetime:
+    """Parse an ISO timestamp as UTC; missing values count as now"""
+    if not value:
+        return now
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _base_score(todo: Dict, now: datetime) -> int:
+    """Rubric points that do not depend on other tasks"""
+    score = PRIORITY_POINTS.get(todo.get('priority'), PRIORITY_POINTS['medium'])
+    if (now - _timestamp(todo.get('createdAt'), now)).days >= OLD_TASK_DAYS:
+        score += OLD_TASK_POINTS
+    return score
+
+
+def _scores(base: Dict[str, int], prerequisites: Dict[str, Dict[str, str]]) -> Dict[str, int]:
+    """Base points plus the points for not waiting on and for blocking other tasks"""
+    blocking = {other for before in prerequisites.values() for other in before}
+    scores = {}
+    for task_id, score in base.items():
+        if not prerequisites.get(task_id):
+            score += UNBLOCKED_POINTS
+        if task_id in blocking:
+            score += BLOCKING_POINTS
+        scores[task_id] = score
+    return scores
+
+
+def _local_reason(todo: Dict, now: datetime) -> str:
+    labels = {'urgent': '緊急', 'high': '高', 'medium': '中', 'low': '低'}
+    parts = [f"優先度: {labels.get(todo.get('priority'), '中')}"]
+    if todo.get('deadline'):
+        parts.append(f"期限: {todo['deadline']}")
+    parts.append(f"作成から{(now - _timestamp(todo.get('createdAt'), now)).days}日経過")
+    return '、'.join(parts)
+
+
+def _summary(todo: Dict) -> Dict:
+    return {
+        'id': todo['id'],
+        'title': todo['title'],
+        'description': (todo.get('description') or '')[:RECOMMEND_DESCRIPTION_CHARS]
+    }
 
-要件:
-- 責めるような表現は避け、前向きで励ます内容にすること
-- タスクの停滞理由を推測し、具体的なアドバイスを含めること
-- 小さな一歩から始めることを提案すること
-- 明るく親しみやすいトーンで書くこと
 
-JSONのみを返してください。"""
+def _found(item: Dict, known: Set[str]) -> Dict:
+    """An inferred dependency restricted to known open tasks"""
+    return {
+        'dependsOn': [d for d in item['dependsOn'] if d in known],
+        'blocks': [d for d in item['blocks'] if d in known],
+        'reasoning': item['reasoning']
+    }
 
-    response = invoke_model(prompt)
 
-    try:
-        cleaned_response = re.sub(r'```json\n?', '', response)
-        cleaned_response = re.sub(r'```\n?', '', cleaned_response).strip()
-        result = json.loads(cleaned_response)
-        return {
-            'staleTasks': [t['id'] for t in stale_tasks],
-            'overallMessage': result['overallMessage'],
-            'taskMessages': result['taskMessages'],
-            'actionSuggestion': result['actionSuggestion']
-        }
-    except Exception as error:
-        print(f'Failed to parse AI response: {response}')
-        raise Exception('AI応答の解析に失敗しました')
+def _dependency_prompt(tasks: List[Dict], others: List[Dict]) -> Prompt:
+    return render(
+        'infer_dependencies',
+        tasks=json.dumps(tasks, ensure_ascii=False),
+        others=json.dumps(others, ensure_ascii=False)
+    )
+
+
+def _recommend_prompt(candidates: List[Dict], infer_ids: List[str], others: List[Dict]) -> Prompt:
+    return render(
+        'recommend_tasks',
+        candidates=json.dumps(candidates, ensure_ascii=False),
+        infer_ids=json.dumps(infer_ids, ensure_ascii=False),
+        others=json.dumps(others, ensure_ascii=False)
+    )
+
+
+def _infer_in_background(tasks: List[Dict]):
+    """Infer and record the dependencies of queued tasks (dependency_job worker).
+
+    The other open tasks of the store are listed by id and title, capped
+    at the DEPENDENCY_CONTEXT highest-scoring ones. Chunks are asked one
+    after another, each within the recommend_tasks deadline.
+    """
+    now = datetime.now(timezone.utc)
+    open_todos = todos_service.get_all_todos(completed=False)
+    context = heapq.nlargest(
+        DEPENDENCY_CONTEXT, open_todos, key=lambda t: (_base_score(t, now), t['id'])
+    )
+    known = {t['id'] for t in open_todos} | {t['id'] for t in tasks}
+    for chunk in _chunk_tasks([_summary(t) for t in tasks]):
+        ids = {t['id'] for t in chunk}
+        others = [{'id': t['id'], 'title': t['title']} for t in context if t['id'] not in ids]
+        inferred = {task_id: {} for task_id in ids}
+        for item in _generate(_dependency_prompt(chunk, others), List[InferredDependency], 'recommend_tasks'):
+            if item['id'] in ids:
+                inferred[item['id']] = _found(item, known)
+        # Pruning is left to requests, which know the tasks they were sent
+        dependency_graph.record([t for t in tasks if t['id'] in ids], inferred)
+
+
+# Dependencies of changed tasks outside the candidates, inferred one
+# small call at a time in the background
+dependency_job = InferenceQueue(_infer_in_background, MAX_TASKS_PER_CALL)
 
 
 def recommend_tasks(todos: List[Dict]) -> Dict:
-    """Recommend next tasks based on dependencies and priority"""
-    prompt = f"""あなたはタスク管理の専門アシスタントです。以下のタスクリストを分析して、依存関係を検出し、次に取り組むべきタスクを推薦してください。
-
-タスクリスト:
-{json.dumps(todos, ensure_ascii=False, indent=2)}
-
-以下のJSON形式で応答してください：
-{{
-  "recommendations": [
-    {{
-      "taskId": "タスクID",
-      "title": "タスクのタイトル",
-      "score": 0-100の数値,
-      "reason": "推薦理由（日本語）",
-      "blockedBy": []
-    }}
-  ],
-  "dependencies": [
-    {{
-      "taskId": "タスクID",
-      "dependsOn": ["依存するタスクID1", "依存するタスクID2"],
-      "reasoning": "依存関係の理由"
-    }}
-  ],
-  "insights": "全体的な分析結果やアドバイス"
-}}
-
-分析基準：
-1. 依存関係の検出：
-   - タスクのタイトルと説明を分析し、論理的な順序関係を特定
-   - 完了済みタスクは依存関係から除外
-
-2. 推薦スコアリング（優先順位）：
-   - ブロックされていない（依存タスクが完了済み）: +40点
-   - 優先度が高い（urgent=30, high=20, medium=10, low=5）
-   - 他のタスクに依存されている: +15点
-   - 作成日が古い: +10点
-   - 完了済み: -100点（除外）
-
-3. 推薦リスト：
-   - 上位5件のみ返す
-   - スコアの高い順にソート
-   - 未完了タスクのみ
-
-JSONのみを返してください。"""
-
-    response = invoke_model(prompt)
-
-    try:
-        cleaned_response = re.sub(r'```json\n?', '', response)
-        cleaned_response = re.sub(r'```\n?', '', cleaned_response).strip()
-        result = json.loads(cleaned_response)
-        return result
-    except Exception as error:
-        print(f'Failed to parse AI response: {response}')
-        raise Exception('AI応答の解析に失敗しました')
+    """Recommend next tasks based on dependencies and priority.
+
+    The scoring rubric, completed-task exclusion and ordering run locally
+    over the persisted dependency graph: a topological traversal of the
+    open tasks that always takes the best-scoring task that is not waiting
+    on another. One model call sees only the top candidates; it writes
+    their reasons and the insights, and infers the dependencies of the
+    candidates that are new or whose title/description changed. Other
+    changed tasks are queued for background inference and count as
+    unblocked until it lands. The whole request shares the recommend_tasks
+    deadline; past it (or on a failed call) the local ranking is returned
+    with generated reasons.
+    """
+    now = datetime.now(timezone.utc)
+    open_todos = [t for t in todos if not t.get('completed')]
+    if not open_todos:
+        return {'recommendations': [], 'dependencies': [], 'insights': ''}
+    by_id = {t['id']: t for t in open_todos}
+    base = {t['id']: _base_score(t, now) for t in open_todos}
+
+    with deadline_scope(deadline_for('recommend_tasks')):
+        outdated = {t['id'] for t in dependency_graph.outdated(open_todos)}
+        scores = _scores(base, dependency_graph.prerequisites(set(by_id)))
+        # Highest score first, older tasks first among equals, id as the final tiebreak
+        ranked = sorted(
+            open_todos,
+            key=lambda t: (-scores[t['id']], _timestamp(t.get('createdAt'), now).timestamp(), t['id'])
+        )
+        candidates = ranked[:RECOMMEND_CANDIDATES]
+        infer_now = [t for t in candidates if t['id'] in outdated]
+        dependency_job.schedule(t for t in ranked[RECOMMEND_CANDIDATES:] if t['id'] in outdated)
+
+        infer_ids = [t['id'] for t in infer_now]
+        others = [
+            {'id': t['id'], 'title': t['title']}
+            for t in ranked[RECOMMEND_CANDIDATES:RECOMMEND_CANDIDATES + DEPENDENCY_CONTEXT]
+        ] if infer_now else []
+        analysis = {}
+        try:
+            analysis = _generate(
+                _recommend_prompt(
+                    [{**_summary(t), 'priority': t.get('priority'), 'deadline': t.get('deadline')} for t in candidates],
+                    infer_ids,
+                    others
+                ),
+                RecommendationAnalysis,
+                'recommend_tasks'
+            )
+        except Overloaded:
+            raise
+        except Exception as error:
+            # The local ranking stands on its own; explanations are a bonus
+            print(f'Recommendation analysis failed, using local scores only: {error}')
+
+    if analysis and infer_now:
+        inferred = {task_id: {} for task_id in infer_ids}
+        for item in analysis['dependencies']:
+            if item['id'] in inferred:
+                inferred[item['id']] = _found(item, set(by_id))
+        # Prune only tasks gone from the store: a request may send a subset
+        dependency_graph.record(
+            infer_now,
+            inferred,
+            keep={t['id'] for t in todos_service.iter_todos()} | by_id.keys()
+        )
+
+    prerequisites = dependency_graph.prerequisites(set(by_id))
+    scores = _scores(base, prerequisites)
+    order = topological_order(by_id, prerequisites, scores.__getitem__, RECOMMEND_LIMIT)
+    reasons = analysis.get('reasons') or {}
+    recommendations = []
+    for task_id in order:
+        todo = by_id[task_id]
+        waiting_for = sorted(prerequisites.get(task_id, {}))
+        reason = reasons.get(task_id)
+        if not reason:
+            reason = _local_reason(todo, now)
+            dependents = sum(1 for before in prerequisites.values() if task_id in before)
+            if dependents:
+                reason += f'、{dependents}件のタスクの前提'
+            if waiting_for:
+                reason += '、' + '・'.join(f"「{by_id[d]['title']}」" for d in waiting_for) + 'の完了後に着手'
+        recommendations.append({
+            'taskId': task_id,
+            'title': todo['title'],
+            'score': scores[task_id],
+            'reason': reason,
+            'blockedBy': waiting_for
+        })
+
+    dependencies = [
+        {
+            'taskId': task_id,
+            'dependsOn': sorted(before),
+            'reasoning': ' / '.join(sorted({r for r in before.values() if r}))
+        }
+        for task_id, before in prerequisites.items()
+    ]
+    insights = analysis.get('insights')
+    if not insights:
+        ready = sum(1 for task_id in by_id if not prerequisites.get(task_id))
+        insights = f'未完了のタスク{len(by_id)}件のうち、{ready}件はすぐに着手できます。'
+        if dependencies:
+            insights += f'{len(dependencies)}件のタスクは他のタスクの完了を待っています。'
+    return {
+        'recommendations': recommendations,
+        'dependencies': dependencies,
+        'insights': insights
+    }
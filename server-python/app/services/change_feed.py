@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class ChangeFeed:
+    """Sequence-numbered todo change events kept in a bounded ring buffer.
+
+    Subscribers remember the last sequence number they saw and ask for
+    everything after it. When they fall further behind than the buffer
+    reaches back, since() returns None and they must refetch the list.
+    The epoch changes on every restart, so sequence numbers from an
+    earlier process are never mistaken for current ones.
+
+    The feed lives in process memory and only sees writes made by this
+    process: run the server with a single worker process. A subscriber
+    that reconnects to another process gets a reset, not its missed events.
+    """
+
+    def __init__(self, size: int = 1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=size)
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, event_type: str, **payload) -> int:
+        """Append an event and wake waiting subscribers"""
+        with self._condition:
+            self._seq += 1
+            self._events.append({'seq': self._seq, 'type': event_type, **payload})
+            self._condition.notify_all()
+            return self._seq
+
+    def since(self, seq: int) -> Optional[List[Dict]]:
+        """Events after seq, or None if some of them were already dropped"""
+        with self._condition:
+            if seq > self._seq:
+                return None
+            if seq == self._seq:
+                return []
+            oldest = self._events[0]['seq'] if self._events else self._seq + 1
+            if seq < oldest - 1:
+                return None
+            return [e for e in self._events if e['seq'] > seq]
+
+    def wait(self, seq: int, timeout: float) -> Optional[List[Dict]]:
+        """Block until there are events after seq or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._seq <= seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+        return self.since(seq)
+
+
+change_feed = ChangeFeed(size=int(os.getenv('TODO_CHANGE_FEED_SIZE', '1000')))
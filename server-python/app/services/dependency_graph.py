@@ -0,0 +1,230 @@
+import hashlib
+import heapq
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from app.storage.filelock import FileLock
+from app.storage.memory import file_signature
+
+DATA_DIR = Path(__file__).parent.parent.parent / 'data'
+
+# Seconds before tasks whose background inference failed are queued again
+RETRY_DELAY = 300.0
+
+
+def fingerprint(todo: Dict) -> str:
+    """Hash of the fields dependencies are inferred from"""
+    text = f"{todo.get('title', '')}\n{todo.get('description') or ''}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class DependencyGraph:
+    """Task dependencies inferred by the model, persisted as JSON.
+
+    Each task keeps what was inferred when its title/description last
+    changed: the tasks it depends on and the tasks that depend on it, plus
+    the fingerprint of the text the inference saw. Re-inferring a task
+    replaces only its own entry, so an edit never invalidates the rest of
+    the graph. The file is reloaded when another process replaced it.
+
+    Writers (gunicorn workers) take a cross-process file lock, reload the
+    file and merge their entries into it before replacing it, so workers
+    never drop each other's inferences. Readers need no file lock: the file
+    is only ever replaced atomically.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(self.path.with_name(self.path.name + '.lock'))
+        self._tasks: Dict[str, Dict] = {}
+        self._signature = None
+        self._loaded = False
+
+    def _sync(self):
+        """Load the file if it changed since it was last read (lock held)"""
+        signature = file_signature(self.path)
+        if self._loaded and signature == self._signature:
+            return
+        self._tasks = {}
+        if signature is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._tasks = json.load(f).get('tasks', {})
+            except (OSError, ValueError) as error:
+                print(f'Error reading dependency graph: {error}')
+        self._signature = signature
+        self._loaded = True
+
+    def _save(self):
+        """Atomically replace the graph file (lock held)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'tasks': self._tasks}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._signature = file_signature(self.path)
+
+    def outdated(self, todos: Iterable[Dict]) -> List[Dict]:
+        """Todos that are new or whose title/description changed"""
+        with self._lock:
+            self._sync()
+            return [
+                todo for todo in todos
+                if self._tasks.get(todo['id'], {}).get('fingerprint') != fingerprint(todo)
+            ]
+
+    def record(self, todos: Iterable[Dict], inferred: Dict[str, Dict], keep: Optional[Set[str]] = None):
+        """Store the inference for todos and drop tasks not in `keep`.
+
+        `keep` must cover every task that still exists (the todo store),
+        not just the ones a request happened to send.
+        """
+        with self._lock:
+            self._file_lock.acquire()
+            try:
+                self._record(todos, inferred, keep)
+            finally:
+                self._file_lock.release()
+
+    def _record(self, todos: Iterable[Dict], inferred: Dict[str, Dict], keep: Optional[Set[str]]):
+        """Merge into the latest file and save it (both locks held)"""
+        self._sync()
+        for todo in todos:
+            found = inferred.get(todo['id'], {})
+            self._tasks[todo['id']] = {
+                'fingerprint': fingerprint(todo),
+                'dependsOn': found.get('dependsOn', []),
+                'blocks': found.get('blocks', []),
+                'reasoning': found.get('reasoning', '')
+            }
+        if keep is not None:
+            self._tasks = {k: v for k, v in self._tasks.items() if k in keep}
+        self._save()
+
+    def prerequisites(self, ids: Set[str]) -> Dict[str, Dict[str, str]]:
+        """Edges among `ids`: task id -> {prerequisite id: reasoning}"""
+        with self._lock:
+            self._sync()
+            edges: Dict[str, Dict[str, str]] = {}
+            for task_id, entry in self._tasks.items():
+                if task_id not in ids:
+                    continue
+                for other in entry.get('dependsOn', []):
+                    if other in ids and other != task_id:
+                        edges.setdefault(task_id, {})[other] = entry.get('reasoning', '')
+                for other in entry.get('blocks', []):
+                    if other in ids and other != task_id:
+                        edges.setdefault(other, {}).setdefault(task_id, entry.get('reasoning', ''))
+            return edges
+
+
+class InferenceQueue:
+    """Infers the dependencies of queued tasks on a background thread.
+
+    Requests only call schedule(), which keeps the latest version of each
+    task and wakes the worker. The worker hands `infer` up to `batch`
+    tasks at a time, one batch after another, so a large backlog (such as
+    a first recommendation over a long list) holds one admission slot at a
+    time instead of flooding the window. Tasks of a failed batch are not
+    queued again for RETRY_DELAY seconds.
+    """
+
+    def __init__(self, infer: Callable[[List[Dict]], None], batch: int):
+        self._infer = infer
+        self._batch = batch
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._queued: Dict[str, Dict] = {}
+        self._running: Set[str] = set()
+        self._failed: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, todos: Iterable[Dict]) -> int:
+        """Queue todos for inference; returns how many are waiting"""
+        now = time.monotonic()
+        with self._lock:
+            self._failed = {k: until for k, until in self._failed.items() if until > now}
+            for todo in todos:
+                if todo['id'] not in self._running and todo['id'] not in self._failed:
+                    self._queued[todo['id']] = todo
+            waiting = len(self._queued) + len(self._running)
+            if self._queued and self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='dependency-inference', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return waiting
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'queued': len(self._queued), 'running': len(self._running)}
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                batch = list(self._queued.values())[:self._batch]
+                for todo in batch:
+                    del self._queued[todo['id']]
+                self._running = {todo['id'] for todo in batch}
+                if not self._queued:
+                    self._wakeup.clear()
+            if not batch:
+                continue
+            try:
+                self._infer(batch)
+            except Exception as error:
+                print(f'Dependency inference failed: {error}')
+                with self._lock:
+                    until = time.monotonic() + RETRY_DELAY
+                    self._failed.update((todo['id'], until) for todo in batch)
+            with self._lock:
+                self._running = set()
+
+
+def topological_order(
+    ids: Iterable[str],
+    prerequisites: Dict[str, Dict[str, str]],
+    score: Callable[[str], float],
+    limit: Optional[int] = None
+) -> List[str]:
+    """Kahn's algorithm, taking the best-scoring ready task at each step.
+
+    A task becomes ready once all of its prerequisites have been taken.
+    If only tasks on a cycle remain, the best-scoring one is taken anyway.
+    """
+    ids = list(ids)
+    waiting = {task_id: len(prerequisites.get(task_id, ())) for task_id in ids}
+    dependents: Dict[str, List[str]] = {}
+    for task_id, before in prerequisites.items():
+        for other in before:
+            dependents.setdefault(other, []).append(task_id)
+
+    ready = [(-score(t), t) for t in ids if waiting[t] == 0]
+    heapq.heapify(ready)
+    order = []
+    taken = set()
+    while len(order) < (len(ids) if limit is None else min(limit, len(ids))):
+        if not ready:
+            # Break a cycle at its best-scoring task
+            rest = min((t for t in ids if t not in taken), key=lambda t: (-score(t), t))
+            heapq.heappush(ready, (-score(rest), rest))
+        _, task_id = heapq.heappop(ready)
+        if task_id in taken:
+            continue
+        taken.add(task_id)
+        order.append(task_id)
+        for other in dependents.get(task_id, ()):
+            waiting[other] -= 1
+            if waiting[other] == 0 and other not in taken:
+                heapq.heappush(ready, (-score(other), other))
+    return order
+
+
+dependency_graph = DependencyGraph(
+    Path(os.getenv('TODO_DEPENDENCIES_PATH', DATA_DIR / 'dependencies.json'))
+)
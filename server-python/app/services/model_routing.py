@@ -0,0 +1,189 @@
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Models per tier. Short, well-constrained answers go to the fast tier;
+# open-ended generation stays on the strong one.
+MODEL_TIERS = {
+    'fast': os.getenv('BEDROCK_FAST_MODEL_ID', 'us.anthropic.claude-haiku-4-5-20251001-v1:0'),
+    'strong': os.getenv('BEDROCK_MODEL_ID', 'us.anthropic.claude-sonnet-4-5-20250929-v1:0'),
+}
+
+# USD per million input / output tokens. Cache reads are billed at 10% of
+# the input price and cache writes at 125%.
+TIER_PRICES = {
+    'fast': (1.0, 5.0),
+    'strong': (3.0, 15.0),
+}
+CACHE_READ_RATE = 0.1
+CACHE_WRITE_RATE = 1.25
+
+# Tier per operation. Operations that are not listed use the strong tier.
+# A fast-tier answer that does not validate is asked again on the strong
+# tier (see _generate in bedrock_service).
+OPERATION_TIERS = {
+    'classify_task': 'fast',
+    'set_priority': 'fast',
+    'classify_tasks': 'fast',
+    'set_priorities': 'fast',
+    'enrich_task': 'fast',
+    'generate_completion_message': 'fast',
+    'generate_search_query': 'fast',
+    'detect_stale_tasks': 'fast',
+    'repair_output': 'fast',
+}
+
+# Seconds an operation may take in total, re-asks and escalation
+# included. Operations that are not listed get DEFAULT_DEADLINE.
+OPERATION_DEADLINES = {
+    'generate_search_query': 5,
+    'classify_task': 10,
+    'set_priority': 10,
+    'generate_completion_message': 10,
+    'enrich_task': 20,
+    'repair_output': 15,
+    'generate_tasks': 30,
+    'generate_execution_guide': 30,
+    'recommend_tasks': 45,
+}
+DEFAULT_DEADLINE = 30.0
+
+# Latency-critical operations that send a second request when the first
+# is slower than the route's p95 (within the budget in app/utils/deadline)
+HEDGING_ENABLED = os.getenv('AI_HEDGING', 'true').lower() == 'true'
+HEDGED_OPERATIONS = {'classify_task', 'set_priority', 'enrich_task'}
+# Samples needed before the p95 is trusted, and the earliest hedge
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.25
+
+# Recent calls kept per operation for latency percentiles
+LATENCY_WINDOW = 200
+
+
+def tier_for(operation: Optional[str]) -> str:
+    """Model tier for an operation; AI_MODEL_TIER_<OPERATION> overrides"""
+    if not operation:
+        return 'strong'
+    override = os.getenv(f'AI_MODEL_TIER_{operation.upper()}')
+    if override in MODEL_TIERS:
+        return override
+    return OPERATION_TIERS.get(operation, 'strong')
+
+
+def model_for(tier: str) -> str:
+    return MODEL_TIERS[tier]
+
+
+def deadline_for(operation: Optional[str]) -> float:
+    """Deadline of an operation; AI_DEADLINE_<OPERATION> overrides"""
+    override = os.getenv(f'AI_DEADLINE_{operation.upper()}') if operation else None
+    if override is not None:
+        return float(override)
+    return float(OPERATION_DEADLINES.get(operation, DEFAULT_DEADLINE))
+
+
+def hedge_delay(operation: Optional[str], tier: str) -> Optional[float]:
+    """Seconds after which a call is hedged, or None if it is not"""
+    if not HEDGING_ENABLED or operation not in HEDGED_OPERATIONS:
+        return None
+    p95 = model_metrics.latency(operation, tier, 0.95)
+    return None if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+
+def usage_cost(tier: str, usage: Dict[str, Any]) -> float:
+    """USD cost of one call from its token usage"""
+    input_price, output_price = TIER_PRICES[tier]
+    return (
+        usage.get('input_tokens', 0) * input_price
+        + usage.get('cache_read_input_tokens', 0) * input_price * CACHE_READ_RATE
+        + usage.get('cache_creation_input_tokens', 0) * input_price * CACHE_WRITE_RATE
+        + usage.get('output_tokens', 0) * output_price
+    ) / 1_000_000
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ModelMetrics:
+    """Calls, latency, tokens and cost per operation and tier.
+
+    Usage is given in the Anthropic response shape: input_tokens (not read
+    from or written to the prompt cache), cache_read_input_tokens,
+    cache_creation_input_tokens and output_tokens.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._counts: Dict[str, Dict[str, int]] = {'escalations': {}, 'timeouts': {}}
+
+    def _route(self, operation: Optional[str], tier: str) -> Dict[str, Any]:
+        key = f"{operation or 'other'}:{tier}"
+        route = self._routes.get(key)
+        if route is None:
+            route = self._routes[key] = {
+                'calls': 0,
+                'errors': 0,
+                'inputTokens': 0,
+                'cacheReadTokens': 0,
+                'cacheWriteTokens': 0,
+                'outputTokens': 0,
+                'costUsd': 0.0,
+                'latencies': deque(maxlen=self.window)
+            }
+        return route
+
+    def record(self, operation: Optional[str], tier: str, seconds: float, usage: Optional[Dict[str, Any]]):
+        usage = usage or {}
+        with self._lock:
+            route = self._route(operation, tier)
+            route['calls'] += 1
+            route['inputTokens'] += usage.get('input_tokens', 0)
+            route['cacheReadTokens'] += usage.get('cache_read_input_tokens', 0)
+            route['cacheWriteTokens'] += usage.get('cache_creation_input_tokens', 0)
+            route['outputTokens'] += usage.get('output_tokens', 0)
+            route['costUsd'] += usage_cost(tier, usage)
+            route['latencies'].append(seconds)
+
+    def failed(self, operation: Optional[str], tier: str):
+        with self._lock:
+            self._route(operation, tier)['errors'] += 1
+
+    def count(self, event: str, operation: Optional[str]):
+        """Count an escalation or timeout of an operation"""
+        with self._lock:
+            counts = self._counts[event]
+            key = operation or 'other'
+            counts[key] = counts.get(key, 0) + 1
+
+    def latency(self, operation: Optional[str], tier: str, fraction: float) -> Optional[float]:
+        """Latency percentile of a route, once it has HEDGE_MIN_SAMPLES calls"""
+        with self._lock:
+            route = self._routes.get(f"{operation or 'other'}:{tier}")
+            if route is None or len(route['latencies']) < HEDGE_MIN_SAMPLES:
+                return None
+            return _percentile(route['latencies'], fraction)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            routes = {}
+            for key, route in self._routes.items():
+                latencies = route['latencies']
+                routes[key] = {
+                    **{k: v for k, v in route.items() if k != 'latencies'},
+                    'costUsd': round(route['costUsd'], 6),
+                    'p50Seconds': round(_percentile(latencies, 0.5), 3) if latencies else None,
+                    'p95Seconds': round(_percentile(latencies, 0.95), 3) if latencies else None
+                }
+            return {
+                'models': dict(MODEL_TIERS),
+                'routes': routes,
+                **{event: dict(counts) for event, counts in self._counts.items()}
+            }
+
+
+model_metrics = ModelMetrics()
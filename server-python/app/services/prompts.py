@@ -0,0 +1,414 @@
+"""
+Prompt templates for the AI features.
+
+Each template has a static part (role, definitions, answer format and
+rules) sent as the system message, and a short per-request part with the
+task data sent as the user message. Templates are parsed once at import,
+so a malformed template fails at startup and rendering is plain
+concatenation.
+"""
+import os
+from string import Formatter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Mark system parts as a prompt-cache prefix. Off by default: Bedrock only
+# caches prefixes above the model's minimum length (1024 tokens for Claude
+# Sonnet 4.5, 4096 for Haiku 4.5), and every system part below is a few
+# hundred tokens, so the marker would save nothing.
+PROMPT_CACHE_ENABLED = os.getenv('AI_PROMPT_CACHE', 'false').lower() == 'true'
+
+CATEGORY_DEFINITIONS = 'カテゴリ: work（仕事）, personal（個人）, shopping（買い物）, health（健康）, other（その他）'
+
+PRIORITY_DEFINITIONS = """優先度レベル:
+- urgent（緊急）: 重要で即座に対応が必要
+- high（高）: 重要で早めに対応が必要
+- medium（中）: 比較的早めに対応すべき
+- low（低）: いつでも対応可能"""
+
+EXECUTION_GUIDE_FORMAT = """{
+  "steps": [
+    {
+      "stepNumber": 1,
+      "instruction": "具体的な手順の説明",
+      "estimatedTime": "推定所要時間（例: 5分、30分、1時間）",
+      "tips": "役立つヒントやアドバイス"
+    }
+  ],
+  "totalEstimatedTime": "全体の推定所要時間",
+  "prerequisites": ["事前に必要なこと1", "事前に必要なこと2"],
+  "successCriteria": "このタスクが完了したと判断できる基準"
+}"""
+
+ENCOURAGEMENT_RULES = """要件:
+- 責めるような表現は避け、前向きで励ます内容にすること
+- タスクの停滞理由を推測し、具体的なアドバイスを含めること
+- 小さな一歩から始めることを提案すること
+- 明るく親しみやすいトーンで書くこと"""
+
+
+class Prompt(NamedTuple):
+    system: str
+    text: str
+
+
+class PromptTemplate:
+    """A static system part and a user part with {placeholders}"""
+
+    def __init__(self, name: str, system: str, user: str):
+        self.name = name
+        self.system = system.strip()
+        self._segments: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(user.strip()):
+            if spec or conversion:
+                raise ValueError(f'{name}: format specs are not supported ({field})')
+            self._segments.append((literal, field))
+        self.fields = frozenset(field for _, field in self._segments if field)
+
+    def render(self, **values) -> Prompt:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"{self.name}: missing {', '.join(sorted(missing))}")
+        text = ''.join(literal + (str(values[field]) if field else '') for literal, field in self._segments)
+        return Prompt(self.system, text)
+
+
+TEMPLATES: Dict[str, PromptTemplate] = {}
+
+
+def register(name: str, system: str, user: str) -> PromptTemplate:
+    if name in TEMPLATES:
+        raise ValueError(f'Prompt template already registered: {name}')
+    TEMPLATES[name] = template = PromptTemplate(name, system, user)
+    return template
+
+
+def render(name: str, **values) -> Prompt:
+    return TEMPLATES[name].render(**values)
+
+
+def system_blocks(system: str) -> List[Dict]:
+    """Anthropic system content, with a cache checkpoint if enabled"""
+    block = {'type': 'text', 'text': system}
+    if PROMPT_CACHE_ENABLED:
+        block['cache_control'] = {'type': 'ephemeral'}
+    return [block]
+
+
+register('generate_tasks', f"""
+あなたは便利なタスク管理アシスタントです。ユーザーの目標に基づいて、3〜7個の具体的で実行可能なタスクのリストを生成してください。
+
+以下のJSON形式でタスクを生成してください：
+[
+  {{
+    "title": "タスクのタイトル",
+    "description": "簡潔な説明",
+    "estimatedCategory": "カテゴリ",
+    "estimatedPriority": "優先度"
+  }}
+]
+
+{CATEGORY_DEFINITIONS}
+優先度: low（低）, medium（中）, high（高）, urgent（緊急）
+
+JSON配列のみを返してください。追加のテキストは不要です。
+""", """
+ユーザーの目標: "{user_input}"
+""")
+
+register('classify_task', f"""
+このタスクを分析して、最も適切なカテゴリと関連するタグを提案してください。
+
+{CATEGORY_DEFINITIONS}
+
+以下のJSON形式で応答してください：
+{{
+  "category": "提案されたカテゴリ",
+  "tags": ["タグ1", "タグ2", "タグ3"],
+  "reasoning": "簡単な説明"
+}}
+
+JSON のみを返してください。
+""", """
+タスクのタイトル: "{title}"
+タスクの説明: "{description}"
+""")
+
+register('set_priority', f"""
+このタスクを分析して、適切な優先度を提案してください。
+
+{PRIORITY_DEFINITIONS}
+
+以下のJSON形式で応答してください：
+{{
+  "priority": "優先度レベル",
+  "reasoning": "この優先度を選択した理由の簡単な説明",
+  "urgencyFactors": ["要因1", "要因2"]
+}}
+
+JSONのみを返してください。
+""", """
+タスクのタイトル: "{title}"
+タスクの説明: "{description}"
+{deadline_text}
+""")
+
+register('classify_tasks', f"""
+以下の各タスクを分析して、最も適切なカテゴリと関連するタグを提案してください。
+
+{CATEGORY_DEFINITIONS}
+
+すべてのタスクについて、以下のJSON配列形式で応答してください（id はタスク一覧の id をそのまま使用）：
+[
+  {{
+    "id": "タスクID",
+    "category": "提案されたカテゴリ",
+    "tags": ["タグ1", "タグ2", "タグ3"],
+    "reasoning": "簡単な説明（1文）"
+  }}
+]
+
+JSON配列のみを返してください。
+""", """
+タスク一覧:
+{tasks}
+""")
+
+register('set_priorities', f"""
+以下の各タスクを分析して、適切な優先度を提案してください。
+
+{PRIORITY_DEFINITIONS}
+
+すべてのタスクについて、以下のJSON配列形式で応答してください（id はタスク一覧の id をそのまま使用）：
+[
+  {{
+    "id": "タスクID",
+    "priority": "優先度レベル",
+    "reasoning": "この優先度を選択した理由（1文）",
+    "urgencyFactors": ["要因1", "要因2"]
+  }}
+]
+
+JSON配列のみを返してください。
+""", """
+タスク一覧:
+{tasks}
+""")
+
+register('generate_execution_guide', f"""
+あなたは実用的なタスク管理アシスタントです。与えられたタスクを完了するための具体的な実行手順を生成してください。
+
+以下のJSON形式で、ステップバイステップの実行手順を生成してください：
+{EXECUTION_GUIDE_FORMAT}
+
+要件:
+- 3〜7個のステップに分解してください
+- 各ステップは具体的で実行可能であること
+- 時間の見積もりは現実的であること
+- ヒントは実用的で役立つこと
+
+JSONのみを返してください。
+""", """
+タスクのタイトル: "{title}"
+タスクの説明: "{description}"
+カテゴリ: {category}
+優先度: {priority}
+""")
+
+_ENRICH_SYSTEM = f"""
+このタスクを分析して、カテゴリ・タグ・優先度を提案してください。
+
+{CATEGORY_DEFINITIONS}
+
+{PRIORITY_DEFINITIONS}
+
+以下のJSON形式で応答してください：
+{{
+  "category": "提案されたカテゴリ",
+  "tags": ["タグ1", "タグ2", "タグ3"],
+  "priority": "優先度レベル",
+  "urgencyFactors": ["要因1", "要因2"],
+  "reasoning": "カテゴリと優先度を選んだ理由の簡単な説明"%s
+}}
+
+要件:
+- 時間の見積もりは現実的であること%s
+
+JSONのみを返してください。
+"""
+_ENRICH_USER = """
+タスクのタイトル: "{title}"
+タスクの説明: "{description}"
+{deadline_text}
+"""
+
+register('enrich_task', _ENRICH_SYSTEM % ('', ''), _ENRICH_USER)
+register(
+    'enrich_task_with_guide',
+    _ENRICH_SYSTEM % (
+        ',\n  "executionGuide": ' + EXECUTION_GUIDE_FORMAT.replace('\n', '\n  '),
+        '\n- executionGuide は3〜7個の具体的で実行可能なステップに分解すること'
+    ),
+    _ENRICH_USER
+)
+
+register('generate_completion_message', """
+あなたは励ましとモチベーションを高めるアシスタントです。ユーザーがタスクを完了しました。心から祝福するメッセージを生成してください。
+
+以下のJSON形式で応答してください：
+{
+  "message": "タスク完了を祝福する短いメッセージ（1-2文）",
+  "encouragement": "さらなる励ましの言葉や次への動機づけ（1-2文）",
+  "emoji": "適切な絵文字1つ（🎉、🎊、⭐、🏆、💪など）"
+}
+
+要件:
+- メッセージは明るく前向きで、達成感を感じさせること
+- カテゴリに応じた適切な表現を使うこと
+- 簡潔で読みやすいこと
+- 絵文字は1つだけ
+
+JSONのみを返してください。
+""", """
+タスクのタイトル: "{title}"
+タスクの説明: "{description}"
+カテゴリ: {category}
+""")
+
+register('detect_stale_tasks', f"""
+あなたは優しく励ますタスク管理アシスタントです。与えられた停滞しているタスクについて、前向きな励ましメッセージを生成してください。
+
+以下のJSON形式で応答してください：
+{{
+  "overallMessage": "全体的な励ましメッセージ（2-3文）",
+  "taskMessages": {{
+    "タスクID1": "そのタスク固有の励ましメッセージ（1-2文）",
+    "タスクID2": "そのタスク固有の励ましメッセージ（1-2文）"
+  }},
+  "actionSuggestion": "次に取るべき具体的なアクションの提案（1-2文）"
+}}
+
+{ENCOURAGEMENT_RULES}
+
+JSONのみを返してください。
+""", """
+停滞タスク:
+{stale_tasks}
+""")
+
+register('stale_encouragement', f"""
+あなたは優しく励ますタスク管理アシスタントです。与えられた停滞しているタスクについて、前向きな励ましメッセージを生成してください。
+
+以下のJSON形式で応答してください：
+{{
+  "overallMessage": "全体的な励ましメッセージ（2-3文）",
+  "taskMessages": {{
+    "タスクID": "そのタスク固有の励ましメッセージ（1-2文）"
+  }},
+  "actionSuggestion": "次に取るべき具体的なアクションの提案（1-2文）"
+}}
+
+{ENCOURAGEMENT_RULES}
+- taskMessages には個別メッセージが必要なタスクIDだけを含めること
+
+JSONのみを返してください。
+""", """
+停滞タスク:
+{stale_tasks}
+
+個別メッセージが必要なタスクID:
+{wanted_ids}
+""")
+
+register('infer_dependencies', """
+あなたはタスク管理の専門アシスタントです。新しく追加または変更されたタスクについて、他の未完了タスクとの依存関係を判定してください。
+
+以下のJSON配列形式で、判定するタスクごとに1要素ずつ応答してください：
+[
+  {
+    "id": "判定するタスクのID",
+    "dependsOn": ["このタスクより先に完了すべきタスクのID"],
+    "blocks": ["このタスクの完了を待つタスクのID"],
+    "reasoning": "依存関係の理由（依存関係がなければ空文字）"
+  }
+]
+
+要件:
+- タイトルと説明から論理的な順序関係が明らかな場合だけ挙げ、なければ空配列にすること
+- id は与えられたタスクの id をそのまま使うこと
+
+JSONのみを返してください。
+""", """
+判定するタスク:
+{tasks}
+
+その他の未完了タスク:
+{others}
+""")
+
+register('recommend_tasks', """
+あなたはタスク管理の専門アシスタントです。以下は未完了タスクのうち優先度の高い候補です。各候補に取り組む理由を簡潔に説明し、全体的な分析を書いてください。あわせて、依存関係を判定するよう指定されたタスクについて、他の未完了タスクとの依存関係を判定してください。
+
+以下のJSON形式で応答してください：
+{
+  "dependencies": [
+    {
+      "id": "判定するタスクのID",
+      "dependsOn": ["このタスクより先に完了すべきタスクのID"],
+      "blocks": ["このタスクの完了を待つタスクのID"],
+      "reasoning": "依存関係の理由（依存関係がなければ空文字）"
+    }
+  ],
+  "reasons": {
+    "タスクID": "推薦理由（日本語、1文）"
+  },
+  "insights": "全体的な分析結果やアドバイス"
+}
+
+要件:
+- dependencies には判定するタスクごとに1要素ずつ含め、判定するタスクがなければ空配列にすること
+- 依存関係はタイトルと説明から論理的な順序関係が明らかな場合だけ挙げること
+- reasons には候補タスクごとに1文ずつ書くこと
+- id は与えられたタスクの id をそのまま使うこと
+
+JSONのみを返してください。
+""", """
+候補タスク:
+{candidates}
+
+依存関係を判定するタスクのID:
+{infer_ids}
+
+その他の未完了タスク:
+{others}
+""")
+
+register('repair_output', """
+与えられた応答は壊れているか、スキーマに合っていません。内容は変えずに、スキーマに合う正しいJSONに修正してください。
+
+修正後のJSONのみを返してください。
+""", """
+スキーマ:
+{schema}
+
+エラー:
+{error}
+
+修正する応答:
+{response}
+""")
+
+register('generate_search_query', """
+あなたは検索クエリ最適化の専門家です。与えられたタスク情報から、最も関連性の高い情報を見つけるための最適な検索クエリを生成してください。
+
+要件:
+- 検索クエリは具体的で、情報が見つかりやすいものにする
+- 不要な言葉を削除し、キーワードを抽出する
+- 検索結果が多すぎず少なすぎないバランスの取れたクエリにする
+- 日本語の検索クエリを生成する
+- 1〜5語程度の簡潔なクエリにする
+
+検索クエリのみを返してください。JSONやその他のフォーマットは不要です。
+""", """
+タスクのタイトル: "{title}"
+タスクの説明: "{description}"
+""")
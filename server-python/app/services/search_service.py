@@ -1,9 +1,15 @@
 import os
 import json
 import re
+import time
 import requests
 from typing import Dict, List
-from app.config.bedrock import bedrock_client, MODEL_ID
+from app.config.bedrock import get_client
+from app.services.ai_cache import cache_key, response_cache, ttl_for
+from app.services.model_routing import deadline_for, model_for, model_metrics, tier_for
+from app.services.prompts import render, system_blocks
+from app.utils.admission import bedrock_admission, priority_for
+from app.utils.deadline import call_with_deadline, deadline_scope, remaining
 
 GOOGLE_API_KEY = os.getenv('GOOGLE_SEARCH_API_KEY')
 GOOGLE_SEARCH_ENGINE_ID = os.getenv('GOOGLE_SEARCH_ENGINE_ID')
@@ -67,41 +73,53 @@ def search_context_info(query: str, num_results: int = 5) -> Dict:
 
 def generate_search_query(title: str, description: str = '') -> str:
     """Generate optimized search query from task information using AI"""
-    prompt = f"""あなたは検索クエリ最適化の専門家です。以下のタスク情報から、最も関連性の高い情報を見つけるための最適な検索クエリを生成してください。
+    prompt = render('generate_search_query', title=title, description=description)
 
-タスクのタイトル: "{title}"
-タスクの説明: "{description}"
-
-要件:
-- 検索クエリは具体的で、情報が見つかりやすいものにする
-- 不要な言葉を削除し、キーワードを抽出する
-- 検索結果が多すぎず少なすぎないバランスの取れたクエリにする
-- 日本語の検索クエリを生成する
-- 1〜5語程度の簡潔なクエリにする
-
-検索クエリのみを返してください。JSONやその他のフォーマットは不要です。"""
+    tier = tier_for('generate_search_query')
+    ttl = ttl_for('generate_search_query')
+    key = cache_key(model_for(tier), prompt.system, prompt.text, {"max_tokens": 100})
+    if ttl:
+        cached = response_cache.get(key, 'generate_search_query')
+        if cached is not None:
+            return cached
 
     try:
         payload = {
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": 100,
+            "system": system_blocks(prompt.system),
             "messages": [
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": prompt.text
                 }
             ]
         }
 
-        response = bedrock_client.invoke_model(
-            modelId=MODEL_ID,
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps(payload)
-        )
+        def attempt() -> Dict:
+            with bedrock_admission.slot(priority_for('generate_search_query')):
+                started = time.monotonic()
+                try:
+                    response = get_client().invoke_model(
+                        modelId=model_for(tier),
+                        contentType='application/json',
+                        accept='application/json',
+                        body=json.dumps(payload)
+                    )
+                    body = json.loads(response['body'].read())
+                except Exception:
+                    model_metrics.failed('generate_search_query', tier)
+                    raise
+                model_metrics.record('generate_search_query', tier, time.monotonic() - started, body.get('usage'))
+            return body
+
+        # Past the deadline the title is used as the query (see below)
+        with deadline_scope(deadline_for('generate_search_query')):
+            response_body = call_with_deadline(attempt, remaining())
 
-        response_body = json.loads(response['body'].read())
         optimized_query = response_body['content'][0]['text'].strip()
+        if optimized_query:
+            response_cache.put(key, optimized_query, ttl)
         return optimized_query
 
     except Exception as error:
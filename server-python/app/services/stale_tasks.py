@@ -0,0 +1,197 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.services import bedrock_service, todos_service
+from app.services.ai_cache import ResponseCache, response_cache
+from app.services.dependency_graph import fingerprint
+
+# Days without an update before an open task counts as stale, and the
+# staleness buckets a message is written for: a task gets a new message
+# when it crosses into the next bucket, not every day
+STALE_THRESHOLD_DAYS = 7
+STALE_BUCKETS = (7, 14, 30, 90)
+
+# Most-stale tasks covered by encouragement (one model call per stale set)
+STALE_PROMPT_TASKS = 25
+
+# Seconds a computed stale list is reused while the store is unchanged
+SNAPSHOT_MAX_AGE = 60.0
+# Seconds before a failed generation is attempted again
+RETRY_DELAY = 60.0
+# Seconds a generated message is kept
+MESSAGE_TTL = 30 * 24 * 3600
+
+# Messages are cached independently of AI_CACHE_ENABLED (they are the only
+# way the GET endpoint gets them), sharing the disk tier when configured
+message_cache = ResponseCache(max_entries=2000, disk_path=response_cache.disk_path)
+
+
+def staleness_bucket(days: int) -> int:
+    return max(b for b in STALE_BUCKETS if b <= days)
+
+
+def find_stale(todos: List[Dict], now: datetime) -> List[Dict]:
+    """Open todos not updated for STALE_THRESHOLD_DAYS, most stale first"""
+    stale = []
+    for todo in todos:
+        if todo.get('completed'):
+            continue
+        updated_at = datetime.fromisoformat((todo.get('updatedAt') or todo['createdAt']).replace('Z', '+00:00'))
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        days = (now - updated_at).days
+        if days >= STALE_THRESHOLD_DAYS:
+            stale.append({
+                'id': todo['id'],
+                'title': todo['title'],
+                'daysSinceUpdate': days,
+                'bucket': staleness_bucket(days),
+                'fingerprint': fingerprint(todo)
+            })
+    stale.sort(key=lambda t: (-t['daysSinceUpdate'], t['id']))
+    return stale
+
+
+class EncouragementJob:
+    """Writes stale-task encouragement on a background thread.
+
+    Requests only call schedule(), which records the latest stale set and
+    wakes the worker; a newer set replaces one that has not started yet.
+    The worker asks the model for the overall message and for the
+    per-task messages the set is missing, then caches them, so the next
+    request finds them. A set whose generation failed is not retried for
+    RETRY_DELAY seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._queued: Optional[Tuple[str, List[Dict], List[str]]] = None
+        self._running: Optional[str] = None
+        self._failed: Tuple[Optional[str], float] = (None, 0.0)
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, set_key: str, tasks: List[Dict], missing: List[str]) -> bool:
+        """Queue generation for a stale set; False if it recently failed"""
+        with self._lock:
+            if set_key == self._running or (self._queued and self._queued[0] == set_key):
+                return True
+            if self._failed[0] == set_key and time.monotonic() < self._failed[1]:
+                return False
+            self._queued = (set_key, tasks, missing)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='stale-encouragement', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return True
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                job = self._queued
+                self._queued = None
+                self._running = job[0] if job else None
+            if job is None:
+                continue
+            try:
+                complete = self._generate(*job)
+            except Exception as error:
+                print(f'Stale task encouragement failed: {error}')
+                complete = False
+            if not complete:
+                with self._lock:
+                    self._failed = (job[0], time.monotonic() + RETRY_DELAY)
+            with self._lock:
+                self._running = None
+
+    def _generate(self, set_key: str, tasks: List[Dict], missing: List[str]) -> bool:
+        """Generate and cache; False if the answer left messages out"""
+        prompt_tasks = [
+            {'id': t['id'], 'title': t['title'], 'daysSinceUpdate': t['daysSinceUpdate']}
+            for t in tasks
+        ]
+        result = bedrock_service.generate_stale_encouragement(prompt_tasks, missing)
+        by_id = {t['id']: t for t in tasks}
+        for task_id, message in result['taskMessages'].items():
+            message_cache.put(_message_key(by_id[task_id]), message, MESSAGE_TTL)
+        message_cache.put(f'stale-overall:{set_key}', json.dumps({
+            'overallMessage': result['overallMessage'],
+            'actionSuggestion': result['actionSuggestion']
+        }, ensure_ascii=False), MESSAGE_TTL)
+        return len(result['taskMessages']) == len(missing)
+
+
+def _message_key(task: Dict) -> str:
+    return f"stale-message:{task['id']}:{task['bucket']}:{task['fingerprint']}"
+
+
+def _set_key(tasks: List[Dict]) -> str:
+    material = json.dumps([[t['id'], t['bucket']] for t in tasks], separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()[:16]
+
+
+encouragement_job = EncouragementJob()
+
+_snapshot: Optional[Tuple[str, float, List[Dict]]] = None
+_snapshot_lock = threading.Lock()
+
+
+def stale_snapshot() -> List[Dict]:
+    """Stale tasks from the store, reused while the store is unchanged"""
+    global _snapshot
+    version = todos_service.get_version()[0]
+    with _snapshot_lock:
+        if _snapshot and _snapshot[0] == version and time.monotonic() - _snapshot[1] < SNAPSHOT_MAX_AGE:
+            return _snapshot[2]
+    stale = find_stale(todos_service.get_all_todos(completed=False), datetime.now(timezone.utc))
+    with _snapshot_lock:
+        _snapshot = (version, time.monotonic(), stale)
+    return stale
+
+
+def get_stale_tasks() -> Dict:
+    """Stale tasks with whatever encouragement is ready.
+
+    Never waits on the model: missing messages are scheduled on the
+    background job and 'pending' tells the client to ask again later.
+    """
+    stale = stale_snapshot()
+    covered = stale[:STALE_PROMPT_TASKS]
+    set_key = _set_key(covered)
+
+    task_messages = {}
+    missing = []
+    for task in covered:
+        message = message_cache.get(_message_key(task), 'stale_task_message')
+        if message:
+            task_messages[task['id']] = message
+        else:
+            missing.append(task['id'])
+    overall = message_cache.get(f'stale-overall:{set_key}', 'stale_overall_message')
+    overall = json.loads(overall) if overall else {}
+
+    pending = False
+    if covered and (missing or not overall):
+        pending = encouragement_job.schedule(set_key, covered, missing)
+
+    return {
+        'staleTasks': [
+            {
+                'id': t['id'],
+                'title': t['title'],
+                'daysSinceUpdate': t['daysSinceUpdate'],
+                'message': task_messages.get(t['id'])
+            }
+            for t in stale
+        ],
+        'overallMessage': overall.get('overallMessage', ''),
+        'taskMessages': task_messages,
+        'actionSuggestion': overall.get('actionSuggestion', ''),
+        'pending': pending
+    }
@@ -0,0 +1,253 @@
+import heapq
+import math
+import operator
+import threading
+import unicodedata
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Weight of each field's n-grams in a todo's term frequencies
+FIELD_WEIGHTS = (('title', 3), ('tags', 2), ('description', 1))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def normalize(text: str) -> str:
+    """Fold width and case so 'ＴＯＤＯ', 'todo' and 'Todo' match"""
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def ngrams(text: str) -> List[str]:
+    """Character bigrams of each whitespace-separated chunk.
+
+    Japanese has no word boundaries, so overlapping bigrams stand in for
+    words. A single-character chunk is kept as a unigram; as a query term it
+    also matches every bigram containing that character (see
+    TodoSearchIndex.search).
+    """
+    grams = []
+    for chunk in normalize(text).split():
+        if len(chunk) == 1:
+            grams.append(chunk)
+        else:
+            grams.extend(map(operator.add, chunk, chunk[1:]))
+    return grams
+
+
+def _document_terms(todo: Dict) -> Dict[str, int]:
+    """Weighted term frequencies of a todo's searchable fields"""
+    terms = {}
+    get = terms.get
+    for field, weight in FIELD_WEIGHTS:
+        value = todo.get(field) or ''
+        if isinstance(value, list):
+            value = ' '.join(value)
+        for gram in ngrams(value):
+            terms[gram] = get(gram, 0) + weight
+    return terms
+
+
+class TodoSearchIndex:
+    """Incrementally maintained inverted index over todo text.
+
+    Postings map each n-gram to {todo id: weighted term frequency}. A query
+    intersects the postings of its n-grams starting from the rarest one, so
+    its cost follows the shortest postings list rather than the number of
+    todos. A one-character query term is looked up through the n-grams that
+    contain the character, so 本 finds 本を読む without indexing unigrams of
+    every text. Results are ranked with BM25, and tag counts over all matches
+    are returned as facets.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # Character -> indexed n-grams containing it, for one-character queries
+        self._grams_by_char: Dict[str, Set[str]] = {}
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._doc_length: Dict[str, int] = {}
+        self._doc_tags: Dict[str, List[str]] = {}
+        self._doc_completed: Dict[str, bool] = {}
+        self._total_length = 0
+        # Store version the index reflects; None until first built
+        self.version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def rebuild(self, todos: Iterable[Dict], version: str):
+        """Index all todos from scratch"""
+        with self._lock:
+            self._postings = {}
+            self._grams_by_char = {}
+            self._doc_terms = {}
+            self._doc_length = {}
+            self._doc_tags = {}
+            self._doc_completed = {}
+            self._total_length = 0
+            for todo in todos:
+                self._add(todo)
+            self.version = version
+
+    def ensure(self, store):
+        """Rebuild from the store unless the index already reflects its version.
+
+        The snapshot is read inside a store transaction, and the index lock is
+        taken before that transaction ends: writers queued behind it then
+        apply their changes on top of the rebuilt index instead of being lost.
+        """
+        if self.version == store.version()[0]:
+            return
+        with store.transaction():
+            version = store.version()[0]
+            if self.version == version:
+                return
+            todos = list(store.iter_all())
+            self._lock.acquire()
+        try:
+            self.rebuild(todos, version)
+        finally:
+            self._lock.release()
+
+    def apply(
+        self,
+        expected: str,
+        version: str,
+        put: Iterable[Dict] = (),
+        deleted: Iterable[str] = ()
+    ):
+        """Apply one mutation that moved the store from `expected` to `version`.
+
+        If the index is not at `expected`, some change was missed (another
+        worker wrote, or a rebuild raced this one); the update is dropped and
+        the stale version makes the next search rebuild instead.
+        """
+        with self._lock:
+            if self.version is None or self.version != expected:
+                return
+            for todo in put:
+                self._add(todo)
+            for todo_id in deleted:
+                self._remove(todo_id)
+            self.version = version
+
+    def _add(self, todo: Dict):
+        todo_id = todo['id']
+        self._remove(todo_id)
+
+        terms = _document_terms(todo)
+        postings = self._postings
+        grams_by_char = self._grams_by_char
+        for term, tf in terms.items():
+            posting = postings.get(term)
+            if posting is None:
+                postings[term] = {todo_id: tf}
+                for char in set(term):
+                    grams = grams_by_char.get(char)
+                    if grams is None:
+                        grams_by_char[char] = {term}
+                    else:
+                        grams.add(term)
+            else:
+                posting[todo_id] = tf
+        length = sum(terms.values())
+        self._doc_terms[todo_id] = tuple(terms)
+        self._doc_length[todo_id] = length
+        self._doc_tags[todo_id] = list(todo.get('tags') or [])
+        self._doc_completed[todo_id] = bool(todo.get('completed'))
+        self._total_length += length
+
+    def _remove(self, todo_id: str):
+        terms = self._doc_terms.pop(todo_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[todo_id]
+            if not postings:
+                del self._postings[term]
+                for char in set(term):
+                    grams = self._grams_by_char[char]
+                    grams.discard(term)
+                    if not grams:
+                        del self._grams_by_char[char]
+        self._total_length -= self._doc_length.pop(todo_id)
+        del self._doc_tags[todo_id]
+        del self._doc_completed[todo_id]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        tag: Optional[str] = None,
+        completed: Optional[bool] = None
+    ) -> Tuple[List[Tuple[str, float]], int, Dict[str, int]]:
+        """Rank todos matching every n-gram of the query.
+
+        Returns ([(todo id, score)], total matches, tag facet counts).
+        """
+        terms = list(dict.fromkeys(ngrams(query)))
+        if not terms:
+            return [], 0, {}
+
+        with self._lock:
+            postings = [self._postings.get(term) if len(term) > 1 else self._char_posting(term) for term in terms]
+            if not all(postings):
+                return [], 0, {}
+
+            # Intersect from the shortest postings list
+            postings.sort(key=len)
+            matches: Set[str] = set(postings[0])
+            for other in postings[1:]:
+                matches.intersection_update(other)
+                if not matches:
+                    return [], 0, {}
+
+            if tag:
+                matches = {i for i in matches if tag in self._doc_tags[i]}
+            if completed is not None:
+                matches = {i for i in matches if self._doc_completed[i] == completed}
+
+            doc_tags = self._doc_tags
+            facets = Counter(chain.from_iterable(map(doc_tags.__getitem__, matches)))
+
+            n_docs = len(self._doc_terms)
+            avg_length = self._total_length / n_docs
+            weights = [
+                (math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5)) * (K1 + 1), p)
+                for p in postings
+            ]
+            doc_length = self._doc_length
+            base = K1 * (1 - B)
+            scale = K1 * B / avg_length
+
+            def score(todo_id: str) -> float:
+                norm = base + scale * doc_length[todo_id]
+                total = 0.0
+                for weight, posting in weights:
+                    tf = posting[todo_id]
+                    total += weight * tf / (tf + norm)
+                return total
+
+            ranked = heapq.nlargest(limit, ((score(i), i) for i in matches))
+            return [(todo_id, s) for s, todo_id in ranked], len(matches), dict(facets.most_common())
+
+    def _char_posting(self, char: str) -> Dict[str, int]:
+        """Merged postings of every n-gram containing one character"""
+        grams = self._grams_by_char.get(char)
+        if not grams:
+            return {}
+        if len(grams) == 1:
+            return self._postings[next(iter(grams))]
+        merged: Dict[str, int] = {}
+        get = merged.get
+        for gram in grams:
+            for todo_id, tf in self._postings[gram].items():
+                merged[todo_id] = get(todo_id, 0) + tf
+        return merged
+
+
+search_index = TodoSearchIndex()
@@ -1,43 +1,31 @@
+import base64
 import json
-import os
+import threading
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
-from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Sequence, Tuple, Union
 
-# Data file path
-DATA_DIR = Path(__file__).parent.parent.parent / 'data'
-DATA_FILE = DATA_DIR / 'todos.json'
+from app.storage import get_store
+from app.storage.base import SORT_FIELDS, sort_value
+from app.services.change_feed import change_feed
+from app.services.todo_search import search_index
 
+# Page size bounds for paginated listing
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-def ensure_data_file():
-    """Ensure data directory and file exist"""
-    DATA_DIR.mkdir(exist_ok=True)
-    if not DATA_FILE.exists():
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump([], f, ensure_ascii=False, indent=2)
+# Todos committed per storage write during bulk import
+IMPORT_BATCH_SIZE = 5000
+# Line errors reported back from an import
+MAX_IMPORT_ERRORS = 100
 
+# Operations accepted by a single batch request
+MAX_BATCH_OPERATIONS = 1000
 
-def read_todos() -> List[Dict]:
-    """Read all todos from file"""
-    ensure_data_file()
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as error:
-        print(f'Error reading todos: {error}')
-        return []
-
-
-def write_todos(todos: List[Dict]):
-    """Write todos to file"""
-    ensure_data_file()
-    try:
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(todos, f, ensure_ascii=False, indent=2)
-    except Exception as error:
-        print(f'Error writing todos: {error}')
-        raise Exception('データの保存に失敗しました')
+# Search result bounds
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
 
 
 def get_all_todos(
@@ -46,34 +34,170 @@ def get_all_todos(
     priority: Optional[str] = None
 ) -> List[Dict]:
     """Get todos with optional filters"""
-    todos = read_todos()
+    return get_store().list(completed, category, priority)
 
-    # Apply filters
-    if completed is not None:
-        todos = [t for t in todos if t.get('completed') == completed]
 
-    if category:
-        todos = [t for t in todos if t.get('category') == category]
+def list_todos_page(
+    completed: Optional[bool] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    sort: str = 'createdAt',
+    order: str = 'asc',
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Dict:
+    """Get one page of todos in a stable sort order.
+
+    Returns {'items': [...], 'nextCursor': str | None}. The cursor is
+    opaque to clients and only valid for the same sort and order.
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError(f'sort は {", ".join(SORT_FIELDS)} のいずれかを指定してください')
+    if order not in ('asc', 'desc'):
+        raise ValueError('order は asc または desc を指定してください')
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit は 1〜{MAX_PAGE_SIZE} の範囲で指定してください')
+
+    after = _decode_cursor(cursor, sort, order) if cursor else None
+
+    # Fetch one extra row to learn whether another page follows
+    rows = get_store().page(
+        completed, category, priority,
+        sort=sort,
+        descending=order == 'desc',
+        after=after,
+        limit=limit + 1
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(sort, order, sort_value(last, sort), last['id'])
+
+    return {
+        'items': project_fields(rows, fields),
+        'nextCursor': next_cursor
+    }
+
 
-    if priority:
-        todos = [t for t in todos if t.get('priority') == priority]
+def project_fields(todos: List[Dict], fields: Optional[Sequence[str]]) -> List[Dict]:
+    """Keep only the requested fields (plus id) of each todo"""
+    if not fields:
+        return todos
+    keep = ['id'] + [f for f in fields if f != 'id']
+    return [{f: t[f] for f in keep if f in t} for t in todos]
 
-    return todos
+
+def _encode_cursor(sort: str, order: str, value: Any, todo_id: str) -> str:
+    payload = json.dumps([sort, order, value, todo_id], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, todo_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError('cursor が不正です')
+    if cursor_sort != sort or cursor_order != order:
+        raise ValueError('cursor は同じ sort と order で使用してください')
+    return value, todo_id
+
+
+def get_version() -> Tuple[str, float]:
+    """Dataset version token and modified time, for conditional requests"""
+    return get_store().version()
 
 
 def get_todo_by_id(todo_id: str) -> Optional[Dict]:
     """Get a single todo by ID"""
-    todos = read_todos()
-    for todo in todos:
-        if todo.get('id') == todo_id:
-            return todo
-    return None
+    return get_store().get(todo_id)
+
+
+def search_todos(
+    query: str,
+    limit: Optional[int] = None,
+    tag: Optional[str] = None,
+    completed: Optional[bool] = None
+) -> Dict:
+    """Full-text search over titles, descriptions and tags.
+
+    Returns {'items': [...], 'total': int, 'facets': {'tags': {...}}} with
+    items ranked by relevance; each item carries its 'score'.
+    """
+    if not query or not query.strip():
+        raise ValueError('q は必須です')
+    if limit is None:
+        limit = DEFAULT_SEARCH_LIMIT
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise ValueError(f'limit は 1〜{MAX_SEARCH_LIMIT} の範囲で指定してください')
+
+    store = get_store()
+    # Built on first use, and rebuilt if the store changed behind its back
+    search_index.ensure(store)
+    hits, total, facets = search_index.search(query, limit, tag, completed)
+
+    items = []
+    for todo_id, score in hits:
+        todo = store.get(todo_id)
+        if todo:
+            items.append({**todo, 'score': round(score, 4)})
+
+    return {'items': items, 'total': total, 'facets': {'tags': facets}}
+
+
+def _index_base(store) -> Optional[str]:
+    """Version a mutation starts from, or None while the index is unbuilt"""
+    return store.version()[0] if search_index.version else None
+
+
+def _reindex(store, expected: Optional[str], put: Iterable[Dict] = (), deleted: Iterable[str] = ()):
+    """Apply a mutation to the search index; store transaction held"""
+    if expected:
+        search_index.apply(expected, store.version()[0], put, deleted)
+
+
+# Change events of the outermost write in progress on this thread
+_pending = threading.local()
+
+
+@contextmanager
+def _write():
+    """Store transaction whose change events are published once it committed.
+
+    Nested writes (batch items, toggle_complete) join the outermost one and
+    hold their events until it commits, so subscribers never see an event
+    for a write that was rolled back.
+    """
+    if getattr(_pending, 'events', None) is not None:
+        with get_store().transaction() as store:
+            yield store
+        return
+    events = _pending.events = []
+    try:
+        with get_store().transaction() as store:
+            yield store
+    finally:
+        _pending.events = None
+    for event_type, payload in events:
+        change_feed.publish(event_type, **payload)
+
+
+def _publish(event_type: str, **payload):
+    """Publish a change event, or hold it until the current write commits"""
+    events = getattr(_pending, 'events', None)
+    if events is None:
+        change_feed.publish(event_type, **payload)
+    else:
+        events.append((event_type, payload))
 
 
 def create_todo(todo_data: Dict) -> Dict:
     """Create a new todo"""
-    todos = read_todos()
-
     new_todo = {
         'id': str(uuid.uuid4()),
         'title': todo_data['title'],
@@ -88,61 +212,206 @@ def create_todo(todo_data: Dict) -> Dict:
         'completedAt': None
     }
 
-    todos.append(new_todo)
-    write_todos(todos)
+    with _write() as store:
+        expected = _index_base(store)
+        store.put(new_todo)
+        _reindex(store, expected, put=[new_todo])
+    _publish('created', id=new_todo['id'], todo=new_todo)
 
     return new_todo
 
 
+def iter_todos() -> Iterator[Dict]:
+    """Iterate over all todos without building a list response"""
+    return get_store().iter_all()
+
+
+def _optional_string(data: Dict, field: str, default: Optional[str] = None) -> Optional[str]:
+    """A field that must be a string when present (None and missing give default)"""
+    value = data.get(field)
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f'{field} は文字列で指定してください')
+    return value
+
+
+def _imported_todo(data: Dict, now: str) -> Dict:
+    """Normalize one imported record, keeping ids and timestamps of backups.
+
+    Field types are checked here: a stored record of the wrong type would
+    break sorting and search for every later request, not just this line.
+    """
+    if not isinstance(data, dict) or not data.get('title'):
+        raise ValueError('title は必須です')
+    if not isinstance(data['title'], str):
+        raise ValueError('title は文字列で指定してください')
+    tags = data.get('tags')
+    if tags is None:
+        tags = []
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError('tags は文字列の配列で指定してください')
+
+    completed = bool(data.get('completed', False))
+    return {
+        'id': _optional_string(data, 'id') or str(uuid.uuid4()),
+        'title': data['title'],
+        'description': _optional_string(data, 'description', ''),
+        'category': _optional_string(data, 'category', 'other'),
+        'priority': _optional_string(data, 'priority', 'medium'),
+        'tags': tags,
+        'deadline': _optional_string(data, 'deadline'),
+        'completed': completed,
+        'createdAt': _optional_string(data, 'createdAt') or now,
+        'updatedAt': _optional_string(data, 'updatedAt') or now,
+        'completedAt': _optional_string(data, 'completedAt') if completed else None
+    }
+
+
+def import_todos(lines: Iterable[Union[str, bytes]], batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """Import NDJSON lines incrementally, committing in bulk batches.
+
+    Records with an existing id replace the stored todo, so re-importing
+    an export is idempotent. Malformed lines are skipped and reported.
+    """
+    store = get_store()
+    now = datetime.utcnow().isoformat() + 'Z'
+    imported = 0
+    errors = []
+    batch = []
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            batch.append(_imported_todo(json.loads(line), now))
+        except ValueError as error:
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({'line': line_number, 'error': str(error)})
+            continue
+
+        if len(batch) >= batch_size:
+            _import_batch(store, batch)
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        _import_batch(store, batch)
+        imported += len(batch)
+
+    if imported:
+        # Too many changes to describe one by one; subscribers refetch
+        _publish('reset')
+
+    return {'imported': imported, 'errors': errors}
+
+
+def _import_batch(store, batch: List[Dict]):
+    with store.transaction():
+        expected = _index_base(store)
+        store.put_many(batch)
+        _reindex(store, expected, put=batch)
+
+
 def update_todo(todo_id: str, updates: Dict) -> Optional[Dict]:
     """Update an existing todo"""
-    todos = read_todos()
+    with _write() as store:
+        todo = store.get(todo_id)
+        if not todo:
+            return None
+        before = dict(todo)
 
-    for i, todo in enumerate(todos):
-        if todo.get('id') == todo_id:
-            # Update fields
-            for key, value in updates.items():
-                if value is not None:
-                    todo[key] = value
+        # Update fields
+        for key, value in updates.items():
+            if value is not None:
+                todo[key] = value
 
-            todo['updatedAt'] = datetime.utcnow().isoformat() + 'Z'
+        todo['updatedAt'] = datetime.utcnow().isoformat() + 'Z'
 
-            # Handle completion
-            if updates.get('completed') == True and not todo.get('completedAt'):
-                todo['completedAt'] = datetime.utcnow().isoformat() + 'Z'
-            elif updates.get('completed') == False:
-                todo['completedAt'] = None
+        # Handle completion
+        if updates.get('completed') == True and not todo.get('completedAt'):
+            todo['completedAt'] = datetime.utcnow().isoformat() + 'Z'
+        elif updates.get('completed') == False:
+            todo['completedAt'] = None
 
-            todos[i] = todo
-            write_todos(todos)
-            return todo
+        expected = _index_base(store)
+        store.put(todo)
+        _reindex(store, expected, put=[todo])
 
-    return None
+    # Publish only the fields that changed
+    changes = {k: v for k, v in todo.items() if before.get(k) != v}
+    _publish('updated', id=todo_id, changes=changes)
+    return todo
 
 
 def delete_todo(todo_id: str) -> bool:
     """Delete a todo"""
-    todos = read_todos()
-    initial_length = len(todos)
+    with _write() as store:
+        expected = _index_base(store)
+        deleted = store.delete(todo_id)
+        if deleted:
+            _reindex(store, expected, deleted=[todo_id])
+    if deleted:
+        _publish('deleted', id=todo_id)
+    return deleted
 
-    todos = [t for t in todos if t.get('id') != todo_id]
 
-    if len(todos) < initial_length:
-        write_todos(todos)
-        return True
+def toggle_complete(todo_id: str) -> Optional[Dict]:
+    """Toggle todo completion status"""
+    with _write():
+        todo = get_todo_by_id(todo_id)
 
-    return False
+        if not todo:
+            return None
 
+        updates = {
+            'completed': not todo.get('completed', False)
+        }
 
-def toggle_complete(todo_id: str) -> Optional[Dict]:
-    """Toggle todo completion status"""
-    todo = get_todo_by_id(todo_id)
+        return update_todo(todo_id, updates)
 
-    if not todo:
-        return None
 
-    updates = {
-        'completed': not todo.get('completed', False)
-    }
+def apply_batch(operations: List[Dict]) -> List[Dict]:
+    """Apply create/update/delete/toggle operations with a single commit.
+
+    Each operation is {"op": ..., "id": ..., "data": {...}}. Operations run
+    in order inside one storage transaction; a failing item is reported in
+    its result and does not stop the others.
+    """
+    if not isinstance(operations, list):
+        raise ValueError('operations は配列で指定してください')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f'operations は最大 {MAX_BATCH_OPERATIONS} 件までです')
 
-    return update_todo(todo_id, updates)
+    results = []
+    with _write():
+        for index, operation in enumerate(operations):
+            try:
+                result = _apply_operation(operation)
+            except (KeyError, TypeError, ValueError, AttributeError) as error:
+                result = {'status': 400, 'error': f'不正な操作です: {error}'}
+            results.append({'index': index, **result})
+
+    return results
+
+
+def _apply_operation(operation: Dict) -> Dict:
+    op = operation['op']
+
+    if op == 'create':
+        return {'status': 201, 'todo': create_todo(operation['data'])}
+
+    if op == 'update':
+        todo = update_todo(operation['id'], operation['data'])
+    elif op == 'toggle':
+        todo = toggle_complete(operation['id'])
+    elif op == 'delete':
+        if delete_todo(operation['id']):
+            return {'status': 204}
+        todo = None
+    else:
+        raise ValueError(f'未対応の op: {op}')
+
+    if not todo:
+        return {'status': 404, 'error': 'TODOが見つかりません'}
+    return {'status': 200, 'todo': todo}
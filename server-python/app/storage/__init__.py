@@ -0,0 +1,59 @@
+import os
+import threading
+from pathlib import Path
+
+from app.storage.base import TodoStore
+from app.storage.memory import MemoryTodoStore
+from app.storage.journal import JournaledTodoStore
+from app.storage.sqlite import SqliteTodoStore
+
+# Data file path
+DATA_DIR = Path(__file__).parent.parent.parent / 'data'
+DATA_FILE = DATA_DIR / 'todos.json'
+JOURNAL_FILE = DATA_DIR / 'todos.log'
+SQLITE_FILE = DATA_DIR / 'todos.db'
+
+# Storage mode: 'memory' (write-behind snapshots), 'journal' (append-only log)
+# or 'sqlite' (shared database for multiple workers)
+STORAGE_MODE = os.getenv('TODO_STORAGE', 'memory').lower()
+
+# Coordinate the file-based modes across processes (gunicorn -w N)
+SHARED = os.getenv('TODO_SHARED', 'false').lower() == 'true'
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> TodoStore:
+    """Get the process-wide todo store, loading it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _create_store()
+    return _store
+
+
+def _create_store() -> TodoStore:
+    if STORAGE_MODE == 'sqlite':
+        return SqliteTodoStore(
+            Path(os.getenv('TODO_SQLITE_PATH', SQLITE_FILE)),
+            migrate_from=DATA_FILE,
+            pool_size=int(os.getenv('TODO_SQLITE_POOL_SIZE', '4'))
+        )
+    if STORAGE_MODE == 'journal':
+        return JournaledTodoStore(
+            DATA_FILE,
+            log_path=JOURNAL_FILE,
+            compact_interval=float(os.getenv('TODO_COMPACT_INTERVAL', '60')),
+            compact_threshold=int(os.getenv('TODO_COMPACT_THRESHOLD', '1000')),
+            fsync=os.getenv('TODO_JOURNAL_FSYNC', 'false').lower() == 'true',
+            shared=SHARED
+        )
+    if STORAGE_MODE != 'memory':
+        raise ValueError(f'Unknown TODO_STORAGE mode: {STORAGE_MODE}')
+    return MemoryTodoStore(
+        DATA_FILE,
+        flush_interval=float(os.getenv('TODO_FLUSH_INTERVAL', '0.5')),
+        shared=SHARED
+    )
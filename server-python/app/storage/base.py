@@ -0,0 +1,139 @@
+import heapq
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import total_ordering
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Fields a listing can be sorted by
+SORT_FIELDS = ('createdAt', 'updatedAt', 'priority', 'deadline')
+
+# Priority sorts by urgency rather than alphabetically
+PRIORITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'urgent': 3}
+
+
+def sort_value(todo: Dict, field: str) -> Any:
+    """Value a todo is sorted by; None sorts last in both directions"""
+    value = todo.get(field)
+    if field == 'priority':
+        return PRIORITY_RANK.get(value)
+    return value
+
+
+@total_ordering
+class _Descending:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def sort_key(value: Any, todo_id: str, descending: bool) -> Tuple:
+    """Total order on (value, id) with missing values last"""
+    if descending:
+        return (value is None, _Descending(value), _Descending(todo_id))
+    return (value is None, value, todo_id)
+
+
+def select_page(
+    todos: Iterable[Dict],
+    sort: str,
+    descending: bool = False,
+    after: Optional[Tuple[Any, str]] = None,
+    limit: Optional[int] = None
+) -> List[Dict]:
+    """Sort todos and return the `limit` rows that follow the `after` key"""
+    def key(todo):
+        return sort_key(sort_value(todo, sort), todo['id'], descending)
+
+    if after is not None:
+        after_key = sort_key(after[0], after[1], descending)
+        todos = (t for t in todos if key(t) > after_key)
+
+    if limit is None:
+        return sorted(todos, key=key)
+    # Partial selection: O(N log limit) instead of a full sort
+    return heapq.nsmallest(limit, todos, key=key)
+
+
+class TodoStore(ABC):
+    """Storage backend interface used by todos_service.
+
+    Todos are plain dicts keyed by their 'id'. Returned dicts are copies;
+    callers persist changes by passing the modified dict back to put().
+    """
+
+    @abstractmethod
+    def get(self, todo_id: str) -> Optional[Dict]:
+        """Get a single todo by ID"""
+
+    @abstractmethod
+    def list(
+        self,
+        completed: Optional[bool] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> List[Dict]:
+        """List todos in insertion order with optional filters"""
+
+    def page(
+        self,
+        completed: Optional[bool] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None,
+        sort: str = 'createdAt',
+        descending: bool = False,
+        after: Optional[Tuple[Any, str]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Sorted, keyset-paginated listing.
+
+        `after` is the (sort value, id) of the last row of the previous page.
+        """
+        return select_page(self.list(completed, category, priority), sort, descending, after, limit)
+
+    @abstractmethod
+    def iter_all(self) -> Iterator[Dict]:
+        """Iterate over all todos in insertion order"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored todos"""
+
+    @abstractmethod
+    def put(self, todo: Dict):
+        """Insert or replace a todo"""
+
+    def put_many(self, todos: Iterable[Dict]):
+        """Insert or replace several todos with a single commit"""
+        with self.transaction():
+            for todo in todos:
+                self.put(todo)
+
+    @abstractmethod
+    def delete(self, todo_id: str) -> bool:
+        """Delete a todo, returning whether it existed"""
+
+    @abstractmethod
+    @contextmanager
+    def transaction(self):
+        """Make a read-modify-write atomic; yields the store itself"""
+
+    @abstractmethod
+    def version(self) -> Tuple[str, float]:
+        """(token, modified time) of the dataset.
+
+        The token changes whenever any todo changes, so it can serve as an
+        ETag; the modified time is a Unix timestamp for Last-Modified.
+        """
+
+    def flush(self):
+        """Force pending writes to durable storage"""
+
+    def close(self):
+        """Flush and release resources"""
@@ -0,0 +1,42 @@
+import fcntl
+import os
+import threading
+from pathlib import Path
+
+
+class FileLock:
+    """Cross-process reader/writer lock on a sidecar lock file (flock).
+
+    Callers serialize threads themselves (the stores hold their own lock
+    while using this), so a single descriptor per process is enough. The
+    descriptor is reopened after fork, because flock locks belong to the
+    open file description that a forked child would otherwise share.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd = None
+        self._pid = None
+        self._depth = 0
+        self._guard = threading.Lock()
+
+    def _descriptor(self) -> int:
+        if self._fd is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+            self._depth = 0
+        return self._fd
+
+    def acquire(self, exclusive: bool = True):
+        with self._guard:
+            fd = self._descriptor()
+            if self._depth == 0:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._depth += 1
+
+    def release(self):
+        with self._guard:
+            self._depth -= 1
+            if self._depth == 0:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
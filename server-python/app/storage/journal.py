@@ -0,0 +1,250 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.storage.memory import MemoryTodoStore, file_signature
+
+# Reused for every record; json.dumps() with options builds a new encoder per call
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+class JournaledTodoStore(MemoryTodoStore):
+    """In-memory todo store persisted as a snapshot plus an append-only log.
+
+    Every create/update/delete appends one JSON line to the log, so the disk
+    I/O per mutation does not depend on how many todos exist. Startup loads
+    the snapshot and replays the log; a background compactor periodically
+    writes a fresh snapshot and starts a new, empty log.
+
+    In shared mode each process tails the log under the file lock before
+    appending, so workers see each other's records in order.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        log_path: Optional[Path] = None,
+        compact_interval: float = 60.0,
+        compact_threshold: int = 1000,
+        fsync: bool = False,
+        shared: bool = False
+    ):
+        path = Path(path)
+        self.log_path = Path(log_path) if log_path else path.with_suffix('.log')
+        # While compacting, the previous log is kept under this name until
+        # the new snapshot is safely on disk
+        self.compacting_path = self.log_path.with_name(self.log_path.name + '.compacting')
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+
+        self._log_file = None
+        # Records of the running transaction, appended together on commit
+        self._pending: List[str] = []
+        self._log_records = 0
+        self._log_inode = None
+        self._log_offset = 0
+
+        super().__init__(path, flush_interval=compact_interval, shared=shared)
+
+    # ---- Loading -------------------------------------------------------
+
+    def _load(self):
+        """Load the snapshot, then replay any logs written after it"""
+        super()._load()
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+            applied, _ = self._replay(self.compacting_path)
+            self._log_records = applied
+            applied, self._log_offset = self._replay(self.log_path)
+            self._log_records += applied
+            self._log_file = open(self.log_path, 'a', encoding='utf-8')
+            st = os.fstat(self._log_file.fileno())
+            self._log_inode = st.st_ino
+            self._touch(max(os.path.getmtime(self.path), st.st_mtime))
+
+    def _replay(self, log_path: Path, offset: int = 0) -> Tuple[int, int]:
+        """Apply log records from offset; returns (applied, end offset)"""
+        if not log_path.exists():
+            return 0, 0
+
+        with open(log_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+
+        lines = data.split(b'\n')
+        applied = 0
+        position = offset
+        for index, line in enumerate(lines):
+            is_last = index == len(lines) - 1
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if is_last:
+                        # A torn final record from a crash mid-append; it
+                        # was never acknowledged, so it is safe to drop.
+                        # Truncate it so later appends start on a clean line.
+                        print(f'Ignoring incomplete journal record in {log_path}')
+                        with open(log_path, 'r+b') as f:
+                            f.truncate(position)
+                        break
+                    print(f'Error reading journal {log_path} at byte {position}')
+                    raise Exception('データの読み込みに失敗しました')
+
+                if record['op'] == 'put':
+                    self._insert(record['todo'])
+                elif record['op'] == 'delete':
+                    self._remove(record['id'])
+                applied += 1
+
+            position += len(line) + (0 if is_last else 1)
+
+        return applied, position
+
+    # ---- Cross-process coordination ---------------------------------------
+
+    def _log_state(self) -> Optional[os.stat_result]:
+        try:
+            return os.stat(self.log_path)
+        except FileNotFoundError:
+            return None
+
+    def _is_stale(self) -> bool:
+        if file_signature(self.path) != self._signature:
+            return True
+        st = self._log_state()
+        return st is None or st.st_ino != self._log_inode or st.st_size != self._log_offset
+
+    def _refresh(self):
+        """Catch up with records other processes appended to the log"""
+        if not self._is_stale():
+            return
+
+        st = self._log_state()
+        if (file_signature(self.path) != self._signature or st is None
+                or st.st_ino != self._log_inode or st.st_size < self._log_offset):
+            # Another process compacted: start over from its snapshot
+            self._load()
+            return
+
+        applied, self._log_offset = self._replay(self.log_path, self._log_offset)
+        self._log_records += applied
+        self._touch(os.path.getmtime(self.log_path))
+
+    # ---- Persistence -------------------------------------------------------
+
+    def _changed(self, op: str, todo_id: str, todo: Optional[Dict]):
+        """Queue one log record; called inside a transaction"""
+        self._pending.append(self._record_line(op, todo_id, todo))
+
+    def _record_line(self, op: str, todo_id: str, todo: Optional[Dict]) -> str:
+        if op == 'put':
+            record = {'op': 'put', 'todo': todo}
+        else:
+            record = {'op': 'delete', 'id': todo_id}
+        return _encoder.encode(record)
+
+    def _commit(self):
+        """Append the transaction's records to the log in one write"""
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        try:
+            self._append(''.join(line + '\n' for line in lines))
+        except Exception as error:
+            print(f'Error writing todo journal: {error}')
+            raise Exception('データの保存に失敗しました')
+
+        self._log_records += len(lines)
+        if self._log_records >= self.compact_threshold:
+            self._wakeup.set()
+
+    def _append(self, data: str):
+        self._log_file.write(data)
+        self._log_file.flush()
+        if self.fsync:
+            os.fsync(self._log_file.fileno())
+        self._log_offset = self._log_file.tell()
+
+    def _start_background(self):
+        # The compactor runs in every mode, including shared
+        self._writer = self._start_thread(self._background_loop, 'todo-journal-compactor')
+
+    def _background_loop(self):
+        while not self._closed:
+            # Compact on a timer, or earlier once the log grows large
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            if self._closed:
+                break
+            try:
+                self.compact()
+            except Exception as error:
+                print(f'Error compacting todo journal: {error}')
+
+    def compact(self):
+        """Write a fresh snapshot and start a new, empty log"""
+        with self._io_lock:
+            with self._locked(exclusive=True):
+                if self.shared:
+                    self._refresh()
+                if self._log_records == 0:
+                    return
+                snapshot = list(self._todos.values())
+                rotated = self._log_records
+                self._rotate_log()
+
+                if self.shared:
+                    # Other processes must not see the new, empty log
+                    # before the snapshot that replaces the old one
+                    self._finish_compaction(snapshot, rotated)
+                    return
+
+            self._finish_compaction(snapshot, rotated)
+
+    def _rotate_log(self):
+        """Move the current log aside and open a new one; store lock held"""
+        self._log_file.close()
+        if self.compacting_path.exists():
+            # A previous compaction failed after rotating; fold the current
+            # log into the pending one instead of replacing it
+            with open(self.log_path, 'r', encoding='utf-8') as src, \
+                    open(self.compacting_path, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+            self._log_file = open(self.log_path, 'w', encoding='utf-8')
+        else:
+            os.replace(self.log_path, self.compacting_path)
+            self._log_file = open(self.log_path, 'a', encoding='utf-8')
+        self._log_inode = os.fstat(self._log_file.fileno()).st_ino
+        self._log_offset = 0
+        self._log_records = 0
+
+    def _finish_compaction(self, snapshot: List[Dict], rotated: int):
+        try:
+            self._write_snapshot(snapshot)
+        except Exception:
+            with self._lock:
+                self._log_records += rotated
+            raise
+        os.remove(self.compacting_path)
+
+    def flush(self):
+        """Force appended records down to disk"""
+        with self._lock:
+            if self._log_file and not self._log_file.closed:
+                self._log_file.flush()
+                os.fsync(self._log_file.fileno())
+
+    def close(self):
+        """Compact the log and stop the compactor thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        try:
+            self.compact()
+        finally:
+            with self._lock:
+                self._log_file.close()
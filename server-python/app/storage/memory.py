@@ -0,0 +1,398 @@
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.storage.base import TodoStore, select_page
+from app.storage.filelock import FileLock
+
+# Fields that get a secondary index (value -> ids)
+INDEXED_FIELDS = ('completed', 'category', 'priority')
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Identify a file version cheaply; changes on every atomic replace"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class MemoryTodoStore(TodoStore):
+    """Resident todo store with secondary indexes and write-behind persistence.
+
+    The JSON file is read once at startup. Reads and writes are served from
+    memory; a background thread flushes the latest state to disk in batches,
+    so the file is no longer on the request path.
+
+    With shared=True several processes (gunicorn workers) may use the same
+    file. Every transaction then takes an exclusive file lock, reloads the
+    file if another process replaced it, and writes through before
+    releasing the lock, so no worker overwrites another worker's changes.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = 0.5, shared: bool = False):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.shared = shared
+
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()
+        self._file_lock = FileLock(self.path.with_name(self.path.name + '.lock')) if shared else None
+        self._tx_depth = 0
+        self._signature = None
+
+        # Dataset version: a per-instance epoch plus a counter bumped on
+        # every change, so tokens from different workers never collide
+        self._epoch = uuid.uuid4().hex[:8]
+        self._version = 0
+        self._modified = time.time()
+
+        self._todos: Dict[str, Dict] = {}
+        self._order: Dict[str, int] = {}
+        self._counter = itertools.count()
+        self._indexes: Dict[str, Dict] = {field: {} for field in INDEXED_FIELDS}
+
+        self._dirty = False
+        self._closed = False
+        self._wakeup = threading.Event()
+
+        with self._locked(exclusive=True):
+            self._load()
+
+        self._start_background()
+        atexit.register(self.close)
+
+    # ---- Loading -------------------------------------------------------
+
+    def _ensure_file(self):
+        """Ensure data directory and file exist"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self._write_snapshot([])
+
+    def _load(self):
+        """Load todos from disk and build indexes"""
+        self._ensure_file()
+        signature = file_signature(self.path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                todos = json.load(f)
+        except Exception as error:
+            # Never fall back to an empty store here: the next flush would
+            # overwrite the file and lose every todo.
+            print(f'Error reading todos: {error}')
+            raise Exception('データの読み込みに失敗しました')
+
+        with self._lock:
+            self._reset(todos)
+            self._signature = signature
+            self._touch(os.path.getmtime(self.path))
+
+    def _reset(self, todos: List[Dict]):
+        """Replace the resident state with the given todos"""
+        self._todos = {}
+        self._order = {}
+        self._indexes = {field: {} for field in INDEXED_FIELDS}
+        for todo in todos:
+            self._insert(todo)
+
+    # ---- Cross-process coordination ---------------------------------------
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the store lock and, in shared mode, the file lock"""
+        with self._lock:
+            if self._file_lock is None:
+                yield
+                return
+            self._file_lock.acquire(exclusive)
+            try:
+                yield
+            finally:
+                self._file_lock.release()
+
+    def _is_stale(self) -> bool:
+        """Whether another process changed the files since we last synced"""
+        return file_signature(self.path) != self._signature
+
+    def _refresh(self):
+        """Reload state written by other processes; file lock must be held"""
+        if self._is_stale():
+            self._load()
+
+    def _sync_for_read(self):
+        if not self.shared or self._tx_depth or not self._is_stale():
+            return
+        with self._locked(exclusive=False):
+            self._refresh()
+
+    def _touch(self, modified: Optional[float] = None):
+        """Advance the dataset version; store lock held"""
+        self._version += 1
+        self._modified = max(self._modified, modified if modified is not None else time.time())
+
+    def version(self) -> Tuple[str, float]:
+        """(token, modified time) of the dataset"""
+        with self._lock:
+            self._sync_for_read()
+            return f'{self._epoch}-{self._version}', self._modified
+
+    # ---- Index maintenance ----------------------------------------------
+
+    def _insert(self, todo: Dict):
+        todo_id = todo['id']
+        if todo_id in self._todos:
+            self._unindex(self._todos[todo_id])
+        else:
+            self._order[todo_id] = next(self._counter)
+        self._todos[todo_id] = todo
+        for field in INDEXED_FIELDS:
+            bucket = self._indexes[field].setdefault(todo.get(field), {})
+            bucket[todo_id] = None
+
+    def _unindex(self, todo: Dict):
+        todo_id = todo['id']
+        for field in INDEXED_FIELDS:
+            bucket = self._indexes[field].get(todo.get(field))
+            if bucket is not None:
+                bucket.pop(todo_id, None)
+                if not bucket:
+                    del self._indexes[field][todo.get(field)]
+
+    def _remove(self, todo_id: str) -> bool:
+        todo = self._todos.pop(todo_id, None)
+        if todo is None:
+            return False
+        self._unindex(todo)
+        del self._order[todo_id]
+        return True
+
+    # ---- Public API --------------------------------------------------------
+
+    def get(self, todo_id: str) -> Optional[Dict]:
+        """Get a single todo by ID"""
+        with self._lock:
+            self._sync_for_read()
+            todo = self._todos.get(todo_id)
+            return dict(todo) if todo is not None else None
+
+    def list(
+        self,
+        completed: Optional[bool] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> List[Dict]:
+        """List todos in insertion order, using the indexes for filters"""
+        filters = {}
+        if completed is not None:
+            filters['completed'] = completed
+        if category:
+            filters['category'] = category
+        if priority:
+            filters['priority'] = priority
+
+        with self._lock:
+            self._sync_for_read()
+            return [dict(t) for t in self._filter(filters)]
+
+    def _filter(self, filters: Dict) -> List[Dict]:
+        """Stored (uncopied) todos matching the filters, in insertion order"""
+        if not filters:
+            return list(self._todos.values())
+
+        # Start from the smallest matching bucket and check the rest
+        buckets = [self._indexes[field].get(value, {}) for field, value in filters.items()]
+        buckets.sort(key=len)
+        ids = [i for i in buckets[0] if all(i in b for b in buckets[1:])]
+        ids.sort(key=self._order.__getitem__)
+        return [self._todos[i] for i in ids]
+
+    def page(
+        self,
+        completed: Optional[bool] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None,
+        sort: str = 'createdAt',
+        descending: bool = False,
+        after: Optional[Tuple[Any, str]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Sorted, keyset-paginated listing; only the page itself is copied"""
+        filters = {}
+        if completed is not None:
+            filters['completed'] = completed
+        if category:
+            filters['category'] = category
+        if priority:
+            filters['priority'] = priority
+
+        with self._lock:
+            self._sync_for_read()
+            rows = select_page(self._filter(filters), sort, descending, after, limit)
+            return [dict(t) for t in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync_for_read()
+            return len(self._todos)
+
+    def iter_all(self) -> Iterator[Dict]:
+        """Iterate over a point-in-time view of all todos"""
+        with self._lock:
+            self._sync_for_read()
+            todos = list(self._todos.values())
+        for todo in todos:
+            yield dict(todo)
+
+    @contextmanager
+    def transaction(self):
+        """Hold the store lock across a read-modify-write.
+
+        Nested transactions join the outermost one, which commits once.
+        """
+        with self._lock:
+            if self._tx_depth:
+                self._tx_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._tx_depth -= 1
+                return
+
+            with self._locked(exclusive=True):
+                if self.shared:
+                    self._refresh()
+                self._tx_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._tx_depth -= 1
+                    self._commit()
+
+    def put(self, todo: Dict):
+        """Insert or replace a todo"""
+        with self.transaction():
+            # Store a private copy; stored dicts are never mutated in place,
+            # which lets the writer serialize them outside the lock.
+            stored = dict(todo)
+            self._insert(stored)
+            self._changed('put', stored['id'], stored)
+            self._touch()
+
+    def put_many(self, todos: Iterable[Dict]):
+        """Insert or replace several todos with a single commit"""
+        with self.transaction():
+            for todo in todos:
+                stored = dict(todo)
+                self._insert(stored)
+                self._changed('put', stored['id'], stored)
+            self._touch()
+
+    def delete(self, todo_id: str) -> bool:
+        """Delete a todo, returning whether it existed"""
+        with self.transaction():
+            removed = self._remove(todo_id)
+            if removed:
+                self._changed('delete', todo_id, None)
+                self._touch()
+            return removed
+
+    # ---- Persistence -------------------------------------------------------
+
+    def _changed(self, op: str, todo_id: str, todo: Optional[Dict]):
+        """Record a single change; called with the store lock held"""
+        self._mark_dirty()
+
+    def _commit(self):
+        """Persist the outermost transaction; file lock is held if shared"""
+        if not self.shared or not self._dirty:
+            # Outside shared mode the write-behind thread persists changes
+            return
+        try:
+            self._write_snapshot(list(self._todos.values()))
+        except Exception as error:
+            # Drop the unsaved changes rather than let them leak into a
+            # later write; the next transaction reloads the file.
+            self._signature = None
+            print(f'Error writing todos: {error}')
+            raise Exception('データの保存に失敗しました')
+        finally:
+            self._dirty = False
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if not self.shared:
+            self._wakeup.set()
+
+    def _start_background(self):
+        if self.shared:
+            # Shared mode writes through on commit; no write-behind thread
+            return
+        self._writer = self._start_thread(self._background_loop, 'todo-store-writer')
+
+    def _start_thread(self, target, name: str) -> threading.Thread:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def _background_loop(self):
+        while not self._closed:
+            self._wakeup.wait()
+            # Let more writes accumulate so they are flushed as one batch
+            self._wakeup.clear()
+            if self._closed:
+                break
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # Keep the state dirty; the next wakeup retries
+                self._wakeup.set()
+
+    def flush(self):
+        """Write the current state to disk if it changed"""
+        if self.shared:
+            with self.transaction():
+                return
+
+        with self._io_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = list(self._todos.values())
+                self._dirty = False
+
+            try:
+                self._write_snapshot(snapshot)
+            except Exception as error:
+                with self._lock:
+                    self._dirty = True
+                print(f'Error writing todos: {error}')
+                raise Exception('データの保存に失敗しました')
+
+    def _write_snapshot(self, todos: List[Dict]):
+        """Atomically replace the data file with the given todos"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(todos, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._signature = file_signature(self.path)
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
@@ -0,0 +1,361 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.storage.base import PRIORITY_RANK, SORT_FIELDS, TodoStore
+
+# SQL expression for each sortable field, matching base.sort_value()
+SORT_EXPRESSIONS = {
+    'createdAt': "json_extract(data, '$.createdAt')",
+    'updatedAt': "json_extract(data, '$.updatedAt')",
+    'deadline': "json_extract(data, '$.deadline')",
+    'priority': 'CASE priority ' + ' '.join(
+        f"WHEN '{name}' THEN {rank}" for name, rank in PRIORITY_RANK.items()
+    ) + ' END',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    completed INTEGER NOT NULL DEFAULT 0,
+    category TEXT,
+    priority TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_todos_completed ON todos (completed, seq);
+CREATE INDEX IF NOT EXISTS idx_todos_category ON todos (category, seq);
+CREATE INDEX IF NOT EXISTS idx_todos_priority ON todos (priority, seq);
+CREATE INDEX IF NOT EXISTS idx_todos_created_at ON todos (json_extract(data, '$.createdAt'), id);
+CREATE INDEX IF NOT EXISTS idx_todos_updated_at ON todos (json_extract(data, '$.updatedAt'), id);
+CREATE INDEX IF NOT EXISTS idx_todos_deadline ON todos (json_extract(data, '$.deadline'), id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO todos (id, completed, category, priority, data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    completed = excluded.completed,
+    category = excluded.category,
+    priority = excluded.priority,
+    data = excluded.data
+"""
+
+
+class _ConnectionPool:
+    """Bounded pool of SQLite connections owned by one process.
+
+    Connections are never shared across a fork: when a gunicorn worker
+    is forked from the master, the pool notices the new pid and starts
+    fresh instead of reusing the parent's handles.
+    """
+
+    def __init__(self, path: Path, size: int, busy_timeout: float):
+        self.path = path
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle = queue.LifoQueue()
+                self._created = 0
+            idle = self._idle
+            try:
+                conn = idle.get_nowait()
+            except queue.Empty:
+                conn = None
+                if self._created < self.size:
+                    self._created += 1
+                    conn = self._connect()
+
+        if conn is None:
+            conn = idle.get(timeout=self.busy_timeout)
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class SqliteTodoStore(TodoStore):
+    """Todo store backed by SQLite in WAL mode.
+
+    Filters run as indexed queries, and several gunicorn workers can share
+    one database: readers run concurrently with a single writer, and
+    read-modify-write transactions take the write lock up front.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        migrate_from: Optional[Path] = None,
+        pool_size: int = 4,
+        busy_timeout: float = 10.0
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pool = _ConnectionPool(self.path, pool_size, busy_timeout)
+        # Connection of the transaction running on the current thread
+        self._local = threading.local()
+
+        with self._pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            # The epoch identifies this database, so version tokens of two
+            # databases never collide
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES "
+                "('epoch', ?), ('version', '0'), ('modified', ?)",
+                (uuid.uuid4().hex[:8], str(time.time()))
+            )
+
+        if migrate_from is not None:
+            migrate_from_json(self, migrate_from)
+
+    @contextmanager
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        with self._pool.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def transaction(self):
+        """Run a read-modify-write under the database write lock"""
+        if getattr(self._local, 'conn', None) is not None:
+            # Nested transaction: join the outer one
+            yield self
+            return
+
+        with self._pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            self._local.conn = conn
+            try:
+                yield self
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            finally:
+                self._local.conn = None
+
+    # ---- Reads -----------------------------------------------------------
+
+    def get(self, todo_id: str) -> Optional[Dict]:
+        """Get a single todo by ID"""
+        with self._connection() as conn:
+            row = conn.execute('SELECT data FROM todos WHERE id = ?', (todo_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(
+        self,
+        completed: Optional[bool] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> List[Dict]:
+        """List todos in insertion order with indexed filters"""
+        clauses, params = self._filter_clauses(completed, category, priority)
+        sql = 'SELECT data FROM todos'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY seq'
+
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _filter_clauses(
+        self,
+        completed: Optional[bool],
+        category: Optional[str],
+        priority: Optional[str]
+    ) -> Tuple[List[str], List[Any]]:
+        clauses = []
+        params = []
+        if completed is not None:
+            clauses.append('completed = ?')
+            params.append(int(completed))
+        if category:
+            clauses.append('category = ?')
+            params.append(category)
+        if priority:
+            clauses.append('priority = ?')
+            params.append(priority)
+        return clauses, params
+
+    def page(
+        self,
+        completed: Optional[bool] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None,
+        sort: str = 'createdAt',
+        descending: bool = False,
+        after: Optional[Tuple[Any, str]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Sorted, keyset-paginated listing pushed down to SQL"""
+        if sort not in SORT_FIELDS:
+            raise ValueError(f'Unsupported sort field: {sort}')
+        expr = SORT_EXPRESSIONS[sort]
+        clauses, params = self._filter_clauses(completed, category, priority)
+
+        # Same order as base.sort_key(): missing values last, then value, then id
+        cmp = '<' if descending else '>'
+        if after is not None:
+            value, todo_id = after
+            if value is None:
+                clauses.append(f'({expr}) IS NULL AND id {cmp} ?')
+                params.append(todo_id)
+            else:
+                clauses.append(
+                    f'(({expr}) IS NULL OR ({expr}) {cmp} ? OR (({expr}) = ? AND id {cmp} ?))'
+                )
+                params.extend([value, value, todo_id])
+
+        direction = 'DESC' if descending else 'ASC'
+        sql = 'SELECT data FROM todos'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += f' ORDER BY ({expr}) IS NULL, ({expr}) {direction}, id {direction}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_all(self) -> Iterator[Dict]:
+        """Iterate over all todos in insertion order, a page at a time"""
+        last_seq = 0
+        while True:
+            with self._connection() as conn:
+                rows = conn.execute(
+                    'SELECT seq, data FROM todos WHERE seq > ? ORDER BY seq LIMIT 500',
+                    (last_seq,)
+                ).fetchall()
+            if not rows:
+                return
+            for seq, data in rows:
+                yield json.loads(data)
+            last_seq = rows[-1][0]
+
+    def __len__(self) -> int:
+        with self._connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM todos').fetchone()[0]
+
+    # ---- Writes ----------------------------------------------------------
+
+    def put(self, todo: Dict):
+        """Insert or replace a todo"""
+        self.put_many([todo])
+
+    def put_many(self, todos: List[Dict]):
+        """Insert or replace several todos in one transaction"""
+        rows = [
+            (
+                todo['id'],
+                int(bool(todo.get('completed'))),
+                todo.get('category'),
+                todo.get('priority'),
+                json.dumps(todo, ensure_ascii=False)
+            )
+            for todo in todos
+        ]
+        with self.transaction():
+            with self._connection() as conn:
+                conn.executemany(UPSERT_SQL, rows)
+                self._touch(conn)
+
+    def delete(self, todo_id: str) -> bool:
+        """Delete a todo, returning whether it existed"""
+        with self.transaction():
+            with self._connection() as conn:
+                cursor = conn.execute('DELETE FROM todos WHERE id = ?', (todo_id,))
+                if cursor.rowcount > 0:
+                    self._touch(conn)
+        return cursor.rowcount > 0
+
+    def _touch(self, conn: sqlite3.Connection):
+        """Advance the dataset version inside the running transaction"""
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'")
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'modified'", (str(time.time()),))
+
+    def version(self) -> Tuple[str, float]:
+        """(token, modified time) of the dataset, shared by all workers"""
+        with self._connection() as conn:
+            meta = dict(conn.execute(
+                "SELECT key, value FROM meta WHERE key IN ('epoch', 'version', 'modified')"
+            ).fetchall())
+        return f"{meta['epoch']}-{meta['version']}", float(meta['modified'])
+
+    def close(self):
+        """Close pooled connections"""
+        self._pool.close()
+
+
+def migrate_from_json(store: SqliteTodoStore, json_path: Path) -> int:
+    """Import todos.json into an empty database, once.
+
+    Returns the number of imported todos. A marker in the meta table keeps
+    the migration from running again, even after every todo is deleted.
+    """
+    json_path = Path(json_path)
+    with store.transaction():
+        with store._connection() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+            if done:
+                return 0
+
+            todos = []
+            if json_path.exists():
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    todos = json.load(f)
+
+            store.put_many(todos)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_from', ?)",
+                (str(json_path),)
+            )
+
+    print(f'Migrated {len(todos)} todos from {json_path} to {store.path}')
+    return len(todos)
@@ -0,0 +1,297 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional
+
+# Queue order of request classes; lower runs first
+PRIORITIES = {'interactive': 0, 'standard': 1, 'heavy': 2}
+
+# Request class of each AI operation
+OPERATION_PRIORITY = {
+    'classify_task': 'interactive',
+    'set_priority': 'interactive',
+    'generate_search_query': 'interactive',
+    'generate_completion_message': 'interactive',
+    'enrich_task': 'interactive',
+    'generate_execution_guide': 'standard',
+    'generate_tasks': 'standard',
+    'classify_tasks': 'heavy',
+    'set_priorities': 'heavy',
+    'detect_stale_tasks': 'heavy',
+    'recommend_tasks': 'heavy',
+}
+
+# Whole-call latency above which a call counts as slow, for operations that
+# normally take longer than AI_LATENCY_TARGET: long answers (task lists,
+# execution guides) and calls packing many tasks. Judging them by the
+# short-call target would halve the window under healthy load. Streams
+# are judged by their first token, so they use the default target.
+# AI_LATENCY_TARGET_<OPERATION> overrides.
+OPERATION_LATENCY_TARGETS = {
+    'generate_tasks': 45,
+    'generate_execution_guide': 60,
+    'classify_tasks': 45,
+    'set_priorities': 45,
+    'detect_stale_tasks': 45,
+    'recommend_tasks': 45,
+}
+
+THROTTLE_MARKERS = ('throttl', 'too many requests', 'rate exceeded', 'serviceunavailable')
+
+
+class Overloaded(Exception):
+    """Raised when a call is rejected instead of queued"""
+
+    def __init__(self, message: str = 'AIサービスが混雑しています。しばらくしてから再試行してください'):
+        super().__init__(message)
+
+
+def is_throttle(error: BaseException) -> bool:
+    """Whether an upstream error means Bedrock is shedding load"""
+    text = f'{type(error).__name__} {error}'.lower()
+    return any(marker in text for marker in THROTTLE_MARKERS)
+
+
+class _Waiter:
+    __slots__ = ('rank', 'seq', 'granted', 'rejected', 'event', 'loop', 'future')
+
+    def __init__(self, rank: int, seq: int):
+        self.rank = rank
+        self.seq = seq
+        self.granted = False
+        self.rejected = False
+        self.event = None
+        self.loop = None
+        self.future = None
+
+
+class _Slot:
+    """One admitted call; measures its latency for the controller"""
+
+    def __init__(self, latency_target: Optional[float] = None):
+        self.started = time.monotonic()
+        self.latency: Optional[float] = None
+        self.latency_target = latency_target
+
+    def first_byte(self):
+        """Fix the latency sample now, for streams that stay open long after"""
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+
+
+class AdmissionController:
+    """Client-side AIMD concurrency window for outbound model calls.
+
+    At most `limit` calls run at once. Each success that stays under the
+    latency target (the caller's, or the controller's default) widens the
+    window by about one call per window's worth
+    of completions (additive increase); a throttle error or a slow answer
+    halves it (multiplicative decrease), at most once per cooldown.
+
+    Callers over the window wait in a bounded queue ordered by priority,
+    so interactive calls overtake heavy ones. When the queue is full, a
+    newcomer displaces the lowest-priority waiter or is rejected at once
+    with Overloaded; waiters that are not admitted within the queue
+    timeout are rejected too. Sync callers wait on a threading.Event,
+    async callers on a future of their own event loop.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        max_queue: int = 100,
+        queue_timeout: float = 10.0,
+        latency_target: float = 20.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 2.0
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self._stats = {'admitted': 0, 'waited': 0, 'rejected': 0, 'throttled': 0, 'decreases': 0}
+
+    # ---- Queue management (lock held) ---------------------------------------
+
+    def _enqueue(self, priority: str) -> _Waiter:
+        """Admit at once, or queue a waiter; raises Overloaded when full"""
+        waiter = _Waiter(PRIORITIES.get(priority, PRIORITIES['standard']), next(self._seq))
+        if self._in_flight < int(self.limit) and not self._queue:
+            self._grant(waiter)
+            return waiter
+
+        if len(self._queue) >= self.max_queue:
+            worst = max(self._queue, key=lambda w: (w.rank, w.seq))
+            if worst.rank <= waiter.rank:
+                self._stats['rejected'] += 1
+                raise Overloaded()
+            # Displace the newest waiter of the lowest priority
+            self._queue.remove(worst)
+            self._reject(worst)
+
+        self._queue.append(waiter)
+        self._stats['waited'] += 1
+        return waiter
+
+    def _grant(self, waiter: _Waiter):
+        waiter.granted = True
+        self._in_flight += 1
+        self._stats['admitted'] += 1
+        self._wake(waiter)
+
+    def _reject(self, waiter: _Waiter):
+        waiter.rejected = True
+        self._stats['rejected'] += 1
+        self._wake(waiter)
+
+    def _wake(self, waiter: _Waiter):
+        if waiter.event is not None:
+            waiter.event.set()
+        elif waiter.future is not None:
+            waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+    def _dispatch(self):
+        """Admit queued waiters while the window has room"""
+        while self._queue and self._in_flight < int(self.limit):
+            waiter = min(self._queue, key=lambda w: (w.rank, w.seq))
+            self._queue.remove(waiter)
+            self._grant(waiter)
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Withdraw a waiter that gave up; True if it was admitted meanwhile"""
+        if waiter.granted:
+            return True
+        if waiter in self._queue:
+            self._queue.remove(waiter)
+        if not waiter.rejected:
+            self._stats['rejected'] += 1
+        return False
+
+    # ---- Feedback ----------------------------------------------------------
+
+    def _release(self, slot: Optional[_Slot], error: Optional[BaseException]):
+        with self._lock:
+            self._in_flight -= 1
+            if slot is not None:
+                slot.first_byte()
+                throttled = error is not None and is_throttle(error)
+                if throttled:
+                    self._stats['throttled'] += 1
+                target = slot.latency_target or self.latency_target
+                if throttled or slot.latency > target:
+                    now = time.monotonic()
+                    if now - self._last_decrease >= self.cooldown:
+                        self._last_decrease = now
+                        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                        self._stats['decreases'] += 1
+                elif error is None:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._dispatch()
+
+    # ---- Public API -------------------------------------------------------
+
+    @contextmanager
+    def slot(self, priority: str = 'standard', latency_target: Optional[float] = None):
+        """Hold a concurrency slot for a blocking call"""
+        with self._lock:
+            waiter = self._enqueue(priority)
+            if not waiter.granted:
+                waiter.event = threading.Event()
+
+        if not waiter.granted:
+            waiter.event.wait(self.queue_timeout)
+            with self._lock:
+                if not self._abandon(waiter):
+                    raise Overloaded()
+
+        slot = _Slot(latency_target)
+        try:
+            yield slot
+        except BaseException as error:
+            self._release(slot, error)
+            raise
+        self._release(slot, None)
+
+    @asynccontextmanager
+    async def aslot(self, priority: str = 'standard', latency_target: Optional[float] = None):
+        """Hold a concurrency slot for an awaited call"""
+        with self._lock:
+            waiter = self._enqueue(priority)
+            if not waiter.granted:
+                waiter.loop = asyncio.get_running_loop()
+                waiter.future = waiter.loop.create_future()
+
+        if not waiter.granted:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # The caller went away; hand back a slot granted meanwhile
+                with self._lock:
+                    admitted = self._abandon(waiter)
+                if admitted:
+                    self._release(None, None)
+                raise
+            with self._lock:
+                admitted = self._abandon(waiter)
+            if not admitted:
+                raise Overloaded()
+
+        slot = _Slot(latency_target)
+        try:
+            yield slot
+        except BaseException as error:
+            self._release(slot, error)
+            raise
+        self._release(slot, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'limit': round(self.limit, 2),
+                'inFlight': self._in_flight,
+                'queued': len(self._queue),
+                **self._stats
+            }
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def priority_for(operation: Optional[str]) -> str:
+    return OPERATION_PRIORITY.get(operation, 'standard')
+
+
+def latency_target_for(operation: Optional[str]) -> Optional[float]:
+    """Whole-call latency target of an operation; None uses the controller's"""
+    override = os.getenv(f'AI_LATENCY_TARGET_{operation.upper()}') if operation else None
+    if override is not None:
+        return float(override)
+    return OPERATION_LATENCY_TARGETS.get(operation)
+
+
+bedrock_admission = AdmissionController(
+    initial_limit=float(os.getenv('AI_CONCURRENCY_INITIAL', '8')),
+    max_limit=float(os.getenv('AI_CONCURRENCY_MAX', '32')),
+    max_queue=int(os.getenv('AI_QUEUE_SIZE', '50')),
+    queue_timeout=float(os.getenv('AI_QUEUE_TIMEOUT', '15')),
+    latency_target=float(os.getenv('AI_LATENCY_TARGET', '20'))
+)
@@ -0,0 +1,205 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# Threads running outbound calls, for the blocking and the async path
+# alike (boto3 has no async client). A call that outlives its deadline
+# keeps its thread until the attempt in progress ends (the client starts
+# no retry past the deadline, and BEDROCK_READ_TIMEOUT bounds the attempt),
+# so leave room above AI_CONCURRENCY_MAX.
+CALL_THREADS = int(os.getenv('AI_CALL_THREADS', '64'))
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('ai_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call did not answer within its deadline"""
+
+    def __init__(self, message: str = 'AIの応答が時間内に返りませんでした。しばらくしてから再試行してください'):
+        super().__init__(message)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Bound the calls made inside the block.
+
+    Deadlines nest: an inner one can only tighten the outer one, so a
+    request's budget covers every call made while serving it (escalation
+    and re-asks included).
+    """
+    current = _deadline.get()
+    at = None if seconds is None else time.monotonic() + seconds
+    if at is None or (current is not None and current <= at):
+        at = current
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one"""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+class HedgeBudget:
+    """Token bucket capping hedged requests to a fraction of calls.
+
+    Every call earns `ratio` of a token, up to `burst`; a hedge spends a
+    whole one. With ratio 0.05, hedging adds at most about 5% load plus
+    the burst, even when every call is slow.
+    """
+
+    def __init__(self, ratio: float = 0.05, burst: float = 10):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+        self._stats = {'sent': 0, 'won': 0, 'denied': 0}
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                self._stats['denied'] += 1
+                return False
+            self._tokens -= 1
+            self._stats['sent'] += 1
+            return True
+
+    def won(self):
+        with self._lock:
+            self._stats['won'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'ratio': self.ratio, 'tokens': round(self._tokens, 2), **self._stats}
+
+
+_pool = ThreadPoolExecutor(max_workers=CALL_THREADS, thread_name_prefix='ai-call')
+
+# Async attempts left running after their caller returned
+_background: Set[asyncio.Future] = set()
+
+
+def _wait_time(started: float, timeout: Optional[float], hedge_at: Optional[float]) -> Optional[float]:
+    """Seconds to wait for an attempt; raises DeadlineExceeded when none are left"""
+    elapsed = time.monotonic() - started
+    wait_for = None if timeout is None else timeout - elapsed
+    if wait_for is not None and wait_for <= 0:
+        raise DeadlineExceeded()
+    if hedge_at is not None:
+        until_hedge = max(0.0, hedge_at - elapsed)
+        wait_for = until_hedge if wait_for is None else min(wait_for, until_hedge)
+    return wait_for
+
+
+def call_with_deadline(
+    fn: Callable[[], Any],
+    timeout: Optional[float],
+    hedge_after: Optional[float] = None,
+    budget: Optional[HedgeBudget] = None
+) -> Any:
+    """Run fn on the call pool, waiting at most `timeout` seconds.
+
+    With `hedge_after`, a second attempt starts if the first has not
+    answered by then and the budget allows it; the first successful
+    answer wins. Attempts still running when the caller gives up are left
+    to finish in the background. Raises DeadlineExceeded on timeout, or
+    the first error when every attempt failed.
+    """
+    started = time.monotonic()
+    if budget is not None:
+        budget.earn()
+    # Each attempt runs in a copy of the caller's context (tracing, deadline)
+    attempts: List[Future] = [_pool.submit(contextvars.copy_context().run, fn)]
+    hedge: Optional[Future] = None
+    hedge_at = hedge_after
+    error: Optional[BaseException] = None
+    while attempts:
+        done, _ = wait(attempts, timeout=_wait_time(started, timeout, hedge_at), return_when=FIRST_COMPLETED)
+        for future in done:
+            attempts.remove(future)
+            if future.exception() is None:
+                if future is hedge and budget is not None:
+                    budget.won()
+                return future.result()
+            error = error or future.exception()
+        if hedge_at is not None and time.monotonic() - started >= hedge_at:
+            hedge_at = None
+            if attempts and (budget is None or budget.spend()):
+                hedge = _pool.submit(contextvars.copy_context().run, fn)
+                attempts.append(hedge)
+    raise error
+
+
+async def run_in_pool(fn: Callable[..., Any], *args) -> Any:
+    """Await a blocking call on the call pool, in a copy of the caller's context"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, contextvars.copy_context().run, fn, *args)
+
+
+def _detach(tasks: List[asyncio.Future]):
+    """Let unfinished attempts run on; their errors are retrieved and dropped"""
+    for task in tasks:
+        _background.add(task)
+        task.add_done_callback(lambda t: (_background.discard(t), t.cancelled() or t.exception()))
+
+
+async def acall_with_deadline(
+    make: Callable[[], Awaitable[Any]],
+    timeout: Optional[float],
+    hedge_after: Optional[float] = None,
+    budget: Optional[HedgeBudget] = None
+) -> Any:
+    """Async call_with_deadline; `make` creates a fresh awaitable per attempt"""
+    started = time.monotonic()
+    if budget is not None:
+        budget.earn()
+    attempts: List[asyncio.Future] = [asyncio.ensure_future(make())]
+    hedge: Optional[asyncio.Future] = None
+    hedge_at = hedge_after
+    error: Optional[BaseException] = None
+    try:
+        while attempts:
+            done, _ = await asyncio.wait(
+                attempts,
+                timeout=_wait_time(started, timeout, hedge_at),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                attempts.remove(task)
+                if task.exception() is None:
+                    if task is hedge and budget is not None:
+                        budget.won()
+                    return task.result()
+                error = error or task.exception()
+            if hedge_at is not None and time.monotonic() - started >= hedge_at:
+                hedge_at = None
+                if attempts and (budget is None or budget.spend()):
+                    hedge = asyncio.ensure_future(make())
+                    attempts.append(hedge)
+        raise error
+    finally:
+        _detach(attempts)
+
+
+hedge_budget = HedgeBudget(
+    ratio=float(os.getenv('AI_HEDGE_BUDGET', '0.05')),
+    burst=float(os.getenv('AI_HEDGE_BURST', '10'))
+)
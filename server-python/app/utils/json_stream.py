@@ -0,0 +1,90 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JsonStreamParser:
+    """Incremental parser that surfaces array items as soon as they close.
+
+    Model output arrives a few tokens at a time. feed() scans only the new
+    text, tracking strings, nesting and object keys, and returns every
+    object that completed inside the array at `items_path` (() for a root
+    array, ('steps',) for {"steps": [...]}). Text before the first bracket,
+    such as a Markdown code fence, is skipped. Once the root value closes,
+    `result` holds the whole parsed document.
+    """
+
+    def __init__(self, items_path: Tuple[str, ...] = ()):
+        self.items_path = tuple(items_path)
+        self.result: Any = None
+        self.done = False
+        self._buffer = ''
+        self._pos = 0
+        self._root = -1
+        # Open containers: (bracket, path, start offset)
+        self._stack: List[Tuple[str, Optional[Tuple], int]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = ''
+        self._key: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume more text and return the items it completed"""
+        if self.done:
+            return []
+        self._buffer += chunk
+        items = []
+        buffer = self._buffer
+
+        while self._pos < len(buffer):
+            pos = self._pos
+            char = buffer[pos]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start:pos + 1]
+                continue
+
+            if self._root < 0:
+                # Skip preamble until the root container opens
+                if char not in '[{':
+                    continue
+                self._root = pos
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ':':
+                self._key = json.loads(self._last_string)
+            elif char == ',':
+                self._key = None
+            elif char in '[{':
+                self._stack.append((char, self._child_path(), pos))
+                self._key = None
+            elif char in ']}':
+                bracket, path, start = self._stack.pop()
+                if not self._stack:
+                    self.result = json.loads(buffer[self._root:pos + 1])
+                    self.done = True
+                    break
+                parent_bracket, parent_path, _ = self._stack[-1]
+                if bracket == '{' and parent_bracket == '[' and parent_path == self.items_path:
+                    items.append(json.loads(buffer[start:pos + 1]))
+
+        return items
+
+    def _child_path(self) -> Optional[Tuple]:
+        """Path of a container opening at the current position"""
+        if not self._stack:
+            return ()
+        bracket, path, _ = self._stack[-1]
+        if path is None or bracket == '[':
+            # Items of arrays are not addressed by key
+            return None
+        return path + (self._key,)
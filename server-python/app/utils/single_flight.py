@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result, or the same
+    exception. Once the call finishes the key is forgotten, so later calls
+    run again (pair this with a cache to reuse finished results).
+
+    A waiter gives up after its own `timeout` with TimeoutError; the call
+    it joined runs on for the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn for key, or wait up to `timeout` for the identical call already running"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                return future.result(timeout)
+            except FutureTimeoutError:
+                # A distinct class before Python 3.11
+                raise TimeoutError() from None
+
+        try:
+            future.set_result(fn())
+        except BaseException as error:
+            future.set_exception(error)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'inFlight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced
+            }
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on an event loop.
+
+    Waiters are shielded from each other: a client that disconnects
+    cancels only its own wait, not the shared upstream call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Await fn() for key, or join the identical call already running.
+
+        Joining waits up to `timeout`, then raises TimeoutError.
+        """
+        # Futures belong to one loop; key by loop in case there are several
+        call_key = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(call_key)
+        if task is None:
+            task = self._calls[call_key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(call_key, None))
+            self.executed += 1
+            return await asyncio.shield(task)
+        self.coalesced += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError() from None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'inFlight': len(self._calls),
+            'executed': self.executed,
+            'coalesced': self.coalesced
+        }
@@ -0,0 +1,210 @@
+"""
+Structured output parsing for model answers.
+
+Models wrap JSON in prose or code fences, leave trailing commas, emit
+Python literals, break strings across lines or stop mid-document when they
+run out of tokens. parse_output() finds the first balanced JSON value in
+the text, repairs those defects locally when plain json.loads fails, and
+validates the value against a pydantic schema, so only answers that are
+genuinely unusable need to go back to the model.
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Any, Iterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+# Start positions tried when prose before the answer contains braces
+MAX_CANDIDATES = 5
+
+OPENERS = {'{': '}', '[': ']'}
+QUOTES = {'"': '"', '“': '”'}
+LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+STRING_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+_DANGLING_KEY = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', re.S)
+
+
+class StructuredOutputError(ValueError):
+    """The text holds no JSON value matching the schema"""
+
+
+def _scan(text: str, start: int) -> Tuple[int, bool]:
+    """End of the value opened at text[start], and whether it closed"""
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in '{[':
+            depth += 1
+        elif c in '}]':
+            depth -= 1
+            if depth == 0:
+                return i + 1, True
+    return len(text), False
+
+
+def candidates(text: str) -> List[str]:
+    """Balanced (or truncated) JSON spans, in order of appearance"""
+    spans = []
+    position = 0
+    while len(spans) < MAX_CANDIDATES:
+        match = re.search(r'[{\[]', text[position:])
+        if not match:
+            break
+        start = position + match.start()
+        end, closed = _scan(text, start)
+        spans.append(text[start:end])
+        position = end if closed else start + 1
+    return spans
+
+
+def repair_json(text: str) -> str:
+    """Fix common defects in model-written JSON.
+
+    Handles comments, trailing and missing commas, Python literals, curly
+    quotes around strings, raw control characters inside strings and a
+    document cut off before its closing brackets.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    closing_quote: Optional[str] = None
+    escaped = False
+    i = 0
+    n = len(text)
+
+    def last_significant() -> str:
+        for piece in reversed(out):
+            stripped = piece.strip()
+            if stripped:
+                return stripped[-1]
+        return ''
+
+    while i < n:
+        c = text[i]
+        if closing_quote is not None:
+            if escaped:
+                escaped = False
+                out.append(c)
+            elif c == '\\':
+                escaped = True
+                out.append(c)
+            elif c == closing_quote:
+                closing_quote = None
+                out.append('"')
+            elif c == '"':
+                # A straight quote inside a curly-quoted string
+                out.append('\\"')
+            else:
+                out.append(STRING_ESCAPES.get(c, c))
+            i += 1
+            continue
+
+        if stack and i and text[i - 1].isspace() and (c in QUOTES or c in '{[' or c.isdigit() or c == '-'):
+            # Two values with only whitespace between them lack a comma
+            previous = last_significant()
+            if previous in ('"', '}', ']', 'e', 'l') or previous.isdigit():
+                out.append(',')
+        if c in QUOTES:
+            closing_quote = QUOTES[c]
+            out.append('"')
+        elif c in OPENERS:
+            stack.append(OPENERS[c])
+            out.append(c)
+        elif c in '}]':
+            while out and out[-1].strip() in ('', ','):
+                if out.pop().strip() == ',':
+                    break
+            if stack:
+                stack.pop()
+            out.append(c)
+        elif text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        else:
+            word = re.match(r'[A-Za-z]+', text[i:])
+            if word and word.group() in LITERALS:
+                out.append(LITERALS[word.group()])
+                i += len(word.group())
+                continue
+            out.append(c)
+        i += 1
+
+    repaired = ''.join(out)
+    if closing_quote is not None:
+        repaired += '"'
+    if stack:
+        # Cut off mid-document: drop a dangling key or comma, then close
+        repaired = repaired.rstrip()
+        if stack[-1] == '}':
+            repaired = _DANGLING_KEY.sub(r'\1', repaired)
+        repaired = repaired.rstrip().rstrip(',').rstrip(':')
+        repaired += ''.join(reversed(stack))
+    return repaired
+
+
+def _values(text: str) -> Iterator[Any]:
+    """Parsed JSON values found in text, repairing each span when needed"""
+    for span in candidates(text):
+        try:
+            yield json.loads(span)
+            continue
+        except ValueError:
+            pass
+        try:
+            yield json.loads(repair_json(span))
+        except ValueError:
+            continue
+
+
+def extract_json(text: str) -> Any:
+    """First JSON value in text, repairing it when needed"""
+    for value in _values(text):
+        return value
+    raise StructuredOutputError('応答にJSONが見つかりません')
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def validate_value(value: Any, schema: Any) -> Any:
+    """Validate a parsed value; returns it normalized as plain dicts and lists"""
+    adapter = _adapter(schema)
+    try:
+        return adapter.dump_python(adapter.validate_python(value))
+    except ValidationError as error:
+        raise StructuredOutputError(str(error)) from error
+
+
+def parse_output(text: str, schema: Any) -> Any:
+    """First JSON value in text that matches the schema, as plain dicts and lists"""
+    error: Optional[Exception] = None
+    for value in _values(text):
+        try:
+            return validate_value(value, schema)
+        except StructuredOutputError as invalid:
+            error = invalid
+    raise error or StructuredOutputError('応答にJSONが見つかりません')
+
+
+def schema_hint(schema: Any) -> str:
+    """Compact JSON Schema of the expected answer, for a repair prompt"""
+    return json.dumps(_adapter(schema).json_schema(), ensure_ascii=False, separators=(',', ':'))
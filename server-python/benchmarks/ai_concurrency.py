@@ -0,0 +1,164 @@
+"""
+Concurrency benchmark for the blocking and async Bedrock invocation paths.
+
+Runs the production call path (ChatBedrock over the shared boto3 client)
+with only the HTTP send replaced: a botocore before-send hook holds the
+calling thread for a fixed latency, as a real request would, and returns
+a canned Anthropic response. The same number of distinct prompts then go
+through invoke_model on a bounded thread pool (like gunicorn worker
+threads) and through ainvoke_model on one event loop. No AWS calls are
+made.
+
+Both paths go through the AIMD admission window (AI_CONCURRENCY_MAX caps
+calls in flight on either path). For the run the window is fixed at
+--concurrency and the queue is made large enough for the whole burst;
+with --keep-limits the configured AI_* limits apply instead. Calls
+rejected by admission (Overloaded, 503) and calls that waited past their
+deadline (DeadlineExceeded, 504; 30s for calls without an operation,
+admission wait included) are counted rather than failing the run.
+
+Usage:
+    python -m benchmarks.ai_concurrency --requests 500 --latency 2.0 --threads 16
+    python -m benchmarks.ai_concurrency --requests 500 --keep-limits
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+# Requests are signed before the hook sees them; any credentials will do
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+
+import boto3
+from botocore.awsrequest import AWSResponse
+
+from app.services import bedrock_service
+from app.utils.admission import Overloaded, bedrock_admission
+from app.utils.deadline import DeadlineExceeded
+
+ANSWER = {
+    'id': 'msg_benchmark',
+    'type': 'message',
+    'role': 'assistant',
+    'content': [{'type': 'text', 'text': '{"category": "work", "tags": []}'}],
+    'stop_reason': 'end_turn',
+    'usage': {'input_tokens': 100, 'output_tokens': 20}
+}
+
+
+class _Raw(io.BytesIO):
+    """Minimal urllib3-like body for AWSResponse"""
+
+    def stream(self, amt=None, decode_content=True):
+        yield self.read()
+
+
+class FakeBedrock:
+    """before-send hook answering InvokeModel after a fixed latency.
+
+    Tracks the peak number of requests inside the HTTP layer at once.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.open = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request, **kwargs):
+        with self._lock:
+            self.open += 1
+            self.peak = max(self.peak, self.open)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.open -= 1
+        body = json.dumps(ANSWER).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body))}
+        return AWSResponse(request.url, 200, headers, _Raw(body))
+
+
+def _failed(results) -> Tuple[int, int]:
+    """Count Overloaded and DeadlineExceeded; any other error fails the benchmark"""
+    rejected = timed_out = 0
+    for result in results:
+        if isinstance(result, Overloaded):
+            rejected += 1
+        elif isinstance(result, DeadlineExceeded):
+            timed_out += 1
+        elif isinstance(result, BaseException):
+            raise result
+    return rejected, timed_out
+
+
+def run_sync(requests: int, threads: int) -> Tuple[float, int, int]:
+    def call(i: int):
+        try:
+            return bedrock_service.invoke_model(f'sync prompt {i}')
+        except (Overloaded, DeadlineExceeded) as error:
+            return error
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(call, range(requests)))
+    return (time.perf_counter() - started, *_failed(results))
+
+
+async def run_async(requests: int) -> Tuple[float, int, int]:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(bedrock_service.ainvoke_model(f'async prompt {i}') for i in range(requests)),
+        return_exceptions=True
+    )
+    return (time.perf_counter() - started, *_failed(results))
+
+
+def set_limits(concurrency: float, queue: int, queue_timeout: float):
+    """Fix the admission window and queue for a run"""
+    bedrock_admission.limit = bedrock_admission.max_limit = concurrency
+    bedrock_admission.max_queue = queue
+    bedrock_admission.queue_timeout = queue_timeout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=2.0)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--concurrency', type=float, default=bedrock_admission.max_limit,
+                        help='admission window for the run (default: AI_CONCURRENCY_MAX)')
+    parser.add_argument('--keep-limits', action='store_true',
+                        help='use the configured AI_* admission limits and count rejections')
+    args = parser.parse_args()
+    configured = (bedrock_admission.limit, bedrock_admission.max_queue, bedrock_admission.queue_timeout)
+
+    fake = FakeBedrock(args.latency)
+    # Clients copy the session's handlers when they are created
+    boto3.setup_default_session()
+    boto3.DEFAULT_SESSION.events.register('before-send.bedrock-runtime.InvokeModel', fake)
+
+    for label, run in (
+        (f'threads ({args.threads})', lambda: run_sync(args.requests, args.threads)),
+        ('asyncio', lambda: asyncio.run(run_async(args.requests))),
+    ):
+        fake.peak = 0
+        if args.keep_limits:
+            bedrock_admission.limit, bedrock_admission.max_queue, bedrock_admission.queue_timeout = configured
+        else:
+            set_limits(args.concurrency, args.requests, args.requests * args.latency + 60)
+        elapsed, rejected, timed_out = run()
+        print(
+            f'{label:>14}: {elapsed:7.2f}s  {(args.requests - rejected - timed_out) / elapsed:7.1f} req/s  '
+            f'peak in flight {fake.peak}  rejected {rejected}  timed out {timed_out}'
+        )
+
+
+if __name__ == '__main__':
+    main()
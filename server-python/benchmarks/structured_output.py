@@ -0,0 +1,97 @@
+"""
+Corpus check for the structured-output layer.
+
+Runs a set of malformed model answers, of the kinds seen from Bedrock,
+through parse_output() with the schema of their endpoint and reports how
+many are recovered locally and how many would still need a re-ask. No
+AWS calls are made.
+
+Usage:
+    python -m benchmarks.structured_output [--verbose]
+"""
+import argparse
+import time
+from typing import List
+
+from app.models.todo import (
+    CompletionMessage,
+    ExecutionGuide,
+    GeneratedTask,
+    PrioritySuggestion,
+    StaleEncouragement,
+    TaskClassification,
+)
+from app.utils.structured_output import StructuredOutputError, parse_output
+
+# (description, schema, answer, recoverable locally)
+CORPUS = [
+    ('code fence', TaskClassification,
+     '```json\n{"category": "work", "tags": ["会議"], "reasoning": "仕事の予定"}\n```', True),
+    ('preamble and epilogue', PrioritySuggestion,
+     'はい、分析しました。\n{"priority": "high", "reasoning": "期限が近い", "urgencyFactors": ["期限"]}\n以上です。', True),
+    ('braces in preamble', TaskClassification,
+     '形式 {category, tags} で答えます。\n{"category": "shopping", "tags": ["食品"]}', True),
+    ('trailing commas', ExecutionGuide,
+     '{"steps": [{"stepNumber": 1, "instruction": "資料を集める",},], "prerequisites": [],}', True),
+    ('python literals', CompletionMessage,
+     "{\"message\": \"おめでとう！\", \"encouragement\": None, \"emoji\": \"🎉\"}", True),
+    ('raw newline in string', StaleEncouragement,
+     '{"overallMessage": "少しずつ進めましょう。\n焦らなくて大丈夫です。", "taskMessages": {}, "actionSuggestion": "5分だけ"}', True),
+    ('missing commas', List[GeneratedTask],
+     '[\n  {"title": "買い物リストを作る"}\n  {"title": "スーパーに行く"}\n]', True),
+    ('curly quotes', TaskClassification,
+     '{“category”: “health”, “tags”: [“運動”]}', True),
+    ('comments', PrioritySuggestion,
+     '{\n  // 期限が明日\n  "priority": "urgent"\n}', True),
+    ('truncated document', ExecutionGuide,
+     '{"steps": [{"stepNumber": 1, "instruction": "準備する"}, {"stepNumber": 2, "instruction": "実行す', True),
+    ('truncated after key', List[GeneratedTask],
+     '[{"title": "部屋を片付ける", "description": "机の上から"}, {"title": "掃除機をかける", "estimatedPriority":', True),
+    ('japanese labels', PrioritySuggestion,
+     '{"priority": "緊急", "urgencyFactors": "期限、上司の依頼"}', True),
+    ('value with label', List[GeneratedTask],
+     '[{"title": "週報", "estimatedCategory": "work（仕事）", "estimatedPriority": "Medium"}]', True),
+    ('numeric step as string', ExecutionGuide,
+     '{"steps": [{"stepNumber": "1", "instruction": "始める", "tips": null}]}', True),
+    ('unknown category', TaskClassification,
+     '{"category": "hobby", "tags": []}', False),
+    ('missing required field', PrioritySuggestion,
+     '{"reasoning": "判断できません"}', False),
+    ('no JSON at all', CompletionMessage,
+     '申し訳ありませんが、その依頼にはお答えできません。', False),
+    ('empty steps', ExecutionGuide,
+     '{"steps": []}', False),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    recovered = 0
+    mismatches = []
+    started = time.perf_counter()
+    for name, schema, answer, expected in CORPUS:
+        try:
+            value = parse_output(answer, schema)
+            ok = True
+        except StructuredOutputError as error:
+            value = error
+            ok = False
+        recovered += ok
+        if ok != expected:
+            mismatches.append(name)
+        if args.verbose:
+            print(f"{'ok ' if ok else 'ask'} {name}: {value}")
+    elapsed = time.perf_counter() - started
+
+    print(f'{len(CORPUS)} answers: {recovered} recovered locally, {len(CORPUS) - recovered} need a re-ask '
+          f'({elapsed * 1000 / len(CORPUS):.2f} ms per answer)')
+    if mismatches:
+        print(f"Unexpected outcome: {', '.join(mismatches)}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
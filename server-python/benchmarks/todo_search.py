@@ -0,0 +1,102 @@
+"""
+Full-text search benchmark.
+
+Fills a scratch store with synthetic Japanese todos, then measures the
+index build time, the incremental update cost per mutation and the
+latency of ranked searches.
+
+Usage:
+    python -m benchmarks.todo_search --todos 100000 --queries 1000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import app.storage as storage
+from app.services import todos_service
+from app.services.todo_search import search_index
+
+SUBJECTS = ['会議資料', '請求書', '企画書', '議事録', '見積書', 'レポート', '週報', '部屋', '洗濯物', '買い物リスト']
+VERBS = ['を作成する', 'を確認する', 'を提出する', 'を片付ける', 'を見直す', 'を送る']
+PLACES = ['本社', '自宅', '支店', 'オンライン', '取引先']
+TAGS = ['仕事', '家事', '緊急', '経理', '営業', '健康', '勉強', '買い物']
+
+QUERIES = ['請求書', '会議', '確認', '企画書 提出', 'レポート', '本社', '週報を送る', 'オンライン', '見積', '片付']
+# One-kanji queries match through the bigrams that contain the character
+SINGLE_CHAR_QUERIES = ['本', '書', '部屋 送']
+
+
+def make_todo(rng: random.Random) -> dict:
+    return {
+        'title': rng.choice(SUBJECTS) + rng.choice(VERBS),
+        'description': f'{rng.choice(PLACES)}で{rng.choice(SUBJECTS)}を扱う（No.{rng.randrange(10000)}）',
+        'tags': rng.sample(TAGS, rng.randint(0, 3)),
+        'completed': rng.random() < 0.3,
+    }
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--todos', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--storage', default='memory', choices=['memory', 'journal', 'sqlite'])
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        storage.DATA_DIR = data_dir
+        storage.DATA_FILE = data_dir / 'todos.json'
+        storage.JOURNAL_FILE = data_dir / 'todos.log'
+        storage.SQLITE_FILE = data_dir / 'todos.db'
+        storage.STORAGE_MODE = args.storage
+        storage._store = None
+
+        todos_service.import_todos(
+            json.dumps(make_todo(rng), ensure_ascii=False) for _ in range(args.todos)
+        )
+
+        started = time.perf_counter()
+        search_index.ensure(storage.get_store())
+        build = time.perf_counter() - started
+        print(f'index build: {build:.2f}s for {len(search_index)} todos')
+
+        started = time.perf_counter()
+        for _ in range(200):
+            todos_service.create_todo(make_todo(rng))
+        per_create = (time.perf_counter() - started) / 200
+        print(f'create with index update: {per_create * 1000:.3f} ms')
+
+        latencies = []
+        for i in range(args.queries):
+            query = QUERIES[i % len(QUERIES)]
+            tag = rng.choice(TAGS) if i % 3 == 0 else None
+            started = time.perf_counter()
+            result = todos_service.search_todos(query, limit=20, tag=tag)
+            latencies.append(time.perf_counter() - started)
+
+        print(f'search ({args.queries} queries, last total={result["total"]}):')
+        for label, p in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            print(f'  {label}: {percentile(latencies, p) * 1000:.2f} ms')
+
+        for query in SINGLE_CHAR_QUERIES:
+            started = time.perf_counter()
+            result = todos_service.search_todos(query, limit=20)
+            elapsed = time.perf_counter() - started
+            if not result['total']:
+                raise SystemExit(f'single-character query {query!r} found nothing')
+            print(f'search {query!r}: {result["total"]} matches in {elapsed * 1000:.2f} ms')
+
+        storage.get_store().close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Concurrent write stress test for the todo stores.
+
+Forks several worker processes (like gunicorn -w N), each running several
+threads that create todos and increment a shared counter with a
+read-modify-write transaction. Afterwards the data is reloaded from disk
+and checked for lost updates.
+
+Usage:
+    python -m benchmarks.todo_stress --storage journal --workers 4 --threads 8 --ops 200
+"""
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import app.storage as storage
+from app.services import todos_service
+
+COUNTER_ID = 'stress-counter'
+
+
+def configure(data_dir: Path, mode: str):
+    """Point the storage module at a scratch directory"""
+    storage.DATA_DIR = data_dir
+    storage.DATA_FILE = data_dir / 'todos.json'
+    storage.JOURNAL_FILE = data_dir / 'todos.log'
+    storage.SQLITE_FILE = data_dir / 'todos.db'
+    storage.STORAGE_MODE = mode
+    storage.SHARED = True
+    storage._store = None
+
+
+def increment_counter():
+    with storage.get_store().transaction() as store:
+        counter = store.get(COUNTER_ID)
+        counter['count'] += 1
+        store.put(counter)
+
+
+def worker(data_dir: Path, mode: str, threads: int, ops: int):
+    configure(data_dir, mode)
+
+    def run():
+        for i in range(ops):
+            todos_service.create_todo({'title': f'stress {i}', 'category': 'work'})
+            increment_counter()
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    storage.get_store().close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--storage', default='memory', choices=['memory', 'journal', 'sqlite'])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=200, help='creates + increments per thread')
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix='todo-stress-'))
+    try:
+        configure(data_dir, args.storage)
+        storage.get_store().put({'id': COUNTER_ID, 'title': 'counter', 'count': 0})
+        storage.get_store().close()
+
+        ctx = multiprocessing.get_context('fork')
+        started = time.perf_counter()
+        procs = [
+            ctx.Process(target=worker, args=(data_dir, args.storage, args.threads, args.ops))
+            for _ in range(args.workers)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - started
+
+        # Reload from disk in a fresh store
+        configure(data_dir, args.storage)
+        store = storage.get_store()
+        expected = args.workers * args.threads * args.ops
+        created = len(store) - 1
+        count = store.get(COUNTER_ID)['count']
+        store.close()
+
+        total_ops = expected * 2
+        print(f'storage={args.storage} workers={args.workers} threads={args.threads}')
+        print(f'{total_ops} writes in {elapsed:.2f}s ({total_ops / elapsed:.0f} writes/s)')
+        print(f'created: {created}/{expected}  counter: {count}/{expected}')
+
+        if created != expected or count != expected:
+            print('LOST UPDATES DETECTED')
+            sys.exit(1)
+        print('OK: no lost updates')
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Structured-output repair and re-ask path, driven by the recorded corpus
+in benchmarks/structured_output.py with a stub model in place of Bedrock.
+"""
+import pytest
+
+from app.models.todo import CompletionMessage, ExecutionGuide, PrioritySuggestion, TaskClassification
+from app.services import bedrock_service
+from app.utils.structured_output import StructuredOutputError, parse_output
+from benchmarks.structured_output import CORPUS
+
+# Valid answers the stub model gives when an answer is sent back for repair
+REPAIRED = {
+    TaskClassification: '{"category": "other", "tags": []}',
+    PrioritySuggestion: '{"priority": "medium", "reasoning": "判断できません"}',
+    CompletionMessage: '{"message": "お疲れさまでした！"}',
+    ExecutionGuide: '{"steps": [{"stepNumber": 1, "instruction": "始める"}]}',
+}
+
+
+class StubModel:
+    """invoke_model stand-in answering from a list and recording the calls"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def __call__(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        return self.answers.pop(0)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    def install(*answers):
+        stub = StubModel(*answers)
+        monkeypatch.setattr(bedrock_service, 'invoke_model', stub)
+        return stub
+    return install
+
+
+def _case_id(case):
+    return case[0]
+
+
+def test_corpus_shape():
+    assert len(CORPUS) == 18
+    assert sum(1 for *_, recoverable in CORPUS if not recoverable) == 4
+
+
+@pytest.mark.parametrize('case', [case for case in CORPUS if case[3]], ids=_case_id)
+def test_recoverable_answers_are_repaired_locally(model, case):
+    _, schema, answer, _ = case
+    stub = model()
+
+    assert bedrock_service._structured(answer, schema) == parse_output(answer, schema)
+    assert stub.calls == []
+
+
+@pytest.mark.parametrize('case', [case for case in CORPUS if not case[3]], ids=_case_id)
+def test_unrecoverable_answers_are_re_asked(model, case):
+    _, schema, answer, _ = case
+    with pytest.raises(StructuredOutputError):
+        parse_output(answer, schema)
+    stub = model(REPAIRED[schema])
+
+    result = bedrock_service._structured(answer, schema)
+
+    assert result == parse_output(REPAIRED[schema], schema)
+    assert [call['operation'] for call in stub.calls] == ['repair_output']
+
+
+@pytest.mark.parametrize('case', [case for case in CORPUS if not case[3]], ids=_case_id)
+def test_failed_re_ask_raises(model, case):
+    _, schema, answer, _ = case
+    stub = model(answer)
+
+    with pytest.raises(Exception, match='AI応答の解析に失敗しました'):
+        bedrock_service._structured(answer, schema)
+    assert len(stub.calls) == bedrock_service.MAX_REPAIR_ASKS
+
+
+def test_generate_escalates_then_re_asks(model):
+    answer = '{"category": "hobby", "tags": []}'
+    stub = model(answer, answer, REPAIRED[TaskClassification])
+
+    result = bedrock_service._generate('prompt', TaskClassification, 'classify_task')
+
+    assert result['category'] == 'other'
+    assert [(call['operation'], call.get('tier')) for call in stub.calls] == [
+        ('classify_task', 'fast'),
+        ('classify_task', 'strong'),
+        ('repair_output', None),
+    ]
+
+
+def test_generate_accepts_repaired_fast_answer(model):
+    answer = '```json\n{"category": "work", "tags": ["会議"]}\n```'
+    stub = model(answer)
+
+    assert bedrock_service._generate('prompt', TaskClassification, 'classify_task')['category'] == 'work'
+    assert len(stub.calls) == 1